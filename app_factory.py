@@ -5,10 +5,14 @@ from quart import Quart, send_from_directory
 from quart_cors import cors
 from quart_rate_limiter import RateLimiter, rate_limit
 import common.config.const as const
+from common.auth.token_cache import TokenValidationCache
 from common.exception.errors import init_error_handlers
+from common.service.query_cache import QueryResultCache
 from common.utils.event_loop import BackgroundEventLoop
+from common.utils.http_client import http_client_pool
 from routes.chat import chat_bp
 from routes.labels_config import labels_config_bp
+from routes.metrics import metrics_bp
 from routes.token import token_bp
 from routes.workflow import workflow_bp
 from services.factory import grpc_client
@@ -64,6 +68,17 @@ def create_app():
         logger.info("Started gRPC background stream.")
 
 
+    # --- Request-scoped query result and token claims caches ---
+    @app.before_request
+    async def begin_query_cache_scope():
+        QueryResultCache.begin_request()
+        TokenValidationCache.begin_request()
+
+    @app.teardown_request
+    async def end_query_cache_scope(exc):
+        QueryResultCache.end_request()
+        TokenValidationCache.end_request()
+
     @app.after_serving
     async def shutdown_grpc():
         if hasattr(app, 'background_task'):
@@ -71,6 +86,10 @@ def create_app():
             await app.background_task
         logger.info("Stopped gRPC background stream.")
 
+    @app.after_serving
+    async def close_http_clients():
+        await http_client_pool.aclose_all()
+
     # --- Static index route ---
     @app.route('/')
     @rate_limit(const.RATE_LIMIT, timedelta(minutes=1))
@@ -82,5 +101,6 @@ def create_app():
     app.register_blueprint(chat_bp)
     app.register_blueprint(labels_config_bp)
     app.register_blueprint(workflow_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
@@ -1,16 +1,40 @@
+import asyncio
 import json
 import logging
+import time
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
 
-import jsonschema
 from jsonschema import ValidationError
+from jsonschema.validators import validator_for
 
 from common.config import const
 from common.config.config import config
-from entity.model import AIMessage
+from common.utils.metrics import metrics
+from entity.model import AIMessage, ModelConfig
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=128)
+def _get_validator(schema_json: str):
+    """
+    Validator compiled once per schema, keyed by the schema's canonical json.
+    """
+    schema = json.loads(schema_json)
+    validator_cls = validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    path = "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in error.absolute_path)
+    message = error.message
+    if len(message) > const.SCHEMA_VALIDATION_ERROR_MAX_LENGTH:
+        message = message[:const.SCHEMA_VALIDATION_ERROR_MAX_LENGTH] + "..."
+    return f"at ${path}: {message}"
+
+
 # todo add react, prompt chaining etc - other techniques, add more implementations
 class OpenAiAgent:
     def __init__(self, client, max_calls=config.MAX_AI_AGENT_ITERATIONS):
@@ -41,23 +65,110 @@ class OpenAiAgent:
     ):
         try:
             parsed = json.loads(content)
-            # todo get all validation errors at once
-            jsonschema.validate(instance=parsed, schema=schema)
-            # Return the original string on success
-            return content, None
-        except (json.JSONDecodeError, ValidationError) as e:
-            error = str(e)
-            error = (error[:50] + '...') if len(error) > 20 else error
-            msg = f"Validation failed on attempt {attempt}/{max_retries}: {error}. Please return correct json. "
-            if attempt > 2:
-                msg = f"{msg}. If the task is too hard you can make the code shorter. Just ensure you return correct json."
-            adapted_messages.append({"role": "user", "content": msg})
-            return None, msg
+        except json.JSONDecodeError as e:
+            start = max(e.pos - 40, 0)
+            errors = [f"invalid json at line {e.lineno} column {e.colno}: {e.msg}, "
+                      f"near {json.dumps(e.doc[start:e.pos + 40])}"]
+        else:
+            validator = _get_validator(json.dumps(schema, sort_keys=True))
+            errors = [_format_validation_error(error) for error in
+                      sorted(validator.iter_errors(parsed), key=lambda error: list(error.absolute_path))]
+            if not errors:
+                # Return the original string on success
+                return content, None
+        metrics.increment("ai_agent.schema_validation_failures")
+        listed = errors[:const.SCHEMA_VALIDATION_MAX_ERRORS]
+        msg = (f"Validation failed on attempt {attempt}/{max_retries} with {len(errors)} error(s). "
+               f"Fix all of them and return the complete corrected json:\n" + "\n".join(f"- {e}" for e in listed))
+        if len(errors) > len(listed):
+            msg = f"{msg}\n- ... and {len(errors) - len(listed)} more"
+        if attempt > 2:
+            msg = f"{msg}\nIf the task is too hard you can make the code shorter. Just ensure you return correct json."
+        adapted_messages.append({"role": "user", "content": msg})
+        return None, msg
+
+    async def _run_tool_calls(self, tool_calls, methods_dict, cls_instance, technical_id, entity,
+                              model: ModelConfig) -> Tuple[List[Tuple[Any, Any]], Optional[Tuple[Any, Any]]]:
+        """
+        Runs the tool calls in the order the model returned them and returns (call, result) pairs
+        in call order. Execution stops before the first ui function (returned as the second element)
+        and after the exit loop function, as later calls were never meant to run.
+
+        With parallel_tool_calls consecutive parallel-safe calls run concurrently. Any other tool
+        waits for the calls before it, has its arguments parsed only then, and the calls after it
+        wait for it, so the model's ordering still holds for side effects. tool_timeout_seconds only
+        applies to parallel-safe tools, a tool with side effects is never cancelled half way.
+        """
+        semaphore = asyncio.Semaphore(model.max_parallel_tool_calls)
+
+        async def run_parallel_safe(call):
+            async with semaphore:
+                return await self._run_tool_call(call=call, args=json.loads(call.function.arguments),
+                                                 methods_dict=methods_dict, cls_instance=cls_instance,
+                                                 technical_id=technical_id, entity=entity,
+                                                 timeout=model.tool_timeout_seconds)
+
+        results = []
+        concurrent = []
+        for call in tool_calls:
+            name = call.function.name
+            if name in const.PARALLEL_SAFE_TOOL_FUNCTIONS:
+                concurrent.append((call, run_parallel_safe(call)))
+                if not model.parallel_tool_calls:
+                    results.extend(await self._gather_in_order(concurrent))
+                    concurrent = []
+                continue
+            results.extend(await self._gather_in_order(concurrent))
+            concurrent = []
+            args = json.loads(call.function.arguments)
+            if name.startswith(const.UI_FUNCTION_PREFIX):
+                return results, (call, args)
+            result = await self._run_tool_call(call=call, args=args, methods_dict=methods_dict,
+                                               cls_instance=cls_instance, technical_id=technical_id,
+                                               entity=entity, timeout=None)
+            results.append((call, result))
+            if name == const.Notifications.EXIT_LOOP_FUNCTION_NAME.value:
+                break
+        results.extend(await self._gather_in_order(concurrent))
+        return results, None
+
+    @staticmethod
+    async def _gather_in_order(calls) -> List[Tuple[Any, Any]]:
+        if not calls:
+            return []
+        results = await asyncio.gather(*(coroutine for _, coroutine in calls), return_exceptions=True)
+        # let every call finish before failing, then raise the first error as the serial loop would
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return [(call, result) for (call, _), result in zip(calls, results)]
+
+    @staticmethod
+    async def _run_tool_call(call, args, methods_dict, cls_instance, technical_id, entity,
+                             timeout: Optional[float]) -> Any:
+        name = call.function.name
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(
+                methods_dict[name](cls_instance, technical_id=technical_id, entity=entity, **args),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {name} timed out after {timeout}s, technical_id={technical_id}")
+            metrics.increment("ai_agent.tool_timeouts")
+            return f"Error: the tool {name} did not finish within {timeout} seconds."
+        finally:
+            metrics.observe(f"ai_agent.tool_ms.{name}", (time.monotonic() - started) * 1000)
 
     async def run_agent(
             self, methods_dict, technical_id, cls_instance, entity, tools, model,
-            messages, tool_choice="auto", response_format=None
+            messages, tool_choice="auto", response_format=None, on_content=None
     ):
+        """
+        on_content, if given, streams the completions and receives the answer text pieces of the
+        current completion as they are generated (see AsyncOpenAIClient.create_completion). Not used for json schema responses,
+        partial json is no use to anybody.
+        """
         adapted_messages = self.adapt_messages(messages)
         schema = response_format.get("schema") if response_format else None
         max_retries = self.max_calls
@@ -68,36 +179,39 @@ class OpenAiAgent:
                 if response_format else None
             )
             logger.info(f"Running completion...attempt={attempt}")
+            stream_params = {"on_content": on_content} if on_content and not response_format else {}
             completion = await self.client.create_completion(
                 model=model,
                 messages=adapted_messages,
                 tools=tools,
                 tool_choice=tool_choice,
-                response_format=ai_response_format
+                response_format=ai_response_format,
+                **stream_params
             )
             resp = completion.choices[0].message
 
             if hasattr(resp, "tool_calls") and resp.tool_calls:
                 adapted_messages.append(resp)
-                for call in resp.tool_calls:
-                    args = json.loads(call.function.arguments)
-                    if call.function.name.startswith(const.UI_FUNCTION_PREFIX):
-                        if isinstance(args, dict):
-                            return json.dumps({"type": const.UI_FUNCTION_PREFIX, "function": call.function.name, **args})
-                        return json.dumps({"type": const.UI_FUNCTION_PREFIX, "function": call.function.name})
-                    result = await methods_dict[call.function.name](
-                        cls_instance, technical_id=technical_id, entity=entity, **args
-                    )
+                results, ui_call = await self._run_tool_calls(
+                    tool_calls=resp.tool_calls, methods_dict=methods_dict, cls_instance=cls_instance,
+                    technical_id=technical_id, entity=entity, model=model
+                )
+                for call, result in results:
                     adapted_messages.append({
                         "role": "tool",
                         "tool_call_id": call.id,
                         "content": str(result)
                     })
-                    if call.function.name == const.Notifications.EXIT_LOOP_FUNCTION_NAME.value:
-                        content =  f'{resp.content} \n {const.Notifications.PROCEED_TO_THE_NEXT_STEP.value}' if resp.content else const.Notifications.PROCEED_TO_THE_NEXT_STEP.value
-                        adapted_messages.append(
-                            {"role": "assistant", "content": content})
-                        return content
+                if ui_call:
+                    call, args = ui_call
+                    if isinstance(args, dict):
+                        return json.dumps({"type": const.UI_FUNCTION_PREFIX, "function": call.function.name, **args})
+                    return json.dumps({"type": const.UI_FUNCTION_PREFIX, "function": call.function.name})
+                if results and results[-1][0].function.name == const.Notifications.EXIT_LOOP_FUNCTION_NAME.value:
+                    content =  f'{resp.content} \n {const.Notifications.PROCEED_TO_THE_NEXT_STEP.value}' if resp.content else const.Notifications.PROCEED_TO_THE_NEXT_STEP.value
+                    adapted_messages.append(
+                        {"role": "assistant", "content": content})
+                    return content
                 continue
 
             content = resp.content
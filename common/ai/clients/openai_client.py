@@ -1,13 +1,52 @@
+import hashlib
+import inspect
 import json
 import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
 from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message_tool_call import Function
 
+from common.config.config import config
+from common.utils.cache import build_cache
 from common.utils.utils import custom_serializer
 from entity.model import ModelConfig, ToolChoice
 
 logger = logging.getLogger(__name__)
 
+ContentCallback = Callable[[List[str]], Union[Awaitable[Any], Any]]
+
+# reasoning models do not support temperature, their answers are never deterministic
+_REASONING_MODELS = ["o4-mini"]
+
+_completion_cache = build_cache(
+    "completions",
+    max_bytes=config.COMPLETION_CACHE_MAX_BYTES,
+    ttl=config.COMPLETION_CACHE_TTL or None,
+    disk_path=config.COMPLETION_CACHE_DISK_PATH or None,
+    disk_max_bytes=config.COMPLETION_CACHE_DISK_MAX_BYTES,
+)
+
+
+def _is_cacheable(model: ModelConfig) -> bool:
+    if not config.COMPLETION_CACHE_TTL or model.cache_completions is False:
+        return False
+    if model.cache_completions:
+        return True
+    return model.model_name not in _REASONING_MODELS and model.temperature == 0
+
+
+def _completion_cache_key(params: dict) -> str:
+    """
+    Content address of a request: the sampling parameters, messages, tools and response format.
+    """
+    encoded = json.dumps(params, sort_keys=True,
+                         default=lambda obj: obj.model_dump(mode="json") if hasattr(obj, "model_dump") else obj.__dict__)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
 class AsyncOpenAIClient:
     def __init__(self):
         self.client = AsyncOpenAI()
@@ -18,7 +57,8 @@ class AsyncOpenAIClient:
             messages: list,
             tools: list = None,
             tool_choice: ToolChoice = "auto",
-            response_format = None
+            response_format = None,
+            on_content: Optional[ContentCallback] = None
     ):
         """
         Create a chat completion using the asynchronous OpenAI API.
@@ -33,6 +73,9 @@ class AsyncOpenAIClient:
             presence_penalty (float): Presence penalty.
             tools (list, optional): List of tool definitions (if using OpenAI functions).
             tool_choice (str): How to choose the tool call (default "auto").
+            on_content (callable, optional): Streams the completion and is called with the
+                pieces of answer text received so far, may be async. It gets the same growing
+                list on every call, so it only pays for joining the text when it uses it.
 
         Returns:
             The response from the OpenAI API.
@@ -41,27 +84,89 @@ class AsyncOpenAIClient:
             logger.info(f"Invoking openai client with messages: {json.dumps(messages[-1], default=custom_serializer)}")
         except Exception as e:
             logger.exception(e)
-        if model.model_name in ["o4-mini"]:
-            response = await self.client.chat.completions.create(
+        if model.model_name in _REASONING_MODELS:
+            params = dict(
                 model=model.model_name,
                 max_completion_tokens=model.max_tokens,
-                messages=messages,
-                tools=tools,
-                tool_choice=tool_choice,
-                response_format=response_format
             )
         else:
-            response = await self.client.chat.completions.create(
+            params = dict(
                 model=model.model_name,
                 temperature=model.temperature,
                 max_tokens=model.max_tokens,
                 top_p=model.top_p,
                 frequency_penalty=model.frequency_penalty,
                 presence_penalty=model.presence_penalty,
-                messages=messages,
-                tools=tools,
-                tool_choice=tool_choice,
-                response_format=response_format
             )
-        logger.info(f"Invoked openai client with response: {response}")
+        params.update(messages=messages, tools=tools, tool_choice=tool_choice, response_format=response_format)
+        cache_key = _completion_cache_key(params) if _is_cacheable(model) else None
+        cached = _completion_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            response = ChatCompletion.model_validate(cached)
+            logger.info(f"Using cached completion {response.id}")
+            if on_content and response.choices[0].message.content:
+                result = on_content([response.choices[0].message.content])
+                if inspect.isawaitable(result):
+                    await result
+            return response
+        if on_content:
+            response = await self._create_streamed_completion(params=params, on_content=on_content)
+        else:
+            response = await self.client.chat.completions.create(**params)
+        if cache_key and response.choices[0].finish_reason in ("stop", "tool_calls"):
+            _completion_cache.set(cache_key, response.model_dump(mode="json"))
+        message = response.choices[0].message
+        logger.info(f"Invoked openai client: id={response.id}, finish_reason={response.choices[0].finish_reason}, "
+                    f"content_length={len(message.content or '')}, "
+                    f"tool_calls={[call.function.name for call in message.tool_calls or []]}, usage={response.usage}")
+        logger.debug(f"Invoked openai client with response: {response}")
         return response
+
+    async def _create_streamed_completion(self, params: dict, on_content: ContentCallback) -> ChatCompletion:
+        """
+        Streams the completion, calling on_content with the answer pieces received so far after
+        every content chunk, and assembles the chunks (including tool calls, whose arguments
+        arrive in pieces) into the ChatCompletion the non streaming API would have returned.
+        """
+        stream = await self.client.chat.completions.create(
+            **params, stream=True, stream_options={"include_usage": True}
+        )
+        completion_id, created, model_name, usage = "", 0, params["model"], None
+        finish_reason = None
+        content_parts = []
+        tool_calls: Dict[int, dict] = {}
+        async for chunk in stream:
+            completion_id, created, model_name = chunk.id, chunk.created, chunk.model
+            usage = chunk.usage or usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            delta = choice.delta
+            for call_delta in delta.tool_calls or []:
+                call = tool_calls.setdefault(call_delta.index, {"id": "", "name": "", "arguments": ""})
+                call["id"] = call_delta.id or call["id"]
+                if call_delta.function:
+                    call["name"] += call_delta.function.name or ""
+                    call["arguments"] += call_delta.function.arguments or ""
+            if delta.content:
+                content_parts.append(delta.content)
+                result = on_content(content_parts)
+                if inspect.isawaitable(result):
+                    await result
+
+        message = ChatCompletionMessage(
+            role="assistant",
+            content="".join(content_parts) or None,
+            tool_calls=[
+                ChatCompletionMessageToolCall(
+                    id=call["id"], type="function",
+                    function=Function(name=call["name"], arguments=call["arguments"])
+                )
+                for _, call in sorted(tool_calls.items())
+            ] or None
+        )
+        return ChatCompletion(
+            id=completion_id, created=created, model=model_name, object="chat.completion", usage=usage,
+            choices=[Choice(index=0, message=message, finish_reason=finish_reason or "stop")]
+        )
@@ -0,0 +1,61 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+from entity.model import AIMessage
+
+logger = logging.getLogger(__name__)
+
+Tokenizer = Callable[[str], int]
+
+# per message framing (role, separators) added by the chat completion format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Offline approximation, about four characters per token for English text and code.
+    """
+    return len(text) // 4 + 1 if text else 0
+
+
+def register_tokenizer(model_name: str, tokenizer: Tokenizer) -> None:
+    """
+    Plug in an exact tokenizer for a model, e.g. one built on a locally available tiktoken encoding.
+    """
+    _tokenizers[model_name] = tokenizer
+
+
+def get_tokenizer(model_name: Optional[str] = None) -> Tokenizer:
+    return _tokenizers.get(model_name, estimate_tokens)
+
+
+def message_text(message: AIMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return " ".join(str(part) for part in content)
+    return str(content) if content else ""
+
+
+def count_message_tokens(message: AIMessage, tokenizer: Tokenizer) -> int:
+    return tokenizer(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def count_messages_tokens(messages: Iterable[AIMessage], tokenizer: Tokenizer) -> int:
+    return sum(count_message_tokens(message, tokenizer) for message in messages)
+
+
+def newest_within_budget(messages: List[AIMessage], budget: int, tokenizer: Tokenizer) -> List[AIMessage]:
+    """
+    Longest suffix of messages whose token count fits the budget.
+    """
+    used = 0
+    start = len(messages)
+    while start > 0:
+        tokens = count_message_tokens(messages[start - 1], tokenizer)
+        if used + tokens > budget:
+            break
+        used += tokens
+        start -= 1
+    return messages[start:]
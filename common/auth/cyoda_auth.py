@@ -1,36 +1,57 @@
+import asyncio
 import json
 import logging
+import threading
 import time
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
 
 import requests
 
 from common.config import config
 from common.config.config import config
+from common.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+AUTH_REQUEST_TIMEOUT = 30
+# a token this close to expiry is refreshed in the background while it is still handed out
+ACCESS_TOKEN_REFRESH_AHEAD = 60
+# a token this close to expiry is not handed out anymore, callers wait for the refresh
+ACCESS_TOKEN_EXPIRY_MARGIN = 10
+
 
 class CyodaAuthService:
     """
     Auth service for interacting with the Cyoda API.
     Handles obtaining and caching a refresh token, fetching access tokens,
     and transparently re-authenticating if tokens are revoked.
+    Only one refresh runs at a time, on a worker thread, shared by all callers.
     """
 
     def __init__(self):
         self._refresh_token: Optional[str] = None
         self._access_token: Optional[str] = None
         self._access_token_expiry: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_future: Optional[Future] = None
+        # the http calls run here, so event loops never block on them and every caller,
+        # whatever loop or thread it runs on, can wait for the same in-flight refresh
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cyoda-auth")
 
-    def invalidate_tokens(self):
+    def invalidate_tokens(self, stale_token: Optional[str] = None):
         """
         Wipe any cached tokens so the next request does a full login.
+        If stale_token is given, only do so if it is still the current access token,
+        so callers rejected with the same token do not all log in again.
         """
-        logger.info("Invalidating cached tokens")
-        self._refresh_token = None
-        self._access_token = None
-        self._access_token_expiry = None
+        with self._lock:
+            if stale_token and stale_token != self._access_token:
+                return
+            logger.info("Invalidating cached tokens")
+            self._refresh_token = None
+            self._access_token = None
+            self._access_token_expiry = None
 
     def _login(self) -> str:
         """
@@ -45,7 +66,7 @@ class CyodaAuthService:
         payload = json.dumps(credentials)
 
         logger.info(f"Authenticating with Cyoda API at {login_url}")
-        resp = requests.post(login_url, headers=headers, data=payload)
+        resp = requests.post(login_url, headers=headers, data=payload, timeout=AUTH_REQUEST_TIMEOUT)
 
         if resp.status_code != 200:
             logger.error(f"Login failed ({resp.status_code}): {resp.text}")
@@ -75,7 +96,7 @@ class CyodaAuthService:
         }
 
         logger.info(f"Refreshing access token at {token_url}")
-        resp = requests.get(token_url, headers=headers)
+        resp = requests.get(token_url, headers=headers, timeout=AUTH_REQUEST_TIMEOUT)
 
         # If the refresh token has been revoked or is invalid:
         if resp.status_code in (401, 403):
@@ -97,20 +118,59 @@ class CyodaAuthService:
             logger.error("No access token found in token response")
             raise RuntimeError("Access token missing in token response")
 
-        self._access_token = token
-        self._access_token_expiry = (
-            time.time() + float(expiry)
-            if expiry is not None else time.time() + 300
-        )
+        with self._lock:
+            self._access_token = token
+            self._access_token_expiry = (
+                time.time() + float(expiry)
+                if expiry is not None else time.time() + 300
+            )
 
         logger.info("Successfully obtained access token")
 
     def get_access_token(self) -> str:
         """
-        Returns a valid access token, refreshing it if it's missing,
-        expired, or about to expire within 60 seconds.
+        Returns a valid access token, blocking until it is refreshed if it is missing or expired.
+        Thread-safe facade for callers outside an event loop, like the gRPC metadata plugin.
+        """
+        token, refresh = self._current_token()
+        return token if token else refresh.result()
+
+    async def get_access_token_async(self) -> str:
+        """
+        Returns a valid access token without blocking the event loop. Concurrent callers,
+        on any loop or thread, await the same in-flight refresh.
+        """
+        token, refresh = self._current_token()
+        return token if token else await asyncio.wrap_future(refresh)
+
+    def _current_token(self) -> Tuple[Optional[str], Optional[Future]]:
+        """
+        Returns the access token if it is still valid, else the refresh to wait for.
+        A token about to expire is still returned while a refresh runs in the background.
         """
         now = time.time()
-        if (not self._access_token) or (self._access_token_expiry is not None and now >= self._access_token_expiry - 60):
+        with self._lock:
+            token = self._access_token
+            expiry = self._access_token_expiry
+            if token and (expiry is None or now < expiry - ACCESS_TOKEN_REFRESH_AHEAD):
+                return token, None
+            refresh = self._start_refresh()
+            if token and now < expiry - ACCESS_TOKEN_EXPIRY_MARGIN:
+                return token, None
+            return None, refresh
+
+    def _start_refresh(self) -> Future:
+        # called with self._lock held
+        if self._refresh_future is None or self._refresh_future.done():
+            metrics.increment("cyoda_auth.refreshes")
+            self._refresh_future = self._executor.submit(self._run_refresh)
+        return self._refresh_future
+
+    def _run_refresh(self) -> str:
+        try:
             self._refresh_access_token()
-        return self._access_token
\ No newline at end of file
+        except Exception:
+            metrics.increment("cyoda_auth.refresh_failures")
+            raise
+        with self._lock:
+            return self._access_token
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import jwt
+
+from common.config.config import config
+from common.utils.metrics import metrics
+from common.utils.utils import send_request
+
+try:
+    import cryptography  # noqa: F401
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# asymmetric algorithms only, a key set must never make us accept "none" or a shared secret
+ALLOWED_ALGORITHMS = ["RS256", "RS384", "RS512", "PS256", "PS384", "PS512", "ES256", "ES384", "ES512"]
+# algorithms a key can verify, by the key's JWK kty
+KEY_TYPE_ALGORITHM_PREFIXES = {"RSA": ("RS", "PS"), "EC": ("ES",)}
+JWKS_REQUEST_TIMEOUT = 10.0
+
+
+class JwksKeyStore:
+    """
+    Cyoda's token signing keys, fetched from a JWKS endpoint and/or configured as a PEM public key.
+    The key set is refetched after ttl seconds, and early when a token names a key id we do not
+    know (key rotation), but not more often than every min_refresh_interval seconds.
+    """
+
+    def __init__(self, jwks_url: str, public_key: str, ttl: float, min_refresh_interval: float):
+        self.jwks_url = jwks_url
+        self.public_key = public_key.replace("\\n", "\n") if public_key else None
+        self._pem_key = _load_pem_key(self.public_key) if self.public_key else None
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._fetch_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.jwks_url or self._pem_key) and CRYPTOGRAPHY_AVAILABLE
+
+    async def get_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        """
+        Signing key for the key id, None if it is unknown. Without a kid only the
+        configured public key applies.
+        """
+        if not kid or not self.jwks_url:
+            return self._configured_key()
+        key = self._keys.get(kid)
+        now = time.monotonic()
+        stale = self._fetched_at is None or now - self._fetched_at >= self.ttl
+        if (key is None or stale) and self._claim_fetch(now):
+            await self._fetch()
+            key = self._keys.get(kid)
+        return key
+
+    def _configured_key(self) -> Optional["_PemKey"]:
+        return self._pem_key
+
+    def _claim_fetch(self, now: float) -> bool:
+        # one fetch per interval, concurrent callers keep using what we have (or fall back)
+        with self._lock:
+            if self._fetch_started_at is not None and now - self._fetch_started_at < self.min_refresh_interval:
+                return False
+            self._fetch_started_at = now
+            return True
+
+    async def _fetch(self) -> None:
+        try:
+            resp = await send_request({"Accept": "application/json"}, self.jwks_url, "GET",
+                                      timeout=JWKS_REQUEST_TIMEOUT)
+            if resp.get("status") != 200 or not isinstance(resp.get("json"), dict):
+                raise ValueError(f"unexpected JWKS response status={resp.get('status')}")
+            keys = {}
+            for jwk in resp["json"].get("keys", []):
+                if jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+                    continue
+                try:
+                    keys[jwk["kid"]] = jwt.PyJWK(jwk)
+                except jwt.PyJWTError as e:
+                    logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+            # replace the whole set, keys retired by the issuer stop being accepted
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            metrics.increment("jwks.fetches")
+            logger.info(f"Fetched {len(keys)} signing keys from {self.jwks_url}")
+        except Exception as e:
+            metrics.increment("jwks.fetch_failures")
+            logger.exception(f"Failed to fetch JWKS from {self.jwks_url}: {e}")
+
+
+class _PemKey:
+    """Configured PEM public key, shaped like the PyJWK attributes we use."""
+
+    def __init__(self, pem: str):
+        self.key = pem
+        self.algorithm_name = None
+        self.key_type = None
+        if not CRYPTOGRAPHY_AVAILABLE:
+            return
+        from cryptography.hazmat.primitives.asymmetric import ec, rsa
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+        public_key = load_pem_public_key(pem.encode())
+        self.key = public_key
+        if isinstance(public_key, rsa.RSAPublicKey):
+            self.key_type = "RSA"
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            self.key_type = "EC"
+
+
+def _load_pem_key(pem: str) -> Optional[_PemKey]:
+    """
+    The configured public key, None if it cannot verify tokens, so tokens it would
+    have checked are validated by Cyoda instead of all being rejected.
+    """
+    try:
+        key = _PemKey(pem)
+    except ValueError as e:
+        logger.error(f"CYODA_JWT_PUBLIC_KEY is not a valid PEM public key, tokens are validated by Cyoda: {e}")
+        return None
+    if CRYPTOGRAPHY_AVAILABLE and key.key_type is None:
+        logger.error("CYODA_JWT_PUBLIC_KEY is neither an RSA nor an EC key, tokens are validated by Cyoda")
+        return None
+    return key
+
+
+def _algorithm_fits_key(algorithm: str, key_type: Optional[str]) -> bool:
+    return algorithm[:2] in KEY_TYPE_ALGORITHM_PREFIXES.get(key_type, ())
+
+
+async def verify_token_locally(token: str, key_store: Optional[JwksKeyStore] = None) -> Optional[dict]:
+    """
+    Verifies the token's signature and expiry with Cyoda's signing keys.
+    Returns the claims, or None if no key for the token is known and Cyoda has to be asked.
+    Raises jwt.PyJWTError if the token is invalid or does not fit its key.
+    """
+    key_store = key_store or jwks_keys
+    if not key_store.enabled:
+        return None
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm not in ALLOWED_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(f"Token algorithm {algorithm} is not allowed")
+    key = await key_store.get_key(header.get("kid"))
+    if key is None:
+        metrics.increment("jwks.unknown_kid")
+        return None
+    if (key.algorithm_name and key.algorithm_name != algorithm) or not _algorithm_fits_key(algorithm, key.key_type):
+        raise jwt.InvalidAlgorithmError(f"Token algorithm {algorithm} does not match its key")
+    claims = jwt.decode(token, key.key, algorithms=[algorithm], options={"verify_aud": False})
+    metrics.increment("jwks.local_verifications")
+    return claims
+
+
+jwks_keys = JwksKeyStore(jwks_url=config.CYODA_JWKS_URL,
+                         public_key=config.CYODA_JWT_PUBLIC_KEY,
+                         ttl=config.JWKS_CACHE_TTL,
+                         min_refresh_interval=config.JWKS_MIN_REFRESH_INTERVAL)
+
+if config.CYODA_LOCAL_TOKEN_VERIFICATION and not jwks_keys.enabled:
+    logger.warning("CYODA_LOCAL_TOKEN_VERIFICATION is on but no CYODA_JWKS_URL/CYODA_JWT_PUBLIC_KEY is configured "
+                   "or the 'cryptography' package is missing; tokens are validated by Cyoda")
@@ -0,0 +1,86 @@
+import hashlib
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import jwt
+
+from common.config.config import config
+from common.utils.cache import MemoryCache
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# token -> unverified claims, alive for the duration of one HTTP request
+_request_claims: ContextVar[Optional[Dict[str, dict]]] = ContextVar("token_cache_request_claims", default=None)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenValidationCache:
+    """
+    Remembers which bearer tokens Cyoda accepted or rejected, keyed by the token's hash.
+    Accepted tokens are trusted until their `exp` claim, at most max_ttl seconds, so a token
+    revoked upstream keeps working for up to max_ttl. Rejected tokens are remembered for
+    negative_ttl seconds, so a client retrying with a bad token does not hit Cyoda every time.
+    """
+
+    def __init__(self, max_ttl: float, negative_ttl: float, max_bytes: int):
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self._results = MemoryCache("token_validations", max_bytes=max_bytes, ttl=max_ttl)
+
+    @staticmethod
+    def begin_request() -> None:
+        _request_claims.set({})
+
+    @staticmethod
+    def end_request() -> None:
+        _request_claims.set(None)
+
+    @staticmethod
+    def claims(token: str) -> dict:
+        """
+        Claims of the token, decoded without verifying the signature, once per request.
+        Raises jwt.InvalidTokenError like jwt.decode.
+        """
+        request_claims = _request_claims.get()
+        if request_claims is not None and token in request_claims:
+            return request_claims[token]
+        decoded = jwt.decode(token, options={"verify_signature": False})
+        if request_claims is not None:
+            request_claims[token] = decoded
+        return decoded
+
+    def is_valid(self, token: str) -> Optional[bool]:
+        """True/False if Cyoda's verdict on the token is cached, else None."""
+        if not self.max_ttl:
+            return None
+        return self._results.get(_token_key(token))
+
+    def set_valid(self, token: str) -> None:
+        ttl = self.max_ttl
+        try:
+            expires_at = self.claims(token).get("exp")
+        except jwt.InvalidTokenError:
+            expires_at = None
+        if expires_at is not None:
+            ttl = min(ttl, float(expires_at) - time.time())
+        if ttl > 0:
+            self._results.set(_token_key(token), True, ttl=ttl)
+
+    def set_rejected(self, token: str) -> None:
+        metrics.increment("token_validations.rejected")
+        if self.max_ttl and self.negative_ttl > 0:
+            self._results.set(_token_key(token), False, ttl=self.negative_ttl)
+
+    def clear(self) -> None:
+        self._results.clear()
+
+
+token_validations = TokenValidationCache(max_ttl=config.TOKEN_VALIDATION_CACHE_MAX_TTL,
+                                         negative_ttl=config.TOKEN_VALIDATION_NEGATIVE_TTL,
+                                         max_bytes=config.TOKEN_VALIDATION_CACHE_MAX_BYTES)
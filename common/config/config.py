@@ -77,6 +77,13 @@ class Config:
         self.GRPC_PROCESSOR_TAG = _get_env("GRPC_PROCESSOR_TAG", default="ai_assistant")
         self.CHAT_REPOSITORY = _get_env("CHAT_REPOSITORY", default="local")
         self.GH_TOKEN = _get_env("GH_TOKEN")
+        # empty disables the on-disk edge message cache tier
+        self.EDGE_MESSAGE_CACHE_DISK_PATH = _get_env("EDGE_MESSAGE_CACHE_DISK_PATH", default="")
+        self.CYODA_JWKS_URL = _get_env("CYODA_JWKS_URL", default="")
+        # PEM, "\n" escapes allowed; used for tokens without a kid or when there is no JWKS
+        self.CYODA_JWT_PUBLIC_KEY = _get_env("CYODA_JWT_PUBLIC_KEY", default="")
+        # empty keeps cached completions in memory only
+        self.COMPLETION_CACHE_DISK_PATH = _get_env("COMPLETION_CACHE_DISK_PATH", default="")
 
         # GitHub repository defaults
         self.GH_DEFAULT_OWNER = _get_env("GH_DEFAULT_OWNER", default="Cyoda-platform")
@@ -98,9 +105,62 @@ class Config:
         )
         self.MAX_SESSIONS_PER_IP = _get_int_env("MAX_SESSIONS_PER_IP", default=100)
         self.GUEST_TOKEN_LIMIT = _get_int_env("GUEST_TOKEN_LIMIT", default=10)
+        self.HTTP_POOL_MAX_CONNECTIONS = _get_int_env("HTTP_POOL_MAX_CONNECTIONS", default=100)
+        self.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS = _get_int_env("HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS", default=20)
+        self.HTTP_POOL_KEEPALIVE_EXPIRY = _get_int_env("HTTP_POOL_KEEPALIVE_EXPIRY", default=30)
+        self.CYODA_MAX_RETRY_ATTEMPTS = _get_int_env("CYODA_MAX_RETRY_ATTEMPTS", default=5)
+        self.CYODA_REQUEST_DEADLINE = _get_int_env("CYODA_REQUEST_DEADLINE", default=180)
+        self.CYODA_CIRCUIT_FAILURE_THRESHOLD = _get_int_env("CYODA_CIRCUIT_FAILURE_THRESHOLD", default=10)
+        self.CYODA_CIRCUIT_RESET_TIMEOUT = _get_int_env("CYODA_CIRCUIT_RESET_TIMEOUT", default=30)
+        self.CYODA_FETCH_CONCURRENCY = _get_int_env("CYODA_FETCH_CONCURRENCY", default=16)
+        self.CYODA_SEARCH_PREFETCH_PAGES = _get_int_env("CYODA_SEARCH_PREFETCH_PAGES", default=4)
+        self.CYODA_SEARCH_TIMEOUT = _get_int_env("CYODA_SEARCH_TIMEOUT", default=60)
+        self.CYODA_SYNC_SEARCH_LIMIT = _get_int_env("CYODA_SYNC_SEARCH_LIMIT", default=100)
+        self.QUERY_CACHE_TTL = _get_int_env("QUERY_CACHE_TTL", default=5)
+        self.QUERY_CACHE_MAX_BYTES = _get_int_env("QUERY_CACHE_MAX_BYTES", default=16 * 1024 * 1024)
+        self.LIST_CHATS_CONCURRENCY = _get_int_env("LIST_CHATS_CONCURRENCY", default=4)
+        self.EDGE_MESSAGE_CACHE_MAX_BYTES = _get_int_env("EDGE_MESSAGE_CACHE_MAX_BYTES", default=64 * 1024 * 1024)
+        self.EDGE_MESSAGE_CACHE_TTL = _get_int_env("EDGE_MESSAGE_CACHE_TTL", default=0)
+        self.EDGE_MESSAGE_CACHE_DISK_MAX_BYTES = _get_int_env("EDGE_MESSAGE_CACHE_DISK_MAX_BYTES",
+                                                             default=1024 * 1024 * 1024)
+        self.DIALOGUE_SNAPSHOT_MAX_BYTES = _get_int_env("DIALOGUE_SNAPSHOT_MAX_BYTES", default=64 * 1024 * 1024)
+        self.DIALOGUE_SNAPSHOT_TTL = _get_int_env("DIALOGUE_SNAPSHOT_TTL", default=300)
+        self.GRPC_WORKERS = _get_int_env("GRPC_WORKERS", default=16)
+        # calculation requests beyond this are answered with a retryable overload error
+        self.GRPC_MAX_QUEUED_REQUESTS = _get_int_env("GRPC_MAX_QUEUED_REQUESTS", default=256)
+        self.GRPC_PROCESSOR_CONCURRENCY = _get_int_env("GRPC_PROCESSOR_CONCURRENCY", default=8)
+        # per processor/criteria overrides, e.g. "build_general_application=2,web_search=4"
+        self.GRPC_PROCESSOR_CONCURRENCY_LIMITS = {
+            name.strip(): int(limit)
+            for name, limit in (item.split("=", 1) for item in
+                                _get_env("GRPC_PROCESSOR_CONCURRENCY_LIMITS", default="").split(",") if "=" in item)
+        }
+        # how long a token Cyoda accepted is trusted without asking again (capped by its exp), 0 disables
+        self.TOKEN_VALIDATION_CACHE_MAX_TTL = _get_int_env("TOKEN_VALIDATION_CACHE_MAX_TTL", default=300)
+        self.TOKEN_VALIDATION_NEGATIVE_TTL = _get_int_env("TOKEN_VALIDATION_NEGATIVE_TTL", default=30)
+        self.TOKEN_VALIDATION_CACHE_MAX_BYTES = _get_int_env("TOKEN_VALIDATION_CACHE_MAX_BYTES",
+                                                            default=4 * 1024 * 1024)
+        # 0 disables the completion cache
+        self.COMPLETION_CACHE_TTL = _get_int_env("COMPLETION_CACHE_TTL", default=24 * 60 * 60)
+        self.COMPLETION_CACHE_MAX_BYTES = _get_int_env("COMPLETION_CACHE_MAX_BYTES", default=32 * 1024 * 1024)
+        self.COMPLETION_CACHE_DISK_MAX_BYTES = _get_int_env("COMPLETION_CACHE_DISK_MAX_BYTES",
+                                                           default=512 * 1024 * 1024)
+
+        # tokens of memory sent with a completion unless the model config sets memory_token_budget,
+        # 0 allows the whole context window
+        self.MEMORY_TOKEN_BUDGET = _get_int_env("MEMORY_TOKEN_BUDGET", default=32000)
+
+        self.JWKS_CACHE_TTL = _get_int_env("JWKS_CACHE_TTL", default=60 * 60)
+        # unknown key ids trigger a JWKS refetch at most this often
+        self.JWKS_MIN_REFRESH_INTERVAL = _get_int_env("JWKS_MIN_REFRESH_INTERVAL", default=30)
 
         # — optional bool —
         self.ENABLE_AUTH = _get_env("ENABLE_AUTH", default="true").lower() == "true"
+        self.HTTP2_ENABLED = _get_env("HTTP2_ENABLED", default="true").lower() == "true"
+        self.CYODA_SYNC_SEARCH_ENABLED = _get_env("CYODA_SYNC_SEARCH_ENABLED", default="false").lower() == "true"
+        # verify Cyoda tokens against CYODA_JWKS_URL / CYODA_JWT_PUBLIC_KEY instead of calling Cyoda
+        self.CYODA_LOCAL_TOKEN_VERIFICATION = _get_env("CYODA_LOCAL_TOKEN_VERIFICATION",
+                                                       default="false").lower() == "true"
 
         # — hard-coded constants —
         self.MAX_TEXT_SIZE = 50 * 1024
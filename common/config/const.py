@@ -98,6 +98,7 @@ class ModelName(str, Enum):
     QUESTIONS_QUEUE = "questions_queue"
     CHAT_BUSINESS_ENTITY = "chat_business_entity"
     CHAT_MEMORY = "chat_memory"
+    CHAT_MEMORY_PAGE = "chat_memory_page"
     FLOW_EDGE_MESSAGE = "flow_edge_message"
     AI_MEMORY_EDGE_MESSAGE = "ai_memory_edge_message"
     EDGE_MESSAGE_STORE = "edge_message_store"
@@ -251,6 +252,48 @@ CYODA_PAGE_SIZE = 100
 MAX_SCHEDULER_POLLS = 120
 MAX_GUEST_CHAT_MESSAGES = 300
 MAX_CHAT_MESSAGES = 1500
+MAX_CHATS_PAGE_SIZE = 100
+# p95 budget for opening a chat (dialogue + processing data), exceeding it is logged
+GET_CHAT_LATENCY_TARGET_MS = 1500
+# a chat whose child entity just got new messages is not snapshotted until the change is persisted
+DIALOGUE_SNAPSHOT_SETTLE_SECONDS = 30
+# a snapshot checked against the persisted chat this recently answers conditional update polls
+# without loading the chat, changes made by other processes show up after at most this long
+DIALOGUE_SNAPSHOT_FRESH_SECONDS = 5
+CHAT_EVENTS_QUEUE_SIZE = 100
+CHAT_EVENTS_KEEPALIVE_SECONDS = 15
+CHAT_PARTIAL_ANSWER_INTERVAL_SECONDS = 0.1
+PROCESSOR_ADDRESS_TTL = 60
+WORKFLOW_NAME_INDEX_MAX_BYTES = 4 * 1024 * 1024
+# number of message references per sealed chat memory page
+CHAT_MEMORY_PAGE_SIZE = 100
+CHAT_MEMORY_PAGE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# context window (tokens) per model, bounds the memory sent with each completion
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 128000
+# memory messages are fetched newest first in chunks of this size until the token budget is spent
+MEMORY_LOAD_CHUNK_SIZE = 50
+MEMORY_ROLLUP_MAX_TOKENS = 1000
+MEMORY_ROLLUP_PROMPT = ("Summarize the earlier part of this conversation for your own future reference. "
+                        "Keep decisions, requirements, names, identifiers and open questions, drop small talk.")
+# structured output errors listed in one repair message
+SCHEMA_VALIDATION_MAX_ERRORS = 20
+SCHEMA_VALIDATION_ERROR_MAX_LENGTH = 200
+# read-only tools that may run concurrently with other tool calls of the same completion,
+# every other tool (including newly added ones) runs one at a time
+PARALLEL_SAFE_TOOL_FUNCTIONS = frozenset({
+    "web_search", "read_link", "web_scrape", "get_cyoda_guidelines", "read_file", "get_file_contents",
+    "list_directory_files", "get_entity_pojo_contents", "get_entities_list", "resolve_entity_name",
+    "get_repository_info", "get_env_deploy_status", "get_build_id_from_context", "get_user_info",
+    "get_weather", "get_humidity", "is_stage_completed", "not_stage_completed", "is_chat_locked",
+    "is_chat_unlocked",
+})
 SCHEDULER_STATUS_WAITING = "waiting"
 UI_FUNCTION_PREFIX = "ui_function"
 
@@ -5,12 +5,18 @@ from common.exception.exceptions import (
     TokenExpiredException,
     ChatNotFoundException,
     GuestChatsLimitExceededException,
-    RequestLimitExceededException
+    RequestLimitExceededException,
+    CircuitOpenException,
+    InvalidRequestException
 )
 from quart_rate_limiter import RateLimitExceeded
 
 logger = logging.getLogger(__name__)
 
+async def handle_400(error):
+    logger.exception(error)
+    return jsonify({'error': str(error)}), 400
+
 async def handle_401(error):
     logger.exception(error)
     return jsonify({'error': str(error)}), 401
@@ -27,15 +33,21 @@ async def handle_429(error):
     logger.exception(error)
     return jsonify({'error': str(error)}), 429
 
+async def handle_503(error):
+    logger.exception(error)
+    return jsonify({'error': str(error)}), 503
+
 async def handle_500(error):
     logger.exception(error)
     return jsonify({'error': 'Internal server error'}), 500
 
 def init_error_handlers(app):
+    app.errorhandler(InvalidRequestException)(handle_400)
     app.errorhandler(InvalidTokenException)(handle_401)
     app.errorhandler(TokenExpiredException)(handle_401)
     app.errorhandler(ChatNotFoundException)(handle_404)
     app.errorhandler(GuestChatsLimitExceededException)(handle_403)
     app.errorhandler(RequestLimitExceededException)(handle_429)
     app.errorhandler(RateLimitExceeded)(handle_429)
+    app.errorhandler(CircuitOpenException)(handle_503)
     app.errorhandler(Exception)(handle_500)
@@ -29,4 +29,18 @@ class GuestChatsLimitExceededException(Exception):
     def __init__(self, message="Sorry, max guest chat limit exceeded. Please sign up."):
         self.message = message
         self.status_code = 403
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class CircuitOpenException(Exception):
+    """Raised when the circuit breaker for a backend host is open."""
+    def __init__(self, message="Service temporarily unavailable"):
+        self.message = message
+        self.status_code = 503
+        super().__init__(message)
+
+class InvalidRequestException(Exception):
+    """Raised when request parameters are malformed."""
+    def __init__(self, message="Invalid request"):
+        self.message = message
+        self.status_code = 400
+        super().__init__(message)
@@ -9,6 +9,7 @@ from cloudevents_pb2 import CloudEvent
 from common.config import config
 from common.config.config import config
 from common.utils.event_loop import BackgroundEventLoop
+from common.utils.worker_pool import PriorityWorkerPool
 from cyoda_cloud_api_pb2_grpc import CloudEventsServiceStub
 from entity.model import WorkflowEntity
 from entity.model_registry import model_registry
@@ -27,6 +28,10 @@ GREET_EVENT_TYPE = "CalculationMemberGreetEvent"
 KEEP_ALIVE_EVENT_TYPE = "CalculationMemberKeepAliveEvent"
 EVENT_ACK_TYPE = "EventAckResponse"
 ERROR_EVENT_TYPE = "ErrorEvent"
+OVERLOADED_ERROR_CODE = "OVERLOADED"
+# worker pool priorities, lower runs first: criteria checks are cheap and gate transitions
+CRITERIA_PRIORITY = 0
+PROCESSOR_PRIORITY = 1
 
 
 logger = logging.getLogger(__name__)
@@ -38,6 +43,13 @@ class GrpcClient:
         self.auth = auth
         self.chat_service = chat_service
         self.processor_loop = BackgroundEventLoop()
+        self.calc_workers = PriorityWorkerPool(
+            "grpc_calc_requests",
+            workers=config.GRPC_WORKERS,
+            max_queued=config.GRPC_MAX_QUEUED_REQUESTS,
+            default_key_limit=config.GRPC_PROCESSOR_CONCURRENCY,
+            key_limits=config.GRPC_PROCESSOR_CONCURRENCY_LIMITS,
+        )
 
     def metadata_callback(self, context, callback):
         """
@@ -84,39 +96,65 @@ class GrpcClient:
             },
         )
 
-    def create_notification_event(self, data: dict, type: str, response=None) -> CloudEvent:
+    def create_notification_event(self, data: dict, type: str, response=None, error: dict = None) -> CloudEvent:
         if type == CALC_REQ_EVENT_TYPE:
             event_id = str(uuid.uuid4())
-            return self.create_cloud_event(
-                event_id=event_id,
-                source=SOURCE,
-                event_type=CALC_RESP_EVENT_TYPE,
-                data={
-                    "id": event_id,  # Required by BaseEvent schema
-                    "requestId": data.get('requestId'),
-                    "entityId": data.get('entityId'),
-                    "owner": OWNER,
-                    "payload": data.get('payload'),
-                    "success": True
-                }
-            )
+            event_data = {
+                "id": event_id,  # Required by BaseEvent schema
+                "requestId": data.get('requestId'),
+                "entityId": data.get('entityId'),
+                "owner": OWNER,
+                "payload": data.get('payload'),
+                "success": True
+            }
+            event_type = CALC_RESP_EVENT_TYPE
         elif type == CRITERIA_CALC_REQ_EVENT_TYPE:
             event_id = str(uuid.uuid4())
-            return self.create_cloud_event(
-                event_id=event_id,
-                source=SOURCE,
-                event_type=CRITERIA_CALC_RESP_EVENT_TYPE,
-                data={
-                    "id": event_id,  # Required by BaseEvent schema
-                    "requestId": data.get('requestId'),
-                    "entityId": data.get('entityId'),
-                    "owner": OWNER,
-                    "matches": response,
-                    "success": True
-                }
-            )
+            event_data = {
+                "id": event_id,  # Required by BaseEvent schema
+                "requestId": data.get('requestId'),
+                "entityId": data.get('entityId'),
+                "owner": OWNER,
+                "matches": response,
+                "success": True
+            }
+            event_type = CRITERIA_CALC_RESP_EVENT_TYPE
         else:
             raise ValueError(f"Unsupported notification type: {type}")
+        if error:
+            event_data.update(success=False, error=error)
+        return self.create_cloud_event(
+            event_id=event_id,
+            source=SOURCE,
+            event_type=event_type,
+            data=event_data
+        )
+
+    def submit_calc_req_event(self, data: dict, queue: asyncio.Queue, type: str) -> bool:
+        """
+        Queues the calculation request on the worker pool, criteria checks ahead of processors.
+        Requests for the same entity run one after another in arrival order, as they read and
+        write the same entity, chat memory and finished_flow. If the pool is full the request is
+        refused right away with a retryable error, so Cyoda can back off instead of waiting for
+        a timeout.
+        """
+        is_criteria = type == CRITERIA_CALC_REQ_EVENT_TYPE
+        processor_name = data.get('criteriaName') if is_criteria else data.get('processorName')
+        accepted = self.calc_workers.submit(
+            lambda: self.process_calc_req_event(data, queue, type),
+            priority=CRITERIA_PRIORITY if is_criteria else PROCESSOR_PRIORITY,
+            key=processor_name or "",
+            serial_key=data.get('entityId'),
+        )
+        if not accepted:
+            logger.warning(f"[OVERLOAD] Refusing {type} - Processor: {processor_name}, EntityId: {data.get('entityId')}, "
+                           f"RequestId: {data.get('requestId')}, queued: {self.calc_workers.queued()}")
+            queue.put_nowait(self.create_notification_event(data=data, type=type, error={
+                "code": OVERLOADED_ERROR_CODE,
+                "message": f"Processor overloaded, {self.calc_workers.queued()} requests queued",
+                "retryable": True,
+            }))
+        return accepted
 
     def log_outgoing_event(self, event):
         """Log detailed information about outgoing events to server"""
@@ -307,7 +345,7 @@ class GrpcClient:
                             asyncio.create_task(self.handle_event_ack(response, queue))
                         elif response.type in (CALC_REQ_EVENT_TYPE, CRITERIA_CALC_REQ_EVENT_TYPE):
                             data = json.loads(response.text_data)
-                            asyncio.create_task(self.process_calc_req_event(data, queue, response.type))
+                            self.submit_calc_req_event(data, queue, response.type)
                         elif response.type == GREET_EVENT_TYPE:
                             asyncio.create_task(self.handle_greet_event(response, queue))
                         elif response.type == ERROR_EVENT_TYPE:
@@ -1,6 +1,7 @@
+import asyncio
 from abc import abstractmethod
 from enum import Enum
-from typing import List, Any, Optional, Dict
+from typing import List, Any, Optional, Dict, AsyncIterator
 
 from common.repository.repository import Repository
 
@@ -100,6 +101,19 @@ class CrudRepository(Repository):
         """
         pass
 
+    async def find_many_by_ids(self, meta, uuids: List[Any], concurrency: int = 16) -> List[Optional[Any]]:
+        """
+        Retrieves entities by their technical ids, preserving the input order.
+        Missing entities are returned as None.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def _fetch(uuid):
+            async with semaphore:
+                return await self.find_by_id(meta, uuid)
+
+        return list(await asyncio.gather(*(_fetch(uuid) for uuid in uuids)))
+
     @abstractmethod
     async def find_all_by_criteria(self, meta, criteria: Any) -> Optional[Any]:
         """
@@ -107,6 +121,13 @@ class CrudRepository(Repository):
         """
         pass
 
+    async def iter_all_by_criteria(self, meta, criteria: Any) -> AsyncIterator[Any]:
+        """
+        Yields entities matching the criteria as they become available.
+        """
+        for entity in await self.find_all_by_criteria(meta, criteria) or []:
+            yield entity
+
     @abstractmethod
     async def search_snapshot(
             self,
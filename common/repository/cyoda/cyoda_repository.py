@@ -3,10 +3,13 @@ import json
 import logging
 import time
 import asyncio
-from typing import List, Any, Optional, Tuple, Dict
+from collections import deque
+from typing import List, Any, Optional, Tuple, Dict, AsyncIterator
 import common.config.const as const
 from common.config.config import config
 from common.repository.crud_repository import CrudRepository
+from common.utils.cache import build_cache
+from common.utils.metrics import metrics
 from common.utils.utils import (
     custom_serializer,
     send_cyoda_request,
@@ -14,8 +17,30 @@ from common.utils.utils import (
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache for edge-message entities
-_edge_messages_cache = {}
+STATUS_POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+# Edge messages are immutable once written, so they are cached without invalidation
+_edge_messages_cache = build_cache(
+    "edge_messages",
+    max_bytes=config.EDGE_MESSAGE_CACHE_MAX_BYTES,
+    ttl=config.EDGE_MESSAGE_CACHE_TTL or None,
+    disk_path=config.EDGE_MESSAGE_CACHE_DISK_PATH or None,
+    disk_max_bytes=config.EDGE_MESSAGE_CACHE_DISK_MAX_BYTES,
+)
+
+
+def _extract_search_nodes(resp_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Extracts entity data from a search snapshot page, filling in technical_id and current_state.
+    """
+    entities = []
+    for node in resp_json.get("_embedded", {}).get("objectNodes", []):
+        data = node.get("data", {})
+        if not data.get("technical_id"):
+            data["technical_id"] = node.get("meta", {}).get("id")
+            data["current_state"] = node.get("meta", {}).get("state")
+        entities.append(data)
+    return entities
 
 
 class CyodaRepository(CrudRepository):
@@ -38,27 +63,41 @@ class CyodaRepository(CrudRepository):
     async def _wait_for_search_completion(
         self,
         snapshot_id: str,
-        timeout: float = 60.0,
-        interval: float = 0.3
+        timeout: float = config.CYODA_SEARCH_TIMEOUT,
+        initial_interval: float = 0.02,
+        max_interval: float = 1.0,
+        backoff: float = 2.0
     ) -> None:
         """
         Poll the snapshot status endpoint until SUCCESSFUL or error/timeout.
+        Checks start fast, since most snapshots finish within tens of milliseconds,
+        and back off exponentially up to max_interval within the timeout budget.
         """
         start = time.monotonic()
         status_path = f"search/snapshot/{snapshot_id}/status"
-
-        while True:
-            resp = await send_cyoda_request(cyoda_auth_service=self._cyoda_auth_service, method="get", path=status_path)
-            if resp.get("status") != 200:
-                return
-            status = resp.get("json", {}).get("snapshotStatus")
-            if status == "SUCCESSFUL":
-                return
-            if status not in ("RUNNING",):
-                raise Exception(f"Snapshot search failed: {resp.get('json')}")
-            if time.monotonic() - start > timeout:
-                raise TimeoutError(f"Timeout exceeded after {timeout} seconds")
-            await asyncio.sleep(interval)
+        interval = initial_interval
+        polls = 0
+
+        try:
+            while True:
+                resp = await send_cyoda_request(cyoda_auth_service=self._cyoda_auth_service, method="get",
+                                                path=status_path)
+                polls += 1
+                if resp.get("status") != 200:
+                    return
+                status = resp.get("json", {}).get("snapshotStatus")
+                if status == "SUCCESSFUL":
+                    return
+                if status not in ("RUNNING",):
+                    raise Exception(f"Snapshot search failed: {resp.get('json')}")
+                elapsed = time.monotonic() - start
+                if elapsed > timeout:
+                    raise TimeoutError(f"Timeout exceeded after {timeout} seconds")
+                await asyncio.sleep(min(interval, timeout - elapsed))
+                interval = min(interval * backoff, max_interval)
+        finally:
+            metrics.observe("cyoda_search.snapshot_wait_ms", (time.monotonic() - start) * 1000)
+            metrics.observe("cyoda_search.status_polls", polls, buckets=STATUS_POLL_BUCKETS)
 
     async def delete(self, meta, entity: Any) -> None:
         pass
@@ -114,15 +153,10 @@ class CyodaRepository(CrudRepository):
     async def find_by_id(self, meta, _uuid: Any) -> Optional[Any]:
         method = "get"
         if meta and meta.get("type") == config.CYODA_ENTITY_TYPE_EDGE_MESSAGE:
-            if _uuid in _edge_messages_cache:
-                return _edge_messages_cache[_uuid]
-            path = f"message/get/{_uuid}"
-            resp = await send_cyoda_request(cyoda_auth_service=self._cyoda_auth_service, method=method, path=path)
-            content = resp.get("json", {}).get("content", "{}")
-            data = json.loads(content).get("edge_message_content")
-            if data:
-                _edge_messages_cache[_uuid] = data
-            return data
+            cached = _edge_messages_cache.get(_uuid)
+            if cached is not None:
+                return cached
+            return await self._fetch_edge_message(_uuid)
 
         path = f"entity/{_uuid}"
 
@@ -142,7 +176,57 @@ class CyodaRepository(CrudRepository):
         data["technical_id"] = _uuid
         return data
 
+    async def find_many_by_ids(self, meta, uuids: List[Any],
+                               concurrency: int = config.CYODA_FETCH_CONCURRENCY) -> List[Optional[Any]]:
+        """
+        Fetches entities concurrently with a bounded fan-out, preserving the input order.
+        Cached edge messages are served without a round trip and duplicate ids are fetched once.
+        """
+        is_edge_message = bool(meta) and meta.get("type") == config.CYODA_ENTITY_TYPE_EDGE_MESSAGE
+        results = {
+            _uuid: _edge_messages_cache.get(_uuid) if is_edge_message else None
+            for _uuid in dict.fromkeys(uuids)
+        }
+        missing = [_uuid for _uuid, data in results.items() if data is None]
+        if is_edge_message:
+            semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+            async def _fetch(_uuid):
+                async with semaphore:
+                    return await self._fetch_edge_message(_uuid)
+
+            fetched = await asyncio.gather(*(_fetch(_uuid) for _uuid in missing))
+        else:
+            fetched = await super().find_many_by_ids(meta, missing, concurrency=concurrency)
+        results.update(zip(missing, fetched))
+        return [results[_uuid] for _uuid in uuids]
+
+    async def _fetch_edge_message(self, _uuid: Any) -> Optional[Any]:
+        path = f"message/get/{_uuid}"
+        resp = await send_cyoda_request(cyoda_auth_service=self._cyoda_auth_service, method="get", path=path)
+        content = resp.get("json", {}).get("content", "{}")
+        data = json.loads(content).get("edge_message_content")
+        if data:
+            _edge_messages_cache.set(_uuid, data)
+        return data
+
     async def find_all_by_criteria(self, meta, criteria: Any) -> List[Any]:
+        return [entity async for entity in self.iter_all_by_criteria(meta, criteria)]
+
+    async def iter_all_by_criteria(self, meta, criteria: Any,
+                                   prefetch_pages: int = config.CYODA_SEARCH_PREFETCH_PAGES) -> AsyncIterator[Any]:
+        """
+        Yields matching entities page by page, in order. Once totalPages is known the
+        next prefetch_pages pages are fetched concurrently while the caller consumes the current one.
+        """
+        start = time.monotonic()
+        if config.CYODA_SYNC_SEARCH_ENABLED:
+            entities = await self._sync_search(meta, criteria)
+            if entities is not None:
+                for entity in entities:
+                    yield entity
+                return
+
         # 1) trigger snapshot
         snap_path = f"search/snapshot/{meta['entity_model']}/{meta['entity_version']}"
         resp = await send_cyoda_request(
@@ -153,61 +237,91 @@ class CyodaRepository(CrudRepository):
         )
         snapshot_id = resp.get("json")
         if resp.get('status') == 404:
-            return []
+            return
 
         # 2) poll until ready
         await self._wait_for_search_completion(snapshot_id)
 
-        # 3) fetch all results, page by page
-        entities: List[Any] = []
-        page_number = 0
-        page_size = 100  # match your initial request
+        # 3) first request so we can read totalElements/totalPages
+        page_size = const.CYODA_PAGE_SIZE
+        resp_json = await self._fetch_search_page(snapshot_id, 0, page_size)
+        metrics.observe("cyoda_search.snapshot_first_page_ms", (time.monotonic() - start) * 1000)
+        if resp_json is None:
+            return
 
-        # first request so we can read totalElements/totalPages
-        result_resp = await send_cyoda_request(
-            cyoda_auth_service=self._cyoda_auth_service,
-            method="get",
-            path=f"search/snapshot/{snapshot_id}?pageSize={page_size}&pageNumber={page_number}"
-        )
-        if result_resp.get("status") != 200:
-            return []
-
-        resp_json = json.loads(result_resp.get("json", "{}"))
         page_info = resp_json.get("page", {})
-
         # **zero‐results guard**
         if page_info.get("totalElements", 0) == 0:
-            return []
+            return
 
         total_pages = page_info.get("totalPages", 1)
-
-        # helper to extract & normalize nodes
-        def _extract(nodes):
-            for node in nodes:
-                tree = node.get("data", {})
-                if not tree.get("technical_id"):
-                    tree["technical_id"] = node.get("meta", {}).get("id")
-                    tree["current_state"] = node.get("meta", {}).get("state")
-                entities.append(tree)
-
-        # process page 0
-        _extract(resp_json.get("_embedded", {}).get("objectNodes", []))
-
-        # fetch remaining pages (1 through total_pages-1)
-        for page_number in range(1, total_pages):
-            result_resp = await send_cyoda_request(
+        for entity in _extract_search_nodes(resp_json):
+            yield entity
+
+        # 4) remaining pages, keeping up to prefetch_pages requests in flight
+        pending = deque()
+        next_page = 1
+        try:
+            while next_page < total_pages or pending:
+                while next_page < total_pages and len(pending) < max(prefetch_pages, 1):
+                    pending.append(asyncio.create_task(self._fetch_search_page(snapshot_id, next_page, page_size)))
+                    next_page += 1
+                resp_json = await pending.popleft()
+                if resp_json is None:
+                    break
+                for entity in _extract_search_nodes(resp_json):
+                    yield entity
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _sync_search(self, meta, criteria: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Synchronous search for small result sets: one round trip, no snapshot or status polling.
+        Returns None when the caller should fall back to a snapshot search, i.e. the request
+        failed or the result may have been truncated at CYODA_SYNC_SEARCH_LIMIT.
+        """
+        start = time.monotonic()
+        limit = config.CYODA_SYNC_SEARCH_LIMIT
+        path = f"search/{meta['entity_model']}/{meta['entity_version']}?limit={limit}"
+        try:
+            resp = await send_cyoda_request(
                 cyoda_auth_service=self._cyoda_auth_service,
-                method="get",
-                path=f"search/snapshot/{snapshot_id}?pageSize={page_size}&pageNumber={page_number}"
+                method="post",
+                path=path,
+                data=json.dumps(criteria)
             )
-            if result_resp.get("status") != 200:
-                break  # or continue, per your error‐handling policy
-
-            resp_json = json.loads(result_resp.get("json", "{}"))
-            _extract(resp_json.get("_embedded", {}).get("objectNodes", []))
+        except Exception as e:
+            logger.warning(f"Synchronous search failed, falling back to snapshot search: {e}")
+            metrics.increment("cyoda_search.sync_fallbacks")
+            return None
+        if resp.get("status") == 404:
+            return []
+        if resp.get("status") != 200:
+            metrics.increment("cyoda_search.sync_fallbacks")
+            return None
 
+        body = resp.get("json")
+        if isinstance(body, str):
+            body = json.loads(body or "[]")
+        entities = _extract_search_nodes({"_embedded": {"objectNodes": body}} if isinstance(body, list) else body)
+        if len(entities) >= limit:
+            metrics.increment("cyoda_search.sync_fallbacks")
+            return None
+        metrics.observe("cyoda_search.sync_ms", (time.monotonic() - start) * 1000)
         return entities
 
+    async def _fetch_search_page(self, snapshot_id: str, page_number: int,
+                                 page_size: int) -> Optional[Dict[str, Any]]:
+        result_resp = await send_cyoda_request(
+            cyoda_auth_service=self._cyoda_auth_service,
+            method="get",
+            path=f"search/snapshot/{snapshot_id}?pageSize={page_size}&pageNumber={page_number}"
+        )
+        if result_resp.get("status") != 200:
+            return None
+        return json.loads(result_resp.get("json", "{}"))
+
     async def search_snapshot(
         self,
         meta: Dict[str, str],
@@ -253,17 +367,7 @@ class CyodaRepository(CrudRepository):
             return []
 
         body = json.loads(resp.get("json", "{}"))
-        nodes = body.get("_embedded", {}).get("objectNodes", [])
-        results: List[Dict[str, Any]] = []
-
-        for node in nodes:
-            data = node.get("data", {})
-            if not data.get("technical_id"):
-                data["technical_id"] = node.get("meta", {}).get("id")
-                data["current_state"] = node.get("meta", {}).get("state")
-            results.append(data)
-
-        return results
+        return _extract_search_nodes(body)
 
 
     async def save(self, meta, entity: Any) -> Any:
@@ -287,7 +391,7 @@ class CyodaRepository(CrudRepository):
             technical_id = result[0].get("entityIds", [None])[0]
 
         if meta.get("type") == config.CYODA_ENTITY_TYPE_EDGE_MESSAGE and technical_id:
-            _edge_messages_cache[technical_id] = entity
+            _edge_messages_cache.set(technical_id, entity)
 
         logger.info(f"Saved entity of type {meta.get("type")}, id: {technical_id}")
         return technical_id
@@ -1,19 +1,19 @@
 from common.config.config import config
+from common.service.query_cache import QueryResultCache
 
 
 class DataRetrievalService:
-    def __init__(self, cyoda_auth_service, entity_service, mock=False):
+    def __init__(self, cyoda_auth_service, entity_service, mock=False, query_cache: QueryResultCache = None):
         self.mock = mock
         self.cyoda_auth_service = cyoda_auth_service
         self.entity_service = entity_service
+        self.query_cache = query_cache
 
     # =============================
 
     async def get_entities_by_guest_user_id(self, guest_user_id, model):
-        return await self.entity_service.get_items_by_condition(
-            token=self.cyoda_auth_service,
-            entity_model=model,
-            entity_version=config.ENTITY_VERSION,
+        return await self._get_items_by_condition(
+            model=model,
             condition={
                 "cyoda": {
                     "operator": "AND",
@@ -34,34 +34,57 @@ class DataRetrievalService:
         )
 
     async def get_entities_by_user_name(self, user_id, model):
-        return await self.entity_service.get_items_by_condition(
+        return await self._get_items_by_condition(
+            model=model,
+            condition=self._user_name_condition(user_id)
+        )
+
+    async def _get_items_by_condition(self, model, condition):
+        key = self.query_cache.key(model, config.ENTITY_VERSION, condition) if self.query_cache else None
+        items = self.query_cache.get(key) if key else None
+        if items is None:
+            items = await self.entity_service.get_items_by_condition(
+                token=self.cyoda_auth_service,
+                entity_model=model,
+                entity_version=config.ENTITY_VERSION,
+                condition=condition
+            )
+            if key:
+                self.query_cache.set(key, items)
+        return items
+
+    def iter_entities_by_user_name(self, user_id, model):
+        """Stream the user's entities as search result pages arrive."""
+        return self.entity_service.iter_items_by_condition(
             token=self.cyoda_auth_service,
             entity_model=model,
             entity_version=config.ENTITY_VERSION,
-            condition={
-                "cyoda": {
-                    "operator": "AND",
-                    "conditions": [
-                        {
-                            "jsonPath": "$.user_id", "operatorType": "EQUALS",
-                            "value": user_id, "type": "simple"
-                        },
-                        {
-                            "field": "state", "operatorType": "INOT_EQUAL",
-                            "value": "deleted", "type": "lifecycle"
-                        }
-                    ],
-                    "type": "group"
-                },
-                "local": {"key": "user_id", "value": user_id}
-            }
+            condition=self._user_name_condition(user_id)
         )
 
+    @staticmethod
+    def _user_name_condition(user_id):
+        return {
+            "cyoda": {
+                "operator": "AND",
+                "conditions": [
+                    {
+                        "jsonPath": "$.user_id", "operatorType": "EQUALS",
+                        "value": user_id, "type": "simple"
+                    },
+                    {
+                        "field": "state", "operatorType": "INOT_EQUAL",
+                        "value": "deleted", "type": "lifecycle"
+                    }
+                ],
+                "type": "group"
+            },
+            "local": {"key": "user_id", "value": user_id}
+        }
+
     async def get_entities_by_user_name_and_workflow_name(self, user_id, model, workflow_name):
-        return await self.entity_service.get_items_by_condition(
-            token=self.cyoda_auth_service,
-            entity_model=model,
-            entity_version=config.ENTITY_VERSION,
+        return await self._get_items_by_condition(
+            model=model,
             condition={
                 "cyoda": {
                     "operator": "AND",
@@ -0,0 +1,135 @@
+import logging
+from typing import Optional
+
+import common.config.const as const
+from common.config.config import config
+from common.utils.cache import MemoryCache
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_MAX_NESTING = 32
+
+
+class DialogueSnapshotStore:
+    """
+    Materialized dialogue of each chat, so opening a chat only renders the finished_flow
+    entries appended since the snapshot was taken instead of the whole history.
+
+    A snapshot stays valid while the chat's finished_flow still starts with the entries it was
+    built from. Messages of child entities are nested inside the parent dialogue and cannot be
+    appended to it, so a message added to a child drops the snapshot of the chat containing it,
+    and that chat is not snapshotted again until the change had time to be persisted.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, settle_seconds: float,
+                 fresh_seconds: float = const.DIALOGUE_SNAPSHOT_FRESH_SECONDS):
+        self._snapshots = MemoryCache("dialogue_snapshots", max_bytes=max_bytes, ttl=ttl)
+        # child entity id -> id of the chat (or parent entity) whose dialogue includes it; routing
+        # must outlive the snapshots, so the entries only leave when the LRU needs the room
+        self._chat_by_child = MemoryCache("dialogue_snapshot_children", max_bytes=max(max_bytes // 16, 1))
+        self._unsettled = MemoryCache("dialogue_snapshot_unsettled", max_bytes=max(max_bytes // 64, 1),
+                                      ttl=settle_seconds)
+        # chat id -> version of the snapshot last found to cover the chat's whole finished_flow
+        self._verified = MemoryCache("dialogue_snapshot_verified", max_bytes=max(max_bytes // 64, 1),
+                                     ttl=fresh_seconds)
+
+    def get(self, chat_id: str, finished_flow: list) -> Optional[dict]:
+        """
+        Returns the snapshot of the chat if it is a prefix of finished_flow, else None.
+        The snapshot holds dialogue, child_entities, flow_length (number of finished_flow
+        entries it covers), last_modified and version.
+        """
+        if chat_id in self._unsettled:
+            return None
+        snapshot = self._snapshots.get(chat_id)
+        if snapshot is None:
+            return None
+        flow_length = snapshot["flow_length"]
+        if flow_length > len(finished_flow) or (
+                flow_length and finished_flow[flow_length - 1].edge_message_id != snapshot["last_edge_message_id"]):
+            # the flow was rewritten (e.g. rolled back), the snapshot no longer describes it
+            metrics.increment("dialogue_snapshots.stale")
+            self._snapshots.delete(chat_id)
+            return None
+        if flow_length == len(finished_flow):
+            self._verified.set(chat_id, snapshot["version"])
+        return snapshot
+
+    def current(self, chat_id: str) -> Optional[dict]:
+        """
+        The snapshot of the chat if it covered the chat's whole finished_flow within the last
+        fresh_seconds and nothing was appended to the chat or its child entities since, else None.
+        """
+        version = self._verified.get(chat_id)
+        if version is None or chat_id in self._unsettled:
+            return None
+        snapshot = self._snapshots.get(chat_id)
+        if snapshot is None or snapshot["version"] != version:
+            return None
+        return snapshot
+
+    def put(self, chat_id: str, finished_flow: list, dialogue: list, child_entities: set,
+            previous: Optional[dict] = None) -> Optional[dict]:
+        if chat_id in self._unsettled:
+            return None
+        last_entry = finished_flow[-1] if finished_flow else None
+        snapshot = {
+            "version": previous["version"] + 1 if previous else 1,
+            "flow_length": len(finished_flow),
+            "last_edge_message_id": last_entry.edge_message_id if last_entry else None,
+            "last_modified": last_entry.last_modified if last_entry else None,
+            "dialogue": dialogue,
+            "child_entities": sorted(child_entities),
+        }
+        self._snapshots.set(chat_id, snapshot)
+        self._verified.set(chat_id, snapshot["version"])
+        for child_id in child_entities:
+            self._chat_by_child.set(child_id, chat_id)
+        return snapshot
+
+    def chat_of(self, technical_id: str) -> str:
+        """
+        Id of the top level chat whose dialogue includes the given entity, as far as known,
+        the entity itself otherwise.
+        """
+        chat_id = technical_id
+        for _ in range(_MAX_NESTING):
+            parent_id = self._chat_by_child.get(chat_id)
+            if parent_id is None or parent_id == technical_id:
+                break
+            chat_id = parent_id
+        return chat_id
+
+    def children_added(self, technical_id: str, child_ids: list) -> None:
+        """
+        Records child entities launched by an entity before any snapshot has seen them,
+        so their messages can be routed to the chat right away.
+        """
+        for child_id in child_ids:
+            self._chat_by_child.set(child_id, technical_id)
+
+    def flow_appended(self, technical_id: str) -> None:
+        """
+        Called whenever a message is appended to the finished_flow of a chat or child entity.
+        Appends to a chat itself are picked up by the next get(), appends to one of its
+        child entities invalidate the chat's snapshot.
+        """
+        chat_id = self.chat_of(technical_id)
+        self._verified.delete(chat_id)
+        if chat_id == technical_id:
+            return
+        self._unsettled.set(chat_id, True)
+        self._snapshots.delete(chat_id)
+        metrics.increment("dialogue_snapshots.invalidations")
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._chat_by_child.clear()
+        self._unsettled.clear()
+        self._verified.clear()
+
+
+dialogue_snapshots = DialogueSnapshotStore(max_bytes=config.DIALOGUE_SNAPSHOT_MAX_BYTES,
+                                           ttl=config.DIALOGUE_SNAPSHOT_TTL,
+                                           settle_seconds=const.DIALOGUE_SNAPSHOT_SETTLE_SECONDS)
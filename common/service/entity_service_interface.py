@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Any
+from typing import List, Any, AsyncIterator
 
 class EntityService(ABC):
 
@@ -8,6 +8,15 @@ class EntityService(ABC):
         """Retrieve a single item based on its ID."""
         pass
 
+    @abstractmethod
+    async def get_items_by_ids(self, token: str, entity_model: str, entity_version: str, technical_ids: List[str],
+                               meta=None) -> List[Any]:
+        """
+        Retrieve multiple items by their IDs concurrently, preserving the order of technical_ids.
+        Items that could not be loaded come back as [], the same sentinel get_item returns.
+        """
+        pass
+
     @abstractmethod
     async def get_items(self, token: str, entity_model: str, entity_version: str) -> List[Any]:
         """Retrieve multiple items based on their IDs."""
@@ -23,6 +32,12 @@ class EntityService(ABC):
         """Retrieve multiple items based on their IDs."""
         pass
 
+    @abstractmethod
+    def iter_items_by_condition(self, token: str, entity_model: str, entity_version: str,
+                                condition: Any) -> AsyncIterator[Any]:
+        """Yield items matching the condition incrementally."""
+        pass
+
     @abstractmethod
     async def add_item(self, token: str, entity_model: str, entity_version: str, entity: Any, meta: Any = None) -> Any:
         """Add a new item to the repository."""
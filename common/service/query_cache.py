@@ -0,0 +1,80 @@
+import json
+import logging
+import pickle
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from common.utils.cache import MemoryCache
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# query key -> pickled result, alive for the duration of one HTTP request
+_request_results: ContextVar[Optional[Dict[str, bytes]]] = ContextVar("query_cache_request_results", default=None)
+
+
+class QueryResultCache:
+    """
+    Short-lived cache of condition search results keyed by (model, version, condition).
+    Results are kept for the current request and, for ttl seconds, shared across requests.
+    Every write to a model through EntityService bumps that model's generation, which
+    makes all of its cached queries unreachable.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self._shared = MemoryCache(
+            "query_results", max_bytes=max_bytes, ttl=ttl, dumps=pickle.dumps, loads=pickle.loads
+        ) if ttl > 0 else None
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def begin_request() -> None:
+        _request_results.set({})
+
+    @staticmethod
+    def end_request() -> None:
+        _request_results.set(None)
+
+    def key(self, entity_model: str, entity_version: str, condition: Any) -> str:
+        """
+        Build the cache key. Compute it before running the query and pass it to set(),
+        so a result computed before an invalidation is never stored under the new generation.
+        """
+        model = entity_model.lower()
+        with self._lock:
+            generation = self._generations[model]
+        return f"{model}:{entity_version}:{generation}:{json.dumps(condition, sort_keys=True, default=str)}"
+
+    def get(self, key: str) -> Optional[Any]:
+        request_results = _request_results.get()
+        encoded = request_results.get(key) if request_results is not None else None
+        if encoded is not None:
+            metrics.increment("query_cache.request_hits")
+            return pickle.loads(encoded)
+
+        encoded = self._shared.get_encoded(key) if self._shared else None
+        if encoded is None:
+            metrics.increment("query_cache.misses")
+            return None
+        metrics.increment("query_cache.shared_hits")
+        if request_results is not None:
+            request_results[key] = encoded
+        return pickle.loads(encoded)
+
+    def set(self, key: str, result: Any) -> None:
+        encoded = pickle.dumps(result)
+        request_results = _request_results.get()
+        if request_results is not None:
+            request_results[key] = encoded
+        if self._shared:
+            self._shared.set_encoded(key, encoded)
+
+    def invalidate(self, entity_model: Optional[str]) -> None:
+        if not entity_model:
+            return
+        with self._lock:
+            self._generations[entity_model.lower()] += 1
+        metrics.increment("query_cache.invalidations")
@@ -1,10 +1,11 @@
 import logging
 import threading
-from typing import Any, List
+from typing import Any, AsyncIterator, List
 
 from common.config.config import config
 from common.repository.crud_repository import CrudRepository
 from common.service.entity_service_interface import EntityService
+from common.service.query_cache import QueryResultCache
 from common.utils.utils import parse_entity
 
 logger = logging.getLogger(__name__)
@@ -17,8 +18,10 @@ class EntityServiceImpl(EntityService):
     _lock = threading.Lock()
     _repository: CrudRepository = None
     _model_registry: None
+    _query_cache: QueryResultCache = None
 
-    def __new__(cls, repository: CrudRepository = None, model_registry=None, mock=False):
+    def __new__(cls, repository: CrudRepository = None, model_registry=None, mock=False,
+                query_cache: QueryResultCache = None):
         logger.info("initializing CyodaService")
         # Ensuring only one instance is created
         if cls._instance is None:
@@ -29,9 +32,10 @@ class EntityServiceImpl(EntityService):
                     if repository is not None:
                         cls._instance._repository = repository
                     cls._model_registry = model_registry
+                    cls._instance._query_cache = query_cache
         return cls._instance
 
-    def __init__(self, repository: CrudRepository, model_registry):
+    def __init__(self, repository: CrudRepository, model_registry, query_cache: QueryResultCache = None):
         # You can leave this empty if no further initialization is required,
         # or add additional initialization app_init here if needed.
         pass
@@ -49,6 +53,28 @@ class EntityServiceImpl(EntityService):
             resp = parse_entity(model_cls, resp)
         return resp
 
+    async def get_items_by_ids(self, token: str, entity_model: str, entity_version: str, technical_ids: List[str],
+                               meta=None) -> List[Any]:
+        """
+        Retrieve multiple items by their IDs concurrently, preserving the order of technical_ids.
+        Items that could not be loaded come back as [], the same sentinel get_item returns.
+        """
+        if not technical_ids:
+            return []
+        repository_meta = await self._repository.get_meta(token, entity_model, entity_version)
+        if meta:
+            repository_meta.update(meta)
+        resp = await self._repository.find_many_by_ids(repository_meta, technical_ids)
+        model_cls = self._model_registry.get(entity_model.lower()) if entity_model else None
+        items = []
+        for technical_id, item in zip(technical_ids, resp):
+            if item and isinstance(item, dict) and item.get("errorMessage"):
+                logger.warning(f"Failed to load {entity_model} {technical_id}: {item.get('errorMessage')}")
+                items.append([])
+                continue
+            items.append(parse_entity(model_cls, item) if item is not None else [])
+        return items
+
     async def get_items(self, token: str, entity_model: str, entity_version: str) -> List[Any]:
         """Retrieve multiple items based on their IDs."""
         meta = await self._repository.get_meta(token, entity_model, entity_version)
@@ -71,12 +97,17 @@ class EntityServiceImpl(EntityService):
     async def get_items_by_condition(self, token: str, entity_model: str, entity_version: str, condition: Any,
                                      meta=None) -> List[Any]:
         """Retrieve multiple items based on their IDs."""
-        resp = await self._find_by_criteria(token, entity_model, entity_version, condition.get(config.CHAT_REPOSITORY))
-        if resp and isinstance(resp, dict) and resp.get("errorMessage"):
-            return []
+        return [item async for item in self.iter_items_by_condition(token, entity_model, entity_version, condition)]
+
+    async def iter_items_by_condition(self, token: str, entity_model: str, entity_version: str,
+                                      condition: Any) -> AsyncIterator[Any]:
+        """Yield items matching the condition as result pages arrive, without materializing all of them."""
+        meta = await self._repository.get_meta(token, entity_model, entity_version)
         model_cls = self._model_registry.get(entity_model.lower())
-        resp = parse_entity(model_cls, resp)
-        return resp
+        async for item in self._repository.iter_all_by_criteria(meta, condition.get(config.CHAT_REPOSITORY)):
+            entity = parse_entity(model_cls, item)
+            if entity is not None:
+                yield entity
 
     async def add_item(self, token: str, entity_model: str, entity_version: str, entity: Any, meta: Any = None) -> Any:
         """Add a new item to the repository."""
@@ -84,6 +115,7 @@ class EntityServiceImpl(EntityService):
         if meta:
             repository_meta.update(meta)
         resp = await self._repository.save(repository_meta, entity)
+        self._invalidate_queries(entity_model)
         return resp
 
     async def update_item(self, token: str, entity_model: str, entity_version: str, technical_id: str, entity: Any,
@@ -92,6 +124,7 @@ class EntityServiceImpl(EntityService):
         repository_meta = await self._repository.get_meta(token, entity_model, entity_version)
         meta.update(repository_meta)
         resp = await self._repository.update(meta=meta, technical_id=technical_id, entity=entity)
+        self._invalidate_queries(entity_model)
         return resp
 
     async def _find_by_criteria(self, token, entity_model, entity_version, condition):
@@ -107,9 +140,14 @@ class EntityServiceImpl(EntityService):
         repository_meta = await self._repository.get_meta(token, entity_model, entity_version)
         meta.update(repository_meta)
         resp = await self._repository.delete_by_id(meta, technical_id)
+        self._invalidate_queries(entity_model)
         return resp
 
     async def get_transitions(self, token: str, technical_id: str, meta: Any) -> Any:
         """Get next transitions"""
         resp = await self._repository.get_transitions(meta=meta, technical_id=technical_id)
         return resp
+
+    def _invalidate_queries(self, entity_model: str) -> None:
+        if self._query_cache is not None:
+            self._query_cache.invalidate(entity_model)
@@ -2,6 +2,7 @@ import functools
 import jwt
 from quart import request, jsonify
 
+from common.auth.token_cache import TokenValidationCache
 from common.config.config import config
 from common.utils.request_utils import extract_bearer_token, validate_with_cyoda
 from common.exception.exceptions import InvalidTokenException, TokenExpiredException
@@ -11,10 +12,9 @@ from common.utils.utils import validate_token
 async def get_user_id(auth_header: str) -> str:
     token = extract_bearer_token(auth_header)
     try:
-        # Decode the JWT without verifying the signature
-        # The verify=False option ensures that we do not verify the signature
+        # Decode the JWT without verifying the signature, once per request
         # This is useful for extracting the payload only.
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        decoded = TokenValidationCache.claims(token)
         user_id = decoded.get("caas_org_id")
         if not user_id:
             raise InvalidTokenException()
@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# the disk tier evicts down to this fraction of its budget, so it does not evict again on the next write
+_SQLITE_EVICT_LOW_WATER = 0.9
+_SQLITE_EVICT_BATCH = 256
+# access times of read entries are written in batches of this size
+_SQLITE_TOUCH_BATCH = 256
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, default=lambda obj: obj.model_dump() if hasattr(obj, "model_dump") else obj.__dict__)
+
+
+class Cache(ABC):
+    """
+    Key/value cache storing JSON encoded values. Every get returns a fresh copy,
+    so callers can mutate the result without corrupting the cached entry.
+    """
+
+    def __init__(self, name: str, dumps: Callable[[Any], str] = _json_dumps,
+                 loads: Callable[[str], Any] = json.loads):
+        self.name = name
+        self._dumps = dumps
+        self._loads = loads
+
+    def get(self, key: str, default: Any = None) -> Any:
+        encoded = self.get_encoded(key)
+        if encoded is None:
+            metrics.increment(f"cache.{self.name}.misses")
+            return default
+        metrics.increment(f"cache.{self.name}.hits")
+        return self._loads(encoded)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_encoded(key, self._dumps(value), ttl)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_encoded(key) is not None
+
+    @abstractmethod
+    def get_encoded(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set_encoded(self, key: str, encoded: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """
+    In-process LRU cache bounded by the total size of the encoded values, with optional TTL.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: Optional[float] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (encoded value, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"cache.{name}.bytes", lambda: self._bytes)
+        metrics.register_gauge(f"cache.{name}.entries", lambda: len(self._entries))
+
+    def get_encoded(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            encoded, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                metrics.increment(f"cache.{self.name}.expirations")
+                return None
+            self._entries.move_to_end(key)
+            return encoded
+
+    def set_encoded(self, key: str, encoded: str, ttl: Optional[float] = None) -> None:
+        size = len(encoded)
+        if size > self.max_bytes:
+            logger.debug(f"Value for {key} ({size} bytes) exceeds cache {self.name} capacity, not cached")
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (encoded, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                metrics.increment(f"cache.{self.name}.evictions")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        encoded, _ = self._entries.pop(key)
+        self._bytes -= len(encoded)
+
+
+class SqliteCache(Cache):
+    """
+    On-disk cache tier backed by sqlite, so entries survive restarts without being held in RAM.
+    Bounded by total value size with least-recently-used eviction, optional TTL (wall clock).
+    Reads only record the access time in memory, it is written together with other reads
+    or before evicting, so a hit does not cost a disk write.
+    """
+
+    def __init__(self, name: str, path: str, max_bytes: int, ttl: Optional[float] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> access time not yet written to disk
+        self._touched: dict = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS cache_entries_accessed_at ON cache_entries (accessed_at)")
+        self._bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        metrics.register_gauge(f"cache.{name}.bytes", lambda: self._bytes)
+
+    def get_encoded(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            encoded, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._delete(key)
+                metrics.increment(f"cache.{self.name}.expirations")
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= _SQLITE_TOUCH_BATCH:
+                self._flush_touched()
+            return encoded
+
+    def set_encoded(self, key: str, encoded: str, ttl: Optional[float] = None) -> None:
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._delete(key)
+            self._touched.pop(key, None)
+            self._connection.execute(
+                "INSERT INTO cache_entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, expires_at, now),
+            )
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM cache_entries")
+            self._touched.clear()
+            self._bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._connection.close()
+
+    def _delete(self, key: str) -> None:
+        row = self._connection.execute("SELECT size FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._bytes -= row[0]
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._connection.executemany("UPDATE cache_entries SET accessed_at = ? WHERE key = ?",
+                                         [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        # drop expired entries first, then the least recently used until we are below the low-water mark
+        self._flush_touched()
+        self._connection.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                                 (time.time(),))
+        self._bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        low_water = self.max_bytes * _SQLITE_EVICT_LOW_WATER
+        evicted = 0
+        while self._bytes > low_water:
+            rows = self._connection.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at LIMIT ?",
+                                            (_SQLITE_EVICT_BATCH,)).fetchall()
+            if not rows:
+                break
+            batch = []
+            for key, size in rows:
+                if self._bytes <= low_water:
+                    break
+                batch.append((key,))
+                self._bytes -= size
+            self._connection.executemany("DELETE FROM cache_entries WHERE key = ?", batch)
+            evicted += len(batch)
+        if evicted:
+            metrics.increment(f"cache.{self.name}.evictions", evicted)
+
+
+class TieredCache(Cache):
+    """
+    Memory cache in front of a slower (disk) cache. Disk hits are promoted to memory.
+    """
+
+    def __init__(self, name: str, memory: Cache, disk: Cache, **kwargs):
+        super().__init__(name, **kwargs)
+        self.memory = memory
+        self.disk = disk
+
+    def get_encoded(self, key: str) -> Optional[str]:
+        encoded = self.memory.get_encoded(key)
+        if encoded is not None:
+            return encoded
+        encoded = self.disk.get_encoded(key)
+        if encoded is not None:
+            metrics.increment(f"cache.{self.name}.disk_hits")
+            self.memory.set_encoded(key, encoded)
+        return encoded
+
+    def set_encoded(self, key: str, encoded: str, ttl: Optional[float] = None) -> None:
+        self.memory.set_encoded(key, encoded, ttl)
+        self.disk.set_encoded(key, encoded, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+
+def build_cache(name: str, max_bytes: int, ttl: Optional[float] = None,
+                disk_path: Optional[str] = None, disk_max_bytes: Optional[int] = None) -> Cache:
+    """
+    Build a memory cache, fronting an sqlite tier when disk_path is configured.
+    Falls back to memory only if the disk tier cannot be opened.
+    """
+    if not disk_path:
+        return MemoryCache(name, max_bytes=max_bytes, ttl=ttl)
+    memory = MemoryCache(f"{name}.memory", max_bytes=max_bytes, ttl=ttl)
+    try:
+        disk = SqliteCache(f"{name}.disk", path=disk_path, max_bytes=disk_max_bytes or max_bytes * 16, ttl=ttl)
+    except sqlite3.Error as e:
+        logger.exception(f"Failed to open disk cache {disk_path}, using memory only: {e}")
+        return memory
+    return TieredCache(name, memory=memory, disk=disk)
@@ -1,8 +1,13 @@
 import logging
+import random
+import time
+import uuid
 import common.config.const as const
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from common.config.config import config
+from common.service.dialogue_snapshot_store import dialogue_snapshots
+from common.utils.pubsub import PubSub
 from common.utils.file_reader import read_file_content
 from common.utils.utils import get_current_timestamp_num
 from entity.chat.chat import ChatEntity
@@ -10,6 +15,9 @@ from entity.model import FlowEdgeMessage
 
 logger = logging.getLogger(__name__)
 
+# dialogue entries pushed to clients streaming a chat, keyed by chat entity id
+chat_updates = PubSub("chat_updates", max_queue=const.CHAT_EVENTS_QUEUE_SIZE)
+
 
 async def trigger_manual_transition(
         entity_service,
@@ -45,6 +53,11 @@ async def trigger_manual_transition(
                 user_id=chat.user_id
             )
         )
+        dialogue_snapshots.flow_appended(technical_id)
+        publish_dialogue_update(technical_id,
+                                FlowEdgeMessage(type="answer", publish=True, message=user_answer,
+                                                last_modified=last_modified),
+                                edge_message_id)
         _increment_iteration(chat=entity, answer=user_answer)
         return await _launch_transition(
             entity=entity,
@@ -131,6 +144,83 @@ async def add_answer_to_finished_flow(entity_service, answer: str, cyoda_auth_se
     return edge_message_id, last_modified
 
 
+def is_dialogue_message(msg: FlowEdgeMessage) -> bool:
+    return msg.type in ("question", "notification", "answer", const.UI_FUNCTION_PREFIX) and msg.publish
+
+
+def to_dialogue_entry(content: FlowEdgeMessage, edge_message_id: str) -> dict:
+    """
+    Renders the stored content of a finished_flow message as a dialogue entry for the UI.
+    """
+    content.technical_id = edge_message_id
+    if content.type == "question" and content.approve:
+        approve_msg = const.Notifications.APPROVE_INSTRUCTION_MESSAGE.value
+        if not content.message.rstrip().endswith(approve_msg.rstrip()):
+            content.message = f"{content.message.rstrip()}\n\n{approve_msg}"
+    if content.type == "answer" and content.message == const.Notifications.APPROVE.value:
+        content.message = random.choice(list(const.ApproveAnswer)).value
+    message_content = content.model_dump()
+    # todo - for backwards compatibility - remove
+    message_content[content.type] = content.message
+    return message_content
+
+
+def publish_dialogue_update(technical_id: str, content: FlowEdgeMessage, edge_message_id: str) -> None:
+    """
+    Pushes a message just appended to the finished_flow of a chat or child entity
+    to the clients streaming the chat's updates.
+    """
+    if content.type == "child_entities":
+        dialogue_snapshots.children_added(technical_id, content.message or [])
+        return
+    if not is_dialogue_message(content):
+        return
+    chat_id = dialogue_snapshots.chat_of(technical_id)
+    if chat_updates.has_subscribers(chat_id):
+        chat_updates.publish(chat_id, to_dialogue_entry(content.model_copy(), edge_message_id))
+
+
+class PartialAnswerPublisher:
+    """
+    Forwards the answer an AI agent is still generating for an entity to the clients streaming
+    its chat, as {"partial": {"stream_id", "technical_id", "content", "done"}} events carrying the
+    text so far. Updates are throttled to one per CHAT_PARTIAL_ANSWER_INTERVAL_SECONDS, the final
+    message is published as a regular dialogue entry once it is stored.
+    """
+
+    def __init__(self, technical_id: str, chat_id: str):
+        self.technical_id = technical_id
+        self.chat_id = chat_id
+        self.stream_id = str(uuid.uuid4())
+        self._content_parts: List[str] = []
+        self._published_at = 0.0
+
+    @classmethod
+    def for_entity(cls, technical_id: str) -> Optional["PartialAnswerPublisher"]:
+        """Returns None if nobody is watching the chat of the entity."""
+        chat_id = dialogue_snapshots.chat_of(technical_id)
+        return cls(technical_id, chat_id) if chat_updates.has_subscribers(chat_id) else None
+
+    def __call__(self, content_parts: List[str]) -> None:
+        # the pieces are only joined when an update is actually published
+        self._content_parts = content_parts
+        now = time.monotonic()
+        if now - self._published_at >= const.CHAT_PARTIAL_ANSWER_INTERVAL_SECONDS:
+            self._published_at = now
+            self._publish(done=False)
+
+    def finish(self) -> None:
+        self._publish(done=True)
+
+    def _publish(self, done: bool) -> None:
+        chat_updates.publish(self.chat_id, {"partial": {
+            "stream_id": self.stream_id,
+            "technical_id": self.technical_id,
+            "content": "".join(self._content_parts),
+            "done": done,
+        }})
+
+
 async def get_user_message(message, user_file):
     if user_file:
         file_contents = read_file_content(user_file)
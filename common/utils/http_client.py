@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from common.config.config import config
+from common.utils.metrics import metrics
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_OPENED_TRACE_EVENT = "connection.connect_tcp.complete"
+DEFAULT_REQUEST_TIMEOUT = 150.0
+
+
+class HttpClientPool:
+    """
+    Keeps one long-lived, connection-pooled httpx.AsyncClient per event loop.
+    httpx clients are bound to the loop they were first used on, and the app runs
+    the Quart loop plus background loops for gRPC processing, hence one client per loop.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive_connections: int,
+                 keepalive_expiry: float, http2: bool, timeout: httpx.Timeout):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._max_connections = max_connections
+        self._http2 = http2 and HTTP2_AVAILABLE
+        self._timeout = timeout
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+
+        metrics.register_gauge("http_pool.in_flight", lambda: self._in_flight)
+        metrics.register_gauge("http_pool.peak_in_flight", lambda: self._peak_in_flight)
+        metrics.register_gauge("http_pool.saturation", self.saturation)
+        metrics.register_gauge("http_pool.connection_reuse_ratio", self.connection_reuse_ratio)
+        metrics.register_gauge("http_pool.clients", lambda: len(self._clients))
+
+    def get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_clients_of_closed_loops()
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    timeout=self._timeout,
+                    limits=self._limits,
+                    http2=self._http2,
+                    trust_env=False,
+                )
+                self._clients[loop] = client
+                logger.info(f"Created pooled HTTP client (http2={self._http2}) for loop {id(loop)}")
+        return client
+
+    async def request(self, method: str, url: str, timeout: Optional[httpx.Timeout] = None,
+                      **kwargs) -> httpx.Response:
+        client = self.get_client()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        self._on_request_started()
+        try:
+            return await client.request(method, url, extensions={"trace": self._trace}, **kwargs)
+        except httpx.PoolTimeout:
+            metrics.increment("http_pool.pool_timeouts")
+            raise
+        finally:
+            self._on_request_finished()
+
+    async def aclose_all(self) -> None:
+        """
+        Close every pooled client. Clients owned by other running loops are closed on their own loop.
+        """
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+
+        current_loop = asyncio.get_running_loop()
+        for loop, client in clients:
+            try:
+                if loop is current_loop:
+                    await client.aclose()
+                elif loop.is_running():
+                    future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                    await asyncio.wait_for(asyncio.wrap_future(future), timeout=5)
+            except Exception as e:
+                logger.exception(f"Failed to close pooled HTTP client: {e}")
+        logger.info(f"Closed {len(clients)} pooled HTTP client(s)")
+
+    def saturation(self) -> float:
+        capacity = self._max_connections * max(len(self._clients), 1)
+        return self._in_flight / capacity
+
+    def connection_reuse_ratio(self) -> float:
+        requests = metrics.get_counter("http_pool.requests")
+        if not requests:
+            return 0.0
+        opened = metrics.get_counter("http_pool.connections_opened")
+        return max(requests - opened, 0) / requests
+
+    def _drop_clients_of_closed_loops(self) -> None:
+        for loop in [loop for loop in self._clients if loop.is_closed()]:
+            del self._clients[loop]
+
+    def _on_request_started(self) -> None:
+        metrics.increment("http_pool.requests")
+        with self._lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _on_request_finished(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == CONNECTION_OPENED_TRACE_EVENT:
+            metrics.increment("http_pool.connections_opened")
+
+
+http_client_pool = HttpClientPool(
+    max_connections=config.HTTP_POOL_MAX_CONNECTIONS,
+    max_keepalive_connections=config.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=config.HTTP_POOL_KEEPALIVE_EXPIRY,
+    http2=config.HTTP2_ENABLED,
+    timeout=httpx.Timeout(DEFAULT_REQUEST_TIMEOUT, connect=60.0),
+)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Queue of events published to one topic, bound to the event loop it was created on.
+    Events published from other threads or loops are handed over with call_soon_threadsafe.
+    If the consumer falls more than max_queue events behind, new events are dropped and
+    `overflowed` is set, so the consumer knows it has to resync.
+    """
+
+    def __init__(self, pubsub: "PubSub", topic: str, max_queue: int):
+        self.topic = topic
+        self.overflowed = False
+        self._pubsub = pubsub
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Next event, or None if nothing was published within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> int:
+        """Drops the queued events, returns how many were dropped."""
+        dropped = 0
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            dropped += 1
+        return dropped
+
+    def close(self) -> None:
+        self._pubsub._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _deliver(self, event: Any) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.increment(f"pubsub.{self._pubsub.name}.dropped")
+
+    def _publish(self, event: Any) -> bool:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._deliver(event)
+            return True
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+            return True
+        except RuntimeError:
+            # the subscriber's loop is closed, nobody will ever read this queue
+            self.close()
+            return False
+
+
+class PubSub:
+    """
+    In-process publish/subscribe keyed by topic. Safe to publish from any thread or event loop.
+    """
+
+    def __init__(self, name: str, max_queue: int = 100):
+        self.name = name
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        metrics.register_gauge(f"pubsub.{name}.subscribers",
+                               lambda: sum(len(subscribers) for subscribers in self._subscribers.values()))
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(self, topic, self.max_queue)
+        with self._lock:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def publish(self, topic: str, event: Any) -> int:
+        """Returns the number of subscribers the event was handed to."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        delivered = sum(1 for subscription in subscribers if subscription._publish(event))
+        metrics.increment(f"pubsub.{self.name}.published")
+        return delivered
+
+    def has_subscribers(self, topic: str) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(topic))
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.topic]
@@ -1,5 +1,9 @@
 import logging
 
+import jwt
+
+from common.auth.jwks import verify_token_locally
+from common.auth.token_cache import token_validations
 from common.utils.utils import send_get_request
 from common.config.config import config
 from common.exception.exceptions import InvalidTokenException
@@ -14,8 +18,29 @@ def extract_bearer_token(auth_header: str) -> str:
     return parts[1]
 
 async def validate_with_cyoda(token: str):
-    resp = await send_get_request(token, config.CYODA_API_URL, 'v1')
-    if not resp or resp.get('status') == 401:
+    if config.CYODA_LOCAL_TOKEN_VERIFICATION:
+        try:
+            if await verify_token_locally(token) is not None:
+                return
+        except jwt.PyJWTError as e:
+            if not config.ENABLE_AUTH:
+                logger.info(f"token rejected by local verification ({e}), but auth is disabled")
+                return
+            logger.info(f"Token rejected by local verification: {e}")
+            raise InvalidTokenException('Invalid token')
+        # signing key unknown, ask Cyoda
+    valid = token_validations.is_valid(token)
+    if valid is None:
+        try:
+            resp = await send_get_request(token, config.CYODA_API_URL, 'v1')
+        except InvalidTokenException:
+            resp = None
+        valid = bool(resp) and resp.get('status') != 401
+        if valid:
+            token_validations.set_valid(token)
+        else:
+            token_validations.set_rejected(token)
+    if not valid:
         if not config.ENABLE_AUTH:
             logger.info("token invalid, but auth is disabled")
             return
@@ -0,0 +1,215 @@
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, FrozenSet, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from common.config.config import config
+from common.exception.exceptions import CircuitOpenException
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# The server rejected these before doing any work, so even non-idempotent calls can be replayed.
+NOT_PROCESSED_STATUSES = frozenset({422, 429, 503})
+BACKEND_FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+# Raised before the request left the client, so it is safe to replay any method.
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def get_error_status(exc: Exception) -> Optional[int]:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code
+    status = getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def get_retry_after(exc: Exception) -> Optional[float]:
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    header = exc.response.headers.get("Retry-After")
+    if not header:
+        return None
+    if header.strip().isdigit():
+        return float(header.strip())
+    try:
+        retry_at = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = config.CYODA_MAX_RETRY_ATTEMPTS
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    deadline: float = config.CYODA_REQUEST_DEADLINE
+    retry_statuses: FrozenSet[int] = frozenset({422, 429, 500, 502, 503, 504})
+    # None means "infer from the HTTP method"
+    idempotent: Optional[bool] = None
+
+    def is_idempotent(self, method: str) -> bool:
+        if self.idempotent is not None:
+            return self.idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry(self, method: str, exc: Exception, attempt: int) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        status = get_error_status(exc)
+        if status is not None:
+            if status not in self.retry_statuses:
+                return False
+            return self.is_idempotent(method) or status in NOT_PROCESSED_STATUSES
+        if isinstance(exc, NOT_SENT_ERRORS):
+            return True
+        if isinstance(exc, httpx.TransportError):
+            return self.is_idempotent(method)
+        return False
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Full-jitter exponential backoff; a server supplied Retry-After takes precedence.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.deadline)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+@dataclass(frozen=True)
+class RetryRule:
+    methods: FrozenSet[str]
+    path_pattern: str
+    policy: RetryPolicy
+    _compiled: re.Pattern = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_compiled", re.compile(self.path_pattern))
+
+    def matches(self, method: str, path: str) -> bool:
+        return method.upper() in self.methods and bool(self._compiled.match(path or ""))
+
+
+class RetryPolicyResolver:
+    def __init__(self, rules: List[RetryRule], default_policy: RetryPolicy):
+        self.rules = rules
+        self.default_policy = default_policy
+
+    def resolve(self, method: str, path: str) -> RetryPolicy:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule.policy
+        return self.default_policy
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after consecutive backend failures, then lets a single
+    trial request through once reset_timeout has elapsed (half-open).
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # a trial that never reported back (e.g. cancelled) must not block the breaker forever
+            trial_stale = now - self._trial_started_at >= self.reset_timeout
+            if self.state == self.HALF_OPEN and (not self._trial_in_flight or trial_stale):
+                self._trial_in_flight = True
+                self._trial_started_at = now
+                return
+        metrics.increment("cyoda_circuit.rejected")
+        raise CircuitOpenException(f"Cyoda backend {self.host} is unavailable, please try again later")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.host} closed")
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            should_open = (self.state == self.HALF_OPEN
+                           or self._consecutive_failures >= self.failure_threshold)
+            if should_open and self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.host} opened after {self._consecutive_failures} failures")
+                metrics.increment("cyoda_circuit.opened")
+            if should_open:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str) -> CircuitBreaker:
+        host = urlparse(base_url).netloc or base_url
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+
+def is_backend_failure(exc: Exception) -> bool:
+    status = get_error_status(exc)
+    if status is not None:
+        return status in BACKEND_FAILURE_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+retry_policies = RetryPolicyResolver(
+    rules=[
+        # snapshot status polling has its own loop, keep each poll short
+        RetryRule(frozenset({"GET"}), r"^search/snapshot/[^/?]+/status",
+                  replace(DEFAULT_RETRY_POLICY, max_attempts=3, max_delay=1.0, deadline=15.0)),
+        # creating a search snapshot is read-only, safe to replay
+        RetryRule(frozenset({"POST"}), r"^search/", replace(DEFAULT_RETRY_POLICY, idempotent=True)),
+        # launching a transition twice is not idempotent even though it is a PUT
+        RetryRule(frozenset({"PUT"}), r"^(platform-api/entity/transition|entity/JSON/[^/?]+/)",
+                  replace(DEFAULT_RETRY_POLICY, idempotent=False)),
+    ],
+    default_policy=DEFAULT_RETRY_POLICY,
+)
+
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=config.CYODA_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=config.CYODA_CIRCUIT_RESET_TIMEOUT,
+)
@@ -21,6 +21,15 @@ from jsonschema import validate
 from common.auth.cyoda_auth import CyodaAuthService
 from common.config.config import config
 from common.exception.exceptions import InvalidTokenException
+from common.utils.http_client import http_client_pool, DEFAULT_REQUEST_TIMEOUT
+from common.utils.metrics import metrics
+from common.utils.retry_policy import (
+    retry_policies,
+    circuit_breakers,
+    get_error_status,
+    get_retry_after,
+    is_backend_failure,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -444,11 +453,6 @@ async def read_json_file(file_path: str):
         raise
 
 
-def _invalidate_tokens(cyoda_auth_service: CyodaAuthService):
-    """Delegate token invalidation to the provided token service."""
-    cyoda_auth_service.invalidate_tokens()
-
-
 async def send_cyoda_request(
         cyoda_auth_service: CyodaAuthService,
         method: str,
@@ -457,58 +461,78 @@ async def send_cyoda_request(
         base_url: str = config.CYODA_API_URL
 ) -> dict:
     """
-    Send an HTTP request to the Cyoda API with automatic retry on 401.
+    Send an HTTP request to the Cyoda API.
+
+    Failures are retried according to the RetryPolicy resolved for the method/path:
+    jittered exponential backoff (or Retry-After) within an overall deadline, and
+    non-idempotent calls are only replayed when the server did not process them.
+    A per-host circuit breaker fails fast while the backend is down.
+    A 401 invalidates the tokens and retries once with fresh ones.
     """
-    token = cyoda_auth_service.get_access_token()
-    max_attempt = 5
-    for attempt in range(max_attempt):
+    policy = retry_policies.resolve(method, path)
+    breaker = circuit_breakers.get(base_url)
+    deadline = time.monotonic() + policy.deadline
+    token = await cyoda_auth_service.get_access_token_async()
+    token_refreshed = False
+    attempt = 0
+
+    while True:
+        attempt += 1
+        breaker.before_request()
+        remaining = deadline - time.monotonic()
         try:
-            if method.lower() == "get":
-                resp = await send_get_request(token, base_url, path)
-            elif method.lower() == "post":
-                resp = await send_post_request(token, base_url, path, data=data)
-            elif method.lower() == "put":
-                resp = await send_put_request(token, base_url, path, data=data)
-            elif method.lower() == "delete":
-                resp = await send_delete_request(token, base_url, path)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            # todo check here
+            resp = await _send_cyoda_attempt(token, method, base_url, path, data, timeout=remaining)
         except Exception as exc:
-            if exc and hasattr(exc, "status_code"):
-                if attempt == 0 and exc.status_code==401:
-                    logger.warning(f"Request to {path} failed with 401; invalidating tokens and retrying")
-                    _invalidate_tokens(cyoda_auth_service=cyoda_auth_service)
-                    token = cyoda_auth_service.get_access_token()
-                    continue
-                elif attempt <= max_attempt and exc.status_code==422:
-                    logger.error(f"Response from {path} returned status 422; retrying")
-                    continue
-                elif attempt <= max_attempt and exc.status_code in [500, 503]:
-                    logger.error(f"Response from {path} returned status 500; retrying")
-                    continue
+            if is_backend_failure(exc):
+                breaker.record_failure()
             else:
-                msg = str(exc)
-                if attempt == 0 and ("401" in msg or "Unauthorized" in msg):
-                    logger.warning(f"Request to {path} failed with 401; invalidating tokens and retrying")
-                    _invalidate_tokens(cyoda_auth_service=cyoda_auth_service)
-                    token = cyoda_auth_service.get_access_token()
-                    continue
-                elif attempt <= max_attempt and ("422" in msg):
-                    logger.error(f"Response from {path} returned status 422; retrying")
-                    continue
-                elif attempt <= max_attempt and (("500" in msg) or ("503" in msg)):
-                    logger.error(f"Response from {path} returned status 500; retrying")
-                    continue
-            raise
+                breaker.record_success()
+            if get_error_status(exc) == 401 and not token_refreshed:
+                logger.warning(f"Request to {path} failed with 401; invalidating tokens and retrying")
+                token = await _refresh_tokens(cyoda_auth_service, stale_token=token)
+                token_refreshed = True
+                continue
+            if not policy.should_retry(method, exc, attempt):
+                raise
+            delay = policy.backoff(attempt, get_retry_after(exc))
+            if time.monotonic() + delay >= deadline:
+                logger.error(f"Deadline of {policy.deadline}s exhausted for {method.upper()} {path}")
+                raise
+            logger.warning(f"{method.upper()} {path} failed on attempt {attempt} "
+                           f"(status={get_error_status(exc)}, error={exc!r}); retrying in {delay:.2f}s")
+            metrics.increment("cyoda_request.retries")
+            await asyncio.sleep(delay)
+            continue
+
+        breaker.record_success()
         status = resp.get("status") if isinstance(resp, dict) else None
-        if attempt == 0 and status == 401:
+        if status == 401 and not token_refreshed:
             logger.warning(f"Response from {path} returned status 401; invalidating tokens and retrying")
-            _invalidate_tokens(cyoda_auth_service=cyoda_auth_service)
-            token = cyoda_auth_service.get_access_token()
+            token = await _refresh_tokens(cyoda_auth_service, stale_token=token)
+            token_refreshed = True
             continue
         return resp
-    raise RuntimeError(f"Failed request {method.upper()} {path} after retry")
+
+
+async def _refresh_tokens(cyoda_auth_service: CyodaAuthService, stale_token: str) -> str:
+    cyoda_auth_service.invalidate_tokens(stale_token=stale_token)
+    return await cyoda_auth_service.get_access_token_async()
+
+
+async def _send_cyoda_attempt(token: str, method: str, base_url: str, path: str, data: Any,
+                              timeout: float) -> dict:
+    method = method.upper()
+    if method not in {"GET", "POST", "PUT", "DELETE"}:
+        raise ValueError(f"Unsupported HTTP method: {method}")
+    url = f"{base_url}/{path}" if path else base_url
+    token = f"Bearer {token}" if not token.startswith('Bearer') else token
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"{token}",
+    }
+    payload = data if method in ("POST", "PUT") else None
+    request_timeout = max(min(timeout, DEFAULT_REQUEST_TIMEOUT), 1.0)
+    return await send_request(headers, url, method, payload, None, timeout=request_timeout)
 
 
 async def send_get_request(token: str, api_url: str, path: str) -> Optional[Any]:
@@ -533,6 +557,7 @@ async def send_request(
         method: str,
         data: Optional[dict] = None,
         json_data: Optional[dict] = None,
+        timeout: Optional[float] = None,
 ) -> dict:
     """
     Send an HTTP request with the given headers and payload.
@@ -552,11 +577,10 @@ async def send_request(
     if method in ("GET", "POST"):
         allowed_statuses.add(404)
 
-    timeout = httpx.Timeout(150.0, connect=60.0)
-    async with httpx.AsyncClient(timeout=timeout, trust_env=False) as client:
-        response = await client.request(
-            method, url, headers=headers, data=data, json=json_data
-        )
+    request_timeout = httpx.Timeout(timeout, connect=min(timeout, 60.0)) if timeout else None
+    response = await http_client_pool.request(
+        method, url, headers=headers, data=data, json=json_data, timeout=request_timeout
+    )
 
     status = response.status_code
 
@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from common.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JobFactory = Callable[[], Awaitable[None]]
+
+
+class PriorityWorkerPool:
+    """
+    Fixed number of workers running submitted jobs by priority (lower first, FIFO within a
+    priority), with a concurrency limit per job key and a bound on queued jobs.
+
+    A job whose key is at its limit is parked until a job of the same key finishes, so it
+    never holds a worker while it waits. Jobs sharing a serial_key (e.g. an entity id) run one
+    at a time in submission order: later ones wait in the key's mailbox, not in a worker.
+    submit() returns False when the pool is full, the caller decides how to shed the load.
+    Bound to the event loop it is first used on.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued: int,
+                 default_key_limit: Optional[int] = None, key_limits: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.default_key_limit = default_key_limit
+        self.key_limits = key_limits or {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._parked: Dict[str, Deque[tuple]] = defaultdict(deque)
+        self._running: Dict[str, int] = defaultdict(int)
+        # serial key -> jobs waiting for the job of that key currently queued or running
+        self._mailboxes: Dict[str, Deque[tuple]] = {}
+        self._tasks = []
+        self._sequence = itertools.count()
+        metrics.register_gauge(f"worker_pool.{name}.queued", self.queued)
+        metrics.register_gauge(f"worker_pool.{name}.running", lambda: sum(self._running.values()))
+
+    def queued(self) -> int:
+        queued = self._queue.qsize() if self._queue else 0
+        return (queued + sum(len(jobs) for jobs in self._parked.values())
+                + sum(len(jobs) for jobs in self._mailboxes.values()))
+
+    def submit(self, job: JobFactory, priority: int = 0, key: str = "", serial_key: Optional[str] = None) -> bool:
+        if self.queued() >= self.max_queued:
+            metrics.increment(f"worker_pool.{self.name}.rejected")
+            return False
+        self._ensure_started()
+        entry = (priority, next(self._sequence), key, job, time.monotonic(), serial_key)
+        if serial_key is not None:
+            mailbox = self._mailboxes.get(serial_key)
+            if mailbox is not None:
+                mailbox.append(entry)
+                metrics.increment(f"worker_pool.{self.name}.serialized")
+                return True
+            self._mailboxes[serial_key] = deque()
+        self._queue.put_nowait(entry)
+        return True
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._parked.clear()
+        self._running.clear()
+        self._mailboxes.clear()
+
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._work(), name=f"{self.name}-worker-{i}")
+                       for i in range(self.workers)]
+
+    def _limit(self, key: str) -> Optional[int]:
+        return self.key_limits.get(key, self.default_key_limit)
+
+    async def _work(self) -> None:
+        while True:
+            entry = await self._queue.get()
+            priority, _, key, job, submitted_at, serial_key = entry
+            limit = self._limit(key)
+            if limit is not None and self._running[key] >= limit:
+                self._parked[key].append(entry)
+                continue
+            self._running[key] += 1
+            metrics.observe(f"worker_pool.{self.name}.wait_ms", (time.monotonic() - submitted_at) * 1000)
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job {key} failed in worker pool {self.name}: {e}")
+            finally:
+                self._running[key] -= 1
+                if self._parked.get(key):
+                    self._queue.put_nowait(self._parked[key].popleft())
+                if not self._parked.get(key):
+                    self._parked.pop(key, None)
+                if not self._running[key]:
+                    del self._running[key]
+                if serial_key is not None:
+                    self._release_serial_key(serial_key)
+
+    def _release_serial_key(self, serial_key: str) -> None:
+        mailbox = self._mailboxes.get(serial_key)
+        if not mailbox:
+            self._mailboxes.pop(serial_key, None)
+            return
+        entry = mailbox.popleft()
+        submitted_at = entry[4]
+        metrics.observe(f"worker_pool.{self.name}.serial_wait_ms", (time.monotonic() - submitted_at) * 1000)
+        self._queue.put_nowait(entry)
@@ -2,7 +2,7 @@ from typing import Dict, Any, Optional, List, Literal
 from pydantic import BaseModel, ConfigDict, Field
 
 from common.config.config import config
-from common.config.const import SCHEDULER_STATUS_WAITING
+from common.config.const import SCHEDULER_STATUS_WAITING, MODEL_CONTEXT_WINDOWS, DEFAULT_CONTEXT_WINDOW
 from common.utils.utils import get_current_timestamp_num
 
 
@@ -29,7 +29,17 @@ class AIMessage(WorkflowEntity):
 
 class ChatMemory(WorkflowEntity):
     model_config = ConfigDict(extra="forbid")
+    # most recent messages per tag, older ones are sealed into pages
     messages: Optional[Dict[str, List[AIMessage]]] = {}
+    # tag -> ids of ChatMemoryPage entities, oldest first
+    pages: Optional[Dict[str, List[str]]] = {}
+    # memory tags key -> {"through": last summarized edge message id, "edge_message_id": summary message}
+    rollups: Optional[Dict[str, Dict[str, str]]] = {}
+
+class ChatMemoryPage(WorkflowEntity):
+    model_config = ConfigDict(extra="forbid")
+    tag: str
+    messages: List[AIMessage] = []
 
 class TransitionsMemory(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -127,6 +137,48 @@ class ModelConfig(BaseModel):
         le=2.0,
         description="Penalize new tokens based on whether they appear in text"
     )
+    memory_token_budget: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Tokens of memory sent to the model, oldest messages are dropped first. "
+                    "Defaults to MEMORY_TOKEN_BUDGET, capped by the model's context window minus max_tokens"
+    )
+    summarize_dropped_memory: bool = Field(
+        default=False,
+        description="Replace memory dropped by the token budget with a cached summary message"
+    )
+    stream: bool = Field(
+        default=True,
+        description="Stream the answer to clients watching the chat while it is generated"
+    )
+    cache_completions: Optional[bool] = Field(
+        default=None,
+        description="Reuse the completion of an identical earlier request. "
+                    "By default only deterministic requests (temperature 0) are cached"
+    )
+    parallel_tool_calls: bool = Field(
+        default=False,
+        description="Run read-only tool calls of one completion concurrently, "
+                    "tools not in PARALLEL_SAFE_TOOL_FUNCTIONS still run one at a time"
+    )
+    max_parallel_tool_calls: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of tool calls running at the same time"
+    )
+    tool_timeout_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time limit of a single read-only tool call (PARALLEL_SAFE_TOOL_FUNCTIONS), "
+                    "the model is told the tool timed out. Tools with side effects are never cut short"
+    )
+
+    def get_memory_token_budget(self) -> int:
+        if self.memory_token_budget:
+            return self.memory_token_budget
+        context_window = MODEL_CONTEXT_WINDOWS.get(self.model_name, DEFAULT_CONTEXT_WINDOW)
+        budget = max(context_window - self.max_tokens, 1)
+        return min(budget, config.MEMORY_TOKEN_BUDGET) if config.MEMORY_TOKEN_BUDGET > 0 else budget
 
 
 
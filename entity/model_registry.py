@@ -1,6 +1,7 @@
 import common.config.const as const
 from entity.chat.chat import ChatEntity, ChatBusinessEntity
-from entity.model import QuestionsQueue, SchedulerEntity, AgenticFlowEntity, ChatMemory, FlowEdgeMessage, AIMessage
+from entity.model import QuestionsQueue, SchedulerEntity, AgenticFlowEntity, ChatMemory, FlowEdgeMessage, AIMessage, \
+    ChatMemoryPage
 
 model_registry = {
     const.ModelName.AGENTIC_FLOW_ENTITY.value: AgenticFlowEntity,
@@ -10,6 +11,7 @@ model_registry = {
     const.ModelName.SCHEDULER_ENTITY.value: SchedulerEntity,
     const.ModelName.QUESTIONS_QUEUE.value: QuestionsQueue,
     const.ModelName.CHAT_MEMORY.value: ChatMemory,
+    const.ModelName.CHAT_MEMORY_PAGE.value: ChatMemoryPage,
     const.ModelName.CHAT_BUSINESS_ENTITY.value: ChatBusinessEntity
 
 }
@@ -1,11 +1,12 @@
 from datetime import timedelta
-from quart import Blueprint, request, jsonify
+from quart import Blueprint, request, jsonify, make_response
 from quart_rate_limiter import rate_limit
 
 import common.config.const as const
 from common.config.config import config
+from common.exception.exceptions import InvalidRequestException
 from common.utils.auth_utils import auth_optional, auth_required
-from routes.chat_utils import extract_auth_info, get_json_data, get_form_data
+from routes.chat_utils import extract_auth_info, get_json_data, get_form_data, format_sse_event
 from routes.rl_key_functions import token_key_function
 from services.factory import chat_service
 
@@ -17,8 +18,16 @@ chat_bp = Blueprint('chat', __name__, url_prefix=f"{config.API_PREFIX}/chats")
 @auth_optional
 async def list_chats():
     _, user_id = await extract_auth_info()
-    chats = await chat_service.list_chats(user_id)
-    return jsonify({"chats": chats})
+    limit = request.args.get("limit")
+    if limit is None:
+        chats = await chat_service.list_chats(user_id)
+        return jsonify({"chats": chats})
+    if not limit.isdecimal():
+        # a malformed limit must not fall back to the unpaginated list
+        raise InvalidRequestException("limit must be a positive integer")
+    # list_chats_page rejects 0 and caps the limit at MAX_CHATS_PAGE_SIZE
+    page = await chat_service.list_chats_page(user_id, limit=int(limit), cursor=request.args.get("cursor"))
+    return jsonify(page)
 
 
 @chat_bp.route('', methods=['POST'])
@@ -40,6 +49,49 @@ async def get_chat_route(technical_id):
     return jsonify({"chat_body": result})
 
 
+@chat_bp.route('/<technical_id>/updates', methods=['GET'])
+@rate_limit(const.RATE_LIMIT, timedelta(minutes=1), key_function=token_key_function)
+@auth_optional
+async def get_chat_updates_route(technical_id):
+    header, _ = await extract_auth_info()
+    result = await chat_service.get_chat_updates(header, technical_id, since=request.args.get("since"),
+                                                 is_known_etag=request.if_none_match.contains)
+    etag = result.pop("etag")
+    if result.get("not_modified") or request.if_none_match.contains(etag):
+        return "", 304, {"ETag": f'"{etag}"'}
+    response = jsonify(result)
+    response.set_etag(etag)
+    return response
+
+
+@chat_bp.route('/<technical_id>/events', methods=['GET'])
+@rate_limit(const.RATE_LIMIT, timedelta(minutes=1), key_function=token_key_function)
+@auth_optional
+async def chat_events_route(technical_id):
+    header, _ = await extract_auth_info()
+    # EventSource sends the id of the last event it got when it reconnects
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    updates = chat_service.stream_chat_updates(header, technical_id, since=since)
+    # resolve the chat (and fail with a regular error response) before the stream starts
+    first = await anext(updates)
+
+    async def event_stream():
+        try:
+            yield format_sse_event(first)
+            async for event in updates:
+                yield format_sse_event(event)
+        finally:
+            await updates.aclose()
+
+    response = await make_response(event_stream(), {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    response.timeout = None
+    return response
+
+
 @chat_bp.route('/<technical_id>', methods=['DELETE'])
 @rate_limit(const.RATE_LIMIT, timedelta(minutes=1), key_function=token_key_function)
 @auth_required
@@ -1,3 +1,5 @@
+import json
+
 from quart import request
 
 from common.utils.auth_utils import get_user_id
@@ -18,3 +20,12 @@ async def get_form_data(*keys, file_key=None):
     form = (await request.form).to_dict()
     files = await request.files
     return tuple(form.get(k) for k in keys), files.get(file_key) if file_key else None
+
+
+def format_sse_event(event):
+    if event is None:
+        # comment line, keeps proxies from closing an idle stream
+        return ": keep-alive\n\n"
+    lines = [f"id: {event['cursor']}"] if event.get("cursor") else []
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
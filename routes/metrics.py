@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from quart import Blueprint, jsonify
+from quart_rate_limiter import rate_limit
+
+import common.config.const as const
+from common.config.config import config
+from common.utils.auth_utils import auth_required
+from common.utils.metrics import metrics
+from routes.rl_key_functions import token_key_function
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix=f"{config.API_PREFIX}/metrics")
+
+
+@metrics_bp.route('', methods=['GET'])
+@rate_limit(const.RATE_LIMIT, timedelta(minutes=1), key_function=token_key_function)
+@auth_required
+async def get_metrics():
+    return jsonify(metrics.snapshot())
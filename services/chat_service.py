@@ -1,10 +1,16 @@
+import asyncio
+import base64
+import hashlib
+import heapq
+import json
 import logging
-import random
+import time
 from datetime import datetime
 
 import jwt
-from typing import List, Tuple
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
 import common.config.const as const
+from common.auth.token_cache import TokenValidationCache
 from common.config.config import config
 
 from common.exception.exceptions import (
@@ -12,14 +18,21 @@ from common.exception.exceptions import (
     TokenExpiredException,
     ChatNotFoundException,
     GuestChatsLimitExceededException,
+    InvalidRequestException,
 )
+from common.service.dialogue_snapshot_store import dialogue_snapshots
 from common.service.entity_service_interface import EntityService
 from common.utils.chat_util_functions import (
     get_user_message,
     add_answer_to_finished_flow,
+    chat_updates,
+    is_dialogue_message,
+    to_dialogue_entry,
     trigger_manual_transition,
     _launch_transition,
 )
+from common.utils.cache import MemoryCache
+from common.utils.metrics import metrics
 from common.utils.utils import (
     current_timestamp,
     validate_token, send_cyoda_request, get_current_timestamp_num,
@@ -31,6 +44,14 @@ from entity.model import FlowEdgeMessage, ChatMemory, ModelConfig, AgenticFlowEn
 logger = logging.getLogger(__name__)
 
 
+def _chat_sort_key(chat: dict) -> tuple:
+    try:
+        date = datetime.strptime(chat["date"], "%Y-%m-%dT%H:%M:%S.%fZ")
+    except (TypeError, ValueError):
+        date = datetime.min  # fallback if date is missing or malformed
+    return date, chat.get("technical_id") or ""
+
+
 class ChatService:
     def __init__(self, entity_service, cyoda_auth_service, chat_lock, ai_agent, data_service):
         self.entity_service: EntityService = entity_service
@@ -38,6 +59,9 @@ class ChatService:
         self.ai_agent = ai_agent
         self.cyoda_auth_service = cyoda_auth_service
         self.data_service = data_service
+        self._processor_address = MemoryCache("processor_address", max_bytes=4096, ttl=const.PROCESSOR_ADDRESS_TTL)
+        # workflow_name never changes for an entity, so entries only leave the index when evicted
+        self._workflow_names = MemoryCache("entity_workflow_names", max_bytes=const.WORKFLOW_NAME_INDEX_MAX_BYTES)
 
     async def transfer_chats(self, guest_token, auth_header):
         guest_user_id = self._get_user_id(auth_header=f"Bearer {guest_token}")
@@ -74,43 +98,80 @@ class ChatService:
             )
 
     # public methods used by routes
-    # todo stream chats not to load all of them into memory
     async def list_chats(self, user_id: str) -> List[dict]:
         if not user_id:
             raise InvalidTokenException("Invalid token")
+        return list(await self._merged_chat_summaries(user_id))
 
-        chats = await self.data_service.get_entities_by_user_name(user_id=user_id,
-                                                                  model=const.ModelName.CHAT_BUSINESS_ENTITY.value)
-        transfer_chats = []
-        if not user_id.startswith("guest."):
-            transfers = await self.data_service.get_entities_by_user_name(user_id=user_id,
-                                                                          model=const.ModelName.TRANSFER_CHATS_ENTITY.value)
-
-            guest_user_ids = set()
-
-            for transfer in transfers:
-                guest_id = transfer["guest_user_id"]
-                if guest_id not in guest_user_ids:
-                    transfer_chats += await self.data_service.get_entities_by_user_name(
-                        user_id=guest_id,
-                        model=const.ModelName.CHAT_BUSINESS_ENTITY.value
-                    )
-                    guest_user_ids.add(guest_id)
-        if transfer_chats:
-            chats += transfer_chats
-            def parse_chat_date(chat):
-                try:
-                    return datetime.strptime(chat.date, "%Y-%m-%dT%H:%M:%S.%fZ")
-                except (TypeError, ValueError):
-                    return datetime.min  # fallback if date is missing or malformed
-
-            chats = sorted(chats, key=parse_chat_date, reverse=True)
+    async def list_chats_page(self, user_id: str, limit: int, cursor: Optional[str] = None) -> dict:
+        """
+        One page of the user's chats, newest first. next_cursor is passed back to get the following page.
+        """
+        if not user_id:
+            raise InvalidTokenException("Invalid token")
+        if limit < 1:
+            raise InvalidRequestException("limit must be a positive integer")
+        limit = min(limit, const.MAX_CHATS_PAGE_SIZE)
+        after = self._decode_chats_cursor(cursor) if cursor else None
+
+        page = []
+        for chat in await self._merged_chat_summaries(user_id):
+            # newest first, so everything up to and including the cursor was already returned
+            if after is not None and _chat_sort_key(chat) >= after:
+                continue
+            page.append(chat)
+            if len(page) > limit:
+                break
+
+        next_cursor = self._encode_chats_cursor(page[limit - 1]) if len(page) > limit else None
+        return {"chats": page[:limit], "next_cursor": next_cursor}
+
+    async def _merged_chat_summaries(self, user_id: str) -> Iterator[dict]:
+        """
+        Loads the user's own chats and the chats of every transferred guest account concurrently
+        and k-way merges the per-account lists, newest first.
+        """
+        semaphore = asyncio.Semaphore(max(config.LIST_CHATS_CONCURRENCY, 1))
+
+        async def _load_sorted(account_id):
+            async with semaphore:
+                chats = await self._collect_chat_summaries(account_id)
+            return sorted(chats, key=_chat_sort_key, reverse=True)
+
+        own_chats, guest_user_ids = await asyncio.gather(
+            _load_sorted(user_id),
+            self._get_transferred_guest_ids(user_id),
+        )
+        guest_chats = await asyncio.gather(*(_load_sorted(guest_id) for guest_id in guest_user_ids))
+        return heapq.merge(own_chats, *guest_chats, key=_chat_sort_key, reverse=True)
+
+    async def _get_transferred_guest_ids(self, user_id: str) -> List[str]:
+        if user_id.startswith("guest."):
+            return []
+        transfers = await self.data_service.get_entities_by_user_name(user_id=user_id,
+                                                                      model=const.ModelName.TRANSFER_CHATS_ENTITY.value)
+        return list(dict.fromkeys(transfer["guest_user_id"] for transfer in transfers))
+
+    @staticmethod
+    def _encode_chats_cursor(chat: dict) -> str:
+        cursor = json.dumps({"date": chat["date"], "technical_id": chat["technical_id"]})
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    @staticmethod
+    def _decode_chats_cursor(cursor: str) -> tuple:
+        try:
+            return _chat_sort_key(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise InvalidRequestException("Invalid cursor")
+
+    async def _collect_chat_summaries(self, user_id: str) -> List[dict]:
         return [{
             "technical_id": c.technical_id,
             "name": c.name,
             "description": c.description,
             "date": c.date,
-        } for c in chats]
+        } async for c in self.data_service.iter_entities_by_user_name(user_id=user_id,
+                                                                       model=const.ModelName.CHAT_BUSINESS_ENTITY.value)]
 
     async def add_chat(self, user_id: str, req_data: dict) -> dict:
         if user_id.startswith("guest."):
@@ -209,6 +270,7 @@ class ChatService:
         return {"message": "Chat created", "technical_id": tech_id, "answer_technical_id": ans_id}
 
     async def get_chat(self, auth_header: str, technical_id: str) -> dict:
+        start = time.monotonic()
         chat_business_entity = await self._get_business_chat_for_user(auth_header=auth_header,
                                                                       technical_id=technical_id)
         chat: ChatEntity = await self.entity_service.get_item(
@@ -217,13 +279,22 @@ class ChatService:
             entity_version=config.ENTITY_VERSION,
             technical_id=chat_business_entity.chat_id
         )
-        dialogue, child_entities = await self._process_message(finished_flow=chat.chat_flow.finished_flow,
-                                                               auth_header=auth_header,
-                                                               dialogue=[],
-                                                               child_entities=set())
+        # the chat's own processing data does not depend on the dialogue, fetch it while the tree is expanded
+        root_data_task = asyncio.create_task(self._fetch_entities_processing_data([chat.technical_id]))
+        try:
+            dialogue, child_entities = await self._get_dialogue(chat=chat, auth_header=auth_header)
+        except BaseException:
+            root_data_task.cancel()
+            raise
         # dialogue = self._post_process_dialogue(dialogue)
-        entities_data = await self._get_entities_processing_data(technical_id=chat.technical_id,
-                                                                 child_entities=child_entities)
+        entities_data = await root_data_task
+        entities_data.update(await self._fetch_entities_processing_data(list(child_entities)))
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        metrics.observe("chat.get_chat_ms", elapsed_ms)
+        if elapsed_ms > const.GET_CHAT_LATENCY_TARGET_MS:
+            logger.warning(f"get_chat for {technical_id} took {elapsed_ms:.0f} ms "
+                           f"(target {const.GET_CHAT_LATENCY_TARGET_MS} ms, {len(child_entities)} child entities)")
         return {
             "technical_id": technical_id,
             "name": chat_business_entity.name,
@@ -296,8 +367,119 @@ class ChatService:
         await self._rollback_dialogue_script(technical_id, chat)
         return {"message": "Successfully restarted the workflow"}
 
+    async def get_chat_updates(self, auth_header: str, technical_id: str, since: Optional[str] = None,
+                               is_known_etag: Optional[Callable[[str], bool]] = None) -> dict:
+        """
+        Returns the dialogue entries added after the `since` cursor, which is either the technical_id
+        of the last entry the client has or a last_modified timestamp. An unknown cursor returns the
+        whole dialogue with reset=True. The etag identifies the full dialogue state and the cursor, so
+        clients can send it back as If-None-Match and get 304 while nothing changed. If is_known_etag
+        accepts the etag of the chat's current snapshot, the chat is not loaded and only the etag is
+        returned, with not_modified=True.
+        """
+        chat_business_entity = await self._get_business_chat_for_user(auth_header=auth_header,
+                                                                      technical_id=technical_id)
+        snapshot = dialogue_snapshots.current(chat_business_entity.chat_id) if is_known_etag else None
+        if snapshot is not None:
+            etag = self._dialogue_etag(snapshot["dialogue"], since)
+            if is_known_etag(etag):
+                metrics.increment("chat_updates.not_modified")
+                return {"technical_id": technical_id, "etag": etag, "not_modified": True}
+        chat = await self._load_chat_entity(chat_business_entity.chat_id)
+        return await self._get_dialogue_updates(chat=chat, auth_header=auth_header, technical_id=technical_id,
+                                                since=since)
+
+    async def stream_chat_updates(self, auth_header: str, technical_id: str,
+                                  since: Optional[str] = None) -> AsyncIterator[Optional[dict]]:
+        """
+        Yields the dialogue updates after `since` (see get_chat_updates), then every dialogue entry
+        published for the chat as it is added, and the partial answers of agents still generating.
+        Yields None when nothing happened for CHAT_EVENTS_KEEPALIVE_SECONDS, so the caller can keep
+        the connection alive.
+        """
+        chat_business_entity = await self._get_business_chat_for_user(auth_header=auth_header,
+                                                                      technical_id=technical_id)
+        # subscribe before loading the chat and its dialogue, so nothing published in between is lost
+        with chat_updates.subscribe(chat_business_entity.chat_id) as subscription:
+            chat = await self._load_chat_entity(chat_business_entity.chat_id)
+            updates = await self._get_dialogue_updates(chat=chat, auth_header=auth_header,
+                                                       technical_id=technical_id, since=since)
+            updates.pop("etag")
+            sent_ids = {entry.get("technical_id") for entry in updates["dialogue"]}
+            cursor = updates["cursor"]
+            yield updates
+            while True:
+                entry = await subscription.get(timeout=const.CHAT_EVENTS_KEEPALIVE_SECONDS)
+                if subscription.overflowed:
+                    # we fell behind and events were dropped, resync from the persisted dialogue;
+                    # what is still queued is older than the dialogue we are about to read
+                    subscription.overflowed = False
+                    subscription.drain()
+                    chat = await self._load_chat_entity(chat_business_entity.chat_id)
+                    updates = await self._get_dialogue_updates(chat=chat, auth_header=auth_header,
+                                                               technical_id=technical_id, since=cursor)
+                    updates.pop("etag")
+                    if updates["reset"]:
+                        sent_ids = set()
+                    else:
+                        updates["dialogue"] = [dialogue_entry for dialogue_entry in updates["dialogue"]
+                                               if dialogue_entry.get("technical_id") not in sent_ids]
+                    sent_ids.update(dialogue_entry.get("technical_id") for dialogue_entry in updates["dialogue"])
+                    cursor = updates["cursor"]
+                    yield updates
+                    continue
+                if entry is None:
+                    yield None
+                    continue
+                if "partial" in entry:
+                    # answer still being generated, it does not move the cursor
+                    yield {"technical_id": technical_id, **entry}
+                    continue
+                if entry.get("technical_id") in sent_ids:
+                    continue
+                cursor = entry.get("technical_id")
+                sent_ids.add(cursor)
+                yield {"technical_id": technical_id, "dialogue": [entry], "cursor": cursor, "reset": False}
+
     # ─── Private helpers ─────────────────────────────────────────────────────
 
+    async def _load_chat_entity(self, chat_id: str) -> ChatEntity:
+        return await self.entity_service.get_item(
+            token=self.cyoda_auth_service,
+            entity_model=const.ModelName.CHAT_ENTITY.value,
+            entity_version=config.ENTITY_VERSION,
+            technical_id=chat_id
+        )
+
+    async def _get_dialogue_updates(self, chat: ChatEntity, auth_header: str, technical_id: str,
+                                    since: Optional[str]) -> dict:
+        dialogue, _ = await self._get_dialogue(chat=chat, auth_header=auth_header)
+
+        entry_ids = [entry.get("technical_id") or "" for entry in dialogue]
+        reset = False
+        if not since:
+            updates = dialogue
+        elif since.isdigit():
+            updates = [entry for entry in dialogue if (entry.get("last_modified") or 0) > int(since)]
+        elif since in entry_ids:
+            updates = dialogue[len(entry_ids) - entry_ids[::-1].index(since):]
+        else:
+            # the cursor no longer exists (e.g. after a rollback), resend everything
+            updates, reset = dialogue, True
+        return {
+            "technical_id": technical_id,
+            "dialogue": updates,
+            "cursor": entry_ids[-1] if entry_ids else since,
+            "reset": reset,
+            "etag": self._dialogue_etag(dialogue, since)
+        }
+
+    @staticmethod
+    def _dialogue_etag(dialogue: list, since: Optional[str]) -> str:
+        # the body depends on the cursor too, a validator must not match the answer to another cursor
+        entry_ids = [entry.get("technical_id") or "" for entry in dialogue]
+        return hashlib.sha1("\n".join([since or ""] + entry_ids).encode()).hexdigest()
+
     async def _get_business_chat_for_user(self, auth_header, technical_id):
         user_id = self._get_user_id(auth_header)
         if not user_id:
@@ -352,7 +534,7 @@ class ChatService:
         if not token:
             raise InvalidTokenException()
         try:
-            decoded = jwt.decode(token, options={"verify_signature": False})
+            decoded = TokenValidationCache.claims(token)
             user_id = decoded.get("caas_org_id")
             if not user_id:
                 raise InvalidTokenException()
@@ -461,106 +643,185 @@ class ChatService:
             return (True, "Consider the file contents") if user_file else (False, "Invalid entity")
         return True, answer
 
+    async def _get_dialogue(self, chat: ChatEntity, auth_header) -> Tuple[list, set]:
+        """
+        Returns the chat's dialogue from its snapshot, rendering only the finished_flow
+        entries appended since the snapshot was taken.
+        """
+        finished_flow = chat.chat_flow.finished_flow
+        snapshot = dialogue_snapshots.get(chat.technical_id, finished_flow)
+        if snapshot is None:
+            metrics.increment("dialogue_snapshots.misses")
+            dialogue, child_entities = await self._process_message(finished_flow=finished_flow,
+                                                                   auth_header=auth_header,
+                                                                   dialogue=[],
+                                                                   child_entities=set())
+        else:
+            metrics.increment("dialogue_snapshots.hits")
+            dialogue, child_entities = snapshot["dialogue"], set(snapshot["child_entities"])
+            if snapshot["flow_length"] == len(finished_flow):
+                return dialogue, child_entities
+            dialogue, child_entities = await self._process_message(
+                finished_flow=finished_flow[snapshot["flow_length"]:],
+                auth_header=auth_header,
+                dialogue=dialogue,
+                child_entities=child_entities)
+        dialogue_snapshots.put(chat.technical_id, finished_flow, dialogue, child_entities, previous=snapshot)
+        return dialogue, child_entities
+
+    @staticmethod
+    def _is_dialogue_message(msg) -> bool:
+        return is_dialogue_message(msg)
+
     async def _process_message(self, finished_flow: List[FlowEdgeMessage], auth_header, dialogue: list,
                                child_entities: set) -> Tuple[
         list, set]:
+        """
+        Rebuilds the dialogue of a chat and of its child entities. The entity tree is expanded
+        level by level, each level costing one bulk edge message fetch and one bulk child entity fetch,
+        then the dialogue is assembled depth first so messages keep their flow order.
+        """
+        contents_by_id = {}
+        children_by_id = {}
+        level = [finished_flow]
+        while level:
+            edge_message_ids = list(dict.fromkeys(
+                msg.edge_message_id for flow in level for msg in flow
+                if (self._is_dialogue_message(msg) or msg.type == "child_entities")
+                and msg.edge_message_id not in contents_by_id
+            ))
+            contents: List[FlowEdgeMessage] = await self.entity_service.get_items_by_ids(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.FLOW_EDGE_MESSAGE.value,
+                entity_version=config.ENTITY_VERSION,
+                technical_ids=edge_message_ids,
+                meta={"type": config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+            )
+            contents_by_id.update(zip(edge_message_ids, contents))
+
+            child_ids = list(dict.fromkeys(
+                child_id for flow in level for msg in flow
+                if msg.type == "child_entities" and contents_by_id.get(msg.edge_message_id)
+                for child_id in contents_by_id[msg.edge_message_id].message
+                if child_id not in children_by_id
+            ))
+            children = await self.entity_service.get_items_by_ids(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.CHAT_ENTITY.value,
+                entity_version=config.ENTITY_VERSION,
+                technical_ids=child_ids
+            )
+            children_by_id.update(zip(child_ids, children))
+            level = [child.chat_flow.finished_flow for child in children if child]
 
+        self._assemble_dialogue(finished_flow, contents_by_id, children_by_id, dialogue, child_entities,
+                                ancestors=frozenset())
+        return dialogue, child_entities
+
+    def _assemble_dialogue(self, finished_flow: List[FlowEdgeMessage], contents_by_id: dict, children_by_id: dict,
+                           dialogue: list, child_entities: set, ancestors: frozenset) -> None:
         for msg in finished_flow:
-            if msg.type in ("question", "notification", "answer", const.UI_FUNCTION_PREFIX) and msg.publish:
-                content: FlowEdgeMessage = await self.entity_service.get_item(
-                    token=self.cyoda_auth_service,
-                    entity_model=const.ModelName.FLOW_EDGE_MESSAGE.value,
-                    entity_version=config.ENTITY_VERSION,
-                    technical_id=msg.edge_message_id,
-                    meta={"type": config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
-                )
-                content.technical_id = msg.edge_message_id
-                if content.type == "question" and content.approve:
-                    approve_msg = const.Notifications.APPROVE_INSTRUCTION_MESSAGE.value
-                    if not content.message.rstrip().endswith(approve_msg.rstrip()):
-                        content.message = f"{content.message.rstrip()}\n\n{approve_msg}"
-                if content.type == "answer" and content.message == const.Notifications.APPROVE.value:
-                    content.message = random.choice(list(const.ApproveAnswer)).value
-                message_content = content.model_dump()
-                # todo - for backwards compatibility - remove
-                message_content[content.type] = content.message
-                dialogue.append(message_content)
+            if self._is_dialogue_message(msg):
+                content: FlowEdgeMessage = contents_by_id.get(msg.edge_message_id)
+                if not content:
+                    logger.warning(f"Edge message {msg.edge_message_id} not found, skipping")
+                    continue
+                dialogue.append(to_dialogue_entry(content, msg.edge_message_id))
 
             if msg.type == "child_entities":
-                content: FlowEdgeMessage = await self.entity_service.get_item(
-                    token=self.cyoda_auth_service,
-                    entity_model=const.ModelName.FLOW_EDGE_MESSAGE.value,
-                    entity_version=config.ENTITY_VERSION,
-                    technical_id=msg.edge_message_id,
-                    meta={"type": config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
-                )
+                content: FlowEdgeMessage = contents_by_id.get(msg.edge_message_id)
+                if not content:
+                    logger.warning(f"Edge message {msg.edge_message_id} not found, skipping")
+                    continue
                 for child_id in content.message:
                     child_entities.add(child_id)
-                    child = await self.entity_service.get_item(
-                        token=self.cyoda_auth_service,
-                        entity_model=const.ModelName.CHAT_ENTITY.value,
-                        entity_version=config.ENTITY_VERSION,
-                        technical_id=child_id
-                    )
-                    await self._process_message(finished_flow=child.chat_flow.finished_flow,
-                                                auth_header=auth_header,
-                                                dialogue=dialogue,
-                                                child_entities=child_entities)
-        return dialogue, child_entities
-
-    async def _get_entities_processing_data(self, technical_id, child_entities):
+                    child = children_by_id.get(child_id)
+                    # a child pointing back at one of its ancestors would recurse forever
+                    if not child or child_id in ancestors:
+                        continue
+                    self._assemble_dialogue(child.chat_flow.finished_flow, contents_by_id, children_by_id,
+                                            dialogue, child_entities, ancestors | {child_id})
+
+    async def _fetch_entities_processing_data(self, entity_ids: List[str]) -> dict:
         """
-        Fetch processing data (versions and possible transitions) for a parent entity and its child entities.
+        Fetch processing data (versions and possible transitions) for the entities, concurrently.
         Returns a dict mapping entity IDs to their data.
         """
+        if not entity_ids:
+            return {}
+        technical_id = entity_ids[0]
         try:
-            # Retrieve processor remote address
-            resp = await send_cyoda_request(
-                cyoda_auth_service=self.cyoda_auth_service,
-                method="get",
-                path=const.ApiV1Endpoint.PROCESSOR_REMOTE_ADDRESS_PATH.value
-            )
-            nodes = resp.get('json', {}).get('pmNodes', [])
-            if not nodes:
-                raise ValueError('No processor nodes found')
-            remote_address = nodes[0].get('hostname')
+            remote_address = await self._get_processor_address()
+            semaphore = asyncio.Semaphore(config.CYODA_FETCH_CONCURRENCY)
 
-            # Prepare to fetch events for parent and child entities
-            entity_events = {}
-            entity_ids = [technical_id] + list(child_entities)
-
-            for entity_id in entity_ids:
+            async def fetch_events(entity_id):
                 path = const.ApiV1Endpoint.PROCESSOR_ENTITY_EVENTS_PATH.value.format(
                     processor_node_address=remote_address,
                     entity_class=const.JavaClasses.TREE_NODE_ENTITY.value,
                     entity_id=entity_id
                 )
-                resp = await send_cyoda_request(
-                    cyoda_auth_service=self.cyoda_auth_service,
-                    method="get",
-                    path=path
-                )
-                data = resp.get('json', {})
-                # todo need to improve - no need to fetch the whole entity to get workflow_name
-                entity: AgenticFlowEntity = await self.entity_service.get_item(
-                    token=self.cyoda_auth_service,
-                    entity_model=const.ModelName.AGENTIC_FLOW_ENTITY.value,
-                    entity_version=config.ENTITY_VERSION,
-                    technical_id=entity_id
-                )
-                entity_events[entity_id] = {
-                    'workflow_name': entity.workflow_name,
+                async with semaphore:
+                    resp = await send_cyoda_request(
+                        cyoda_auth_service=self.cyoda_auth_service,
+                        method="get",
+                        path=path
+                    )
+                return resp.get('json', {})
+
+            events, workflow_names = await asyncio.gather(
+                asyncio.gather(*(fetch_events(entity_id) for entity_id in entity_ids)),
+                self._get_workflow_names(entity_ids)
+            )
+            return {
+                entity_id: {
+                    'workflow_name': workflow_names.get(entity_id),
                     'entity_versions': data.get('entityVersions', []),
                     'next_transitions': data.get('possibleTransitions', [])
                 }
-
-            return entity_events
+                for entity_id, data in zip(entity_ids, events)
+            }
 
         except Exception as exc:
-            # Log the error and re-raise for upstream handling
+            # the processor node may have moved, look it up again next time
+            self._processor_address.delete("hostname")
             logger.exception("Failed to retrieve processing data for entity %s: %s", technical_id, exc)
         return {}
 
+    async def _get_processor_address(self) -> str:
+        remote_address = self._processor_address.get("hostname")
+        if remote_address:
+            return remote_address
+        resp = await send_cyoda_request(
+            cyoda_auth_service=self.cyoda_auth_service,
+            method="get",
+            path=const.ApiV1Endpoint.PROCESSOR_REMOTE_ADDRESS_PATH.value
+        )
+        nodes = resp.get('json', {}).get('pmNodes', [])
+        if not nodes:
+            raise ValueError('No processor nodes found')
+        remote_address = nodes[0].get('hostname')
+        self._processor_address.set("hostname", remote_address)
+        return remote_address
+
+    async def _get_workflow_names(self, entity_ids: List[str]) -> dict:
+        """
+        Returns entity id -> workflow_name from the index, loading the missing entities in one bulk fetch.
+        """
+        workflow_names = {entity_id: self._workflow_names.get(entity_id) for entity_id in entity_ids}
+        missing_ids = [entity_id for entity_id, name in workflow_names.items() if name is None]
+        if missing_ids:
+            entities: List[AgenticFlowEntity] = await self.entity_service.get_items_by_ids(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.AGENTIC_FLOW_ENTITY.value,
+                entity_version=config.ENTITY_VERSION,
+                technical_ids=missing_ids
+            )
+            for entity_id, entity in zip(missing_ids, entities):
+                if entity and entity.workflow_name:
+                    workflow_names[entity_id] = entity.workflow_name
+                    self._workflow_names.set(entity_id, entity.workflow_name)
+        return workflow_names
+
     async def _get_entities_by_condition(self, model, condition):
         return await self.entity_service.get_items_by_condition(
             token=self.cyoda_auth_service,
@@ -11,6 +11,7 @@ from common.grpc_client.grpc_client import GrpcClient
 from common.repository.cyoda.cyoda_repository import CyodaRepository
 from common.repository.in_memory_db import InMemoryRepository
 from common.service.data_retrieval_service import DataRetrievalService
+from common.service.query_cache import QueryResultCache
 from common.service.service import EntityServiceImpl
 from common.service.user_service import UserService
 from common.workflow.converter_v2.workflow_converter_service import CyodaWorkflowConverterService
@@ -51,8 +52,11 @@ class ServicesFactory:
             self.device_sessions = {}
             self.entity_repository = self._create_repository(repo_type=env_config.CHAT_REPOSITORY,
                                                              cyoda_auth_service=self.cyoda_auth_service)
-            self.entity_service = EntityServiceImpl(repository=self.entity_repository, model_registry=model_registry)
-            self.data_service = DataRetrievalService(cyoda_auth_service=self.cyoda_auth_service, entity_service=self.entity_service)
+            self.query_cache = QueryResultCache(ttl=env_config.QUERY_CACHE_TTL, max_bytes=env_config.QUERY_CACHE_MAX_BYTES)
+            self.entity_service = EntityServiceImpl(repository=self.entity_repository, model_registry=model_registry,
+                                                    query_cache=self.query_cache)
+            self.data_service = DataRetrievalService(cyoda_auth_service=self.cyoda_auth_service, entity_service=self.entity_service,
+                                                     query_cache=self.query_cache)
             self.user_service = UserService(cyoda_auth_service=self.cyoda_auth_service, entity_service=self.entity_service, data_service=self.data_service)
             self.workflow_helper_service = WorkflowHelperService(cyoda_auth_service=self.cyoda_auth_service, entity_service=self.entity_service)
             self.workflow = Workflow()
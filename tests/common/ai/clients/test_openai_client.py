@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from common.ai.clients import openai_client
+from common.ai.clients.openai_client import AsyncOpenAIClient
+from common.utils.cache import MemoryCache
+from entity.model import ModelConfig
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None, usage=None, choices=True):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(
+        id="cmpl-1", created=1, model="gpt-4.1-mini", usage=usage,
+        choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)] if choices else []
+    )
+
+
+def _tool_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(openai_client, "_completion_cache", MemoryCache("test_completions", max_bytes=1024 * 1024))
+    # skip AsyncOpenAI(), it needs an api key
+    client = AsyncOpenAIClient.__new__(AsyncOpenAIClient)
+    client.client = MagicMock()
+    client.client.chat.completions.create = AsyncMock()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_streamed_completion_reports_content_and_assembles_message(client):
+    client.client.chat.completions.create.return_value = _stream([
+        _chunk(content="Hel"), _chunk(content="lo"), _chunk(finish_reason="stop"),
+        _chunk(usage={"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}, choices=False),
+    ])
+    received = []
+
+    completion = await client.create_completion(model=ModelConfig(), messages=[{"role": "user", "content": "hi"}],
+                                                on_content=lambda parts: received.append("".join(parts)))
+
+    assert received == ["Hel", "Hello"]
+    assert completion.choices[0].message.content == "Hello"
+    assert completion.choices[0].message.tool_calls is None
+    assert completion.choices[0].finish_reason == "stop"
+    assert completion.usage.total_tokens == 5
+    assert client.client.chat.completions.create.call_args[1]["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_streamed_completion_assembles_tool_calls(client):
+    client.client.chat.completions.create.return_value = _stream([
+        _chunk(tool_calls=[_tool_delta(0, id="call_a", name="web_search", arguments='{"qu')]),
+        _chunk(tool_calls=[_tool_delta(1, id="call_b", name="read_link", arguments='{"url": "x"}')]),
+        _chunk(tool_calls=[_tool_delta(0, arguments='ery": "y"}')]),
+        _chunk(finish_reason="tool_calls"),
+    ])
+    on_content = AsyncMock()
+
+    completion = await client.create_completion(model=ModelConfig(), messages=[{"role": "user", "content": "hi"}],
+                                                on_content=on_content)
+
+    calls = completion.choices[0].message.tool_calls
+    assert [(c.id, c.function.name, c.function.arguments) for c in calls] == [
+        ("call_a", "web_search", '{"query": "y"}'),
+        ("call_b", "read_link", '{"url": "x"}'),
+    ]
+    on_content.assert_not_awaited()
+
+
+def _completion(content="answer"):
+    return ChatCompletion.model_validate({
+        "id": "cmpl-1", "created": 1, "model": "gpt-4.1-mini", "object": "chat.completion",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    })
+
+
+@pytest.mark.asyncio
+async def test_deterministic_completion_is_cached(client):
+    client.client.chat.completions.create.return_value = _completion()
+    model = ModelConfig(temperature=0)
+    messages = [{"role": "user", "content": "convert this workflow"}]
+
+    first = await client.create_completion(model=model, messages=messages)
+    second = await client.create_completion(model=model, messages=list(messages))
+    other = await client.create_completion(model=model, messages=[{"role": "user", "content": "something else"}])
+
+    assert first.choices[0].message.content == second.choices[0].message.content == "answer"
+    assert other.choices[0].message.content == "answer"
+    assert client.client.chat.completions.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_is_replayed_to_on_content(client):
+    client.client.chat.completions.create.return_value = _completion()
+    model = ModelConfig(temperature=0)
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}])
+    received = []
+
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}],
+                                   on_content=lambda parts: received.append("".join(parts)))
+
+    assert received == ["answer"]
+    assert client.client.chat.completions.create.await_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model", [
+    ModelConfig(temperature=0.7),
+    ModelConfig(temperature=0, cache_completions=False),
+    ModelConfig(model_name="o4-mini", temperature=0),
+])
+async def test_non_deterministic_completion_is_not_cached(client, model):
+    client.client.chat.completions.create.return_value = _completion()
+
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}])
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}])
+
+    assert client.client.chat.completions.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_truncated_completion_is_not_cached(client):
+    truncated = _completion()
+    truncated.choices[0].finish_reason = "length"
+    client.client.chat.completions.create.return_value = truncated
+    model = ModelConfig(temperature=0)
+
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}])
+    await client.create_completion(model=model, messages=[{"role": "user", "content": "hi"}])
+
+    assert client.client.chat.completions.create.await_count == 2
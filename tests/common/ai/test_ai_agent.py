@@ -0,0 +1,279 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from common.ai import ai_agent
+from common.ai.ai_agent import OpenAiAgent
+from common.config import const
+from entity.model import AIMessage, ModelConfig
+
+
+def _tool_call(call_id, name, **args):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def _completion(content=None, tool_calls=None):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content, tool_calls=tool_calls))])
+
+
+@pytest.fixture
+def agent():
+    client = MagicMock()
+    client.create_completion = AsyncMock()
+    return OpenAiAgent(client=client, max_calls=3)
+
+
+async def _run(agent, methods_dict, tool_calls, model):
+    agent.client.create_completion.side_effect = [_completion(tool_calls=tool_calls), _completion(content="done")]
+    result = await agent.run_agent(methods_dict=methods_dict, technical_id="tech_id", cls_instance=None,
+                                   entity=None, tools=[], model=model,
+                                   messages=[AIMessage(role="user", content="hi")])
+    messages = agent.client.create_completion.call_args_list[-1][1]["messages"]
+    return result, [message for message in messages if isinstance(message, dict) and message["role"] == "tool"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_run_concurrently_and_keep_order(agent):
+    barrier = asyncio.Barrier(2)
+
+    async def web_search(cls_instance, technical_id, entity, query):
+        # both calls have to be in flight at the same time to pass the barrier
+        await asyncio.wait_for(barrier.wait(), 1)
+        return f"results for {query}"
+
+    result, tool_messages = await _run(
+        agent, {"web_search": web_search},
+        [_tool_call("c1", "web_search", query="a"), _tool_call("c2", "web_search", query="b")],
+        ModelConfig(parallel_tool_calls=True)
+    )
+
+    assert result == "done"
+    assert [(m["tool_call_id"], m["content"]) for m in tool_messages] == [("c1", "results for a"),
+                                                                          ("c2", "results for b")]
+
+
+@pytest.mark.asyncio
+async def test_serial_tool_waits_for_earlier_calls(agent):
+    events = []
+
+    async def read_link(cls_instance, technical_id, entity, url):
+        events.append(f"start {url}")
+        await asyncio.sleep(0.01)
+        events.append(f"end {url}")
+        return url
+
+    async def save_file(cls_instance, technical_id, entity, path):
+        events.append(f"save {path}")
+        return "saved"
+
+    assert "save_file" not in const.PARALLEL_SAFE_TOOL_FUNCTIONS
+    _, tool_messages = await _run(
+        agent, {"read_link": read_link, "save_file": save_file},
+        [_tool_call("c1", "read_link", url="a"), _tool_call("c2", "read_link", url="b"),
+         _tool_call("c3", "save_file", path="x"), _tool_call("c4", "read_link", url="c")],
+        ModelConfig(parallel_tool_calls=True)
+    )
+
+    assert events[:2] == ["start a", "start b"]
+    assert events[4:] == ["save x", "start c", "end c"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["c1", "c2", "c3", "c4"]
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_are_sequential_by_default(agent):
+    running = 0
+    max_running = 0
+
+    async def web_search(cls_instance, technical_id, entity, query):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return query
+
+    await _run(agent, {"web_search": web_search},
+               [_tool_call(f"c{i}", "web_search", query=str(i)) for i in range(3)], ModelConfig())
+
+    assert max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_respect_concurrency_cap(agent):
+    running = 0
+    max_running = 0
+
+    async def web_search(cls_instance, technical_id, entity, query):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return query
+
+    await _run(agent, {"web_search": web_search},
+               [_tool_call(f"c{i}", "web_search", query=str(i)) for i in range(5)],
+               ModelConfig(parallel_tool_calls=True, max_parallel_tool_calls=2))
+
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_tools_not_known_to_be_read_only_run_serially(agent):
+    running = 0
+    max_running = 0
+
+    async def convert_workflow_to_dto(cls_instance, technical_id, entity, path):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return path
+
+    await _run(agent, {"convert_workflow_to_dto": convert_workflow_to_dto},
+               [_tool_call(f"c{i}", "convert_workflow_to_dto", path=str(i)) for i in range(3)],
+               ModelConfig(parallel_tool_calls=True))
+
+    assert max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_tool_timeout_is_reported_to_the_model(agent):
+    async def read_link(cls_instance, technical_id, entity, url):
+        await asyncio.sleep(1)
+
+    _, tool_messages = await _run(agent, {"read_link": read_link}, [_tool_call("c1", "read_link", url="a")],
+                                  ModelConfig(tool_timeout_seconds=0.01))
+
+    assert tool_messages[0]["content"] == "Error: the tool read_link did not finish within 0.01 seconds."
+
+
+@pytest.mark.asyncio
+async def test_tool_timeout_does_not_cut_tools_with_side_effects_short(agent):
+    async def save_file(cls_instance, technical_id, entity, path):
+        await asyncio.sleep(0.05)
+        return "saved"
+
+    _, tool_messages = await _run(agent, {"save_file": save_file}, [_tool_call("c1", "save_file", path="x")],
+                                  ModelConfig(tool_timeout_seconds=0.01))
+
+    assert tool_messages[0]["content"] == "saved"
+
+
+@pytest.mark.asyncio
+async def test_malformed_arguments_do_not_stop_earlier_calls(agent):
+    save_file = AsyncMock(return_value="saved")
+    broken = SimpleNamespace(id="c2", function=SimpleNamespace(name="save_file", arguments='{"path": '))
+    agent.client.create_completion.side_effect = [_completion(tool_calls=[_tool_call("c1", "save_file", path="x"),
+                                                                          broken])]
+
+    with pytest.raises(json.JSONDecodeError):
+        await agent.run_agent(methods_dict={"save_file": save_file}, technical_id="tech_id", cls_instance=None,
+                              entity=None, tools=[], model=ModelConfig(parallel_tool_calls=True),
+                              messages=[AIMessage(role="user", content="hi")])
+
+    save_file.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ui_function_stops_execution(agent):
+    web_search = AsyncMock(return_value="result")
+    agent.client.create_completion.side_effect = [_completion(tool_calls=[
+        _tool_call("c1", "web_search", query="a"),
+        _tool_call("c2", f"{const.UI_FUNCTION_PREFIX}_open", target="x"),
+        _tool_call("c3", "web_search", query="b"),
+    ])]
+
+    result = await agent.run_agent(methods_dict={"web_search": web_search}, technical_id="tech_id",
+                                   cls_instance=None, entity=None, tools=[],
+                                   model=ModelConfig(parallel_tool_calls=True),
+                                   messages=[AIMessage(role="user", content="hi")])
+
+    assert json.loads(result) == {"type": const.UI_FUNCTION_PREFIX,
+                                  "function": f"{const.UI_FUNCTION_PREFIX}_open", "target": "x"}
+    web_search.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_on_content_is_passed_to_the_client(agent):
+    on_content = MagicMock()
+    agent.client.create_completion.side_effect = [_completion(content="done")]
+
+    await agent.run_agent(methods_dict={}, technical_id="tech_id", cls_instance=None, entity=None, tools=[],
+                          model=ModelConfig(), messages=[AIMessage(role="user", content="hi")],
+                          on_content=on_content)
+
+    assert agent.client.create_completion.call_args[1]["on_content"] is on_content
+
+
+@pytest.mark.asyncio
+async def test_json_schema_answers_are_not_streamed(agent):
+    agent.client.create_completion.side_effect = [_completion(content='{"a": 1}')]
+
+    await agent.run_agent(methods_dict={}, technical_id="tech_id", cls_instance=None, entity=None, tools=[],
+                          model=ModelConfig(), messages=[AIMessage(role="user", content="hi")],
+                          response_format={"name": "a", "schema": {"type": "object"}}, on_content=MagicMock())
+
+    assert "on_content" not in agent.client.create_completion.call_args[1]
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "items": {"type": "array", "items": {"type": "integer"}}},
+    "required": ["name", "items"],
+}
+
+
+@pytest.mark.asyncio
+async def test_schema_errors_are_reported_in_one_repair_message(agent):
+    messages = []
+
+    valid, msg = await agent._validate_with_schema(messages, json.dumps({"name": 1, "items": [1, "x", "y"]}),
+                                                   SCHEMA, attempt=1, max_retries=3)
+
+    assert valid is None
+    assert "3 error(s)" in msg
+    assert "- at $.items[1]: 'x' is not of type 'integer'" in msg
+    assert "- at $.items[2]: 'y' is not of type 'integer'" in msg
+    assert "- at $.name: 1 is not of type 'string'" in msg
+    assert messages == [{"role": "user", "content": msg}]
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_error_points_at_position(agent):
+    valid, msg = await agent._validate_with_schema([], '{"name": "a",, "items": []}', SCHEMA,
+                                                   attempt=1, max_retries=3)
+
+    assert valid is None
+    assert "invalid json at line 1 column 14" in msg
+
+
+@pytest.mark.asyncio
+async def test_schema_validator_is_compiled_once(agent):
+    ai_agent._get_validator.cache_clear()
+    content = json.dumps({"name": "a", "items": [1]})
+
+    for _ in range(3):
+        valid, msg = await agent._validate_with_schema([], content, dict(SCHEMA), attempt=1, max_retries=3)
+        assert (valid, msg) == (content, None)
+
+    assert ai_agent._get_validator.cache_info().misses == 1
+
+
+@pytest.mark.asyncio
+async def test_run_agent_retries_with_repair_hint(agent):
+    valid = json.dumps({"name": "a", "items": [1]})
+    agent.client.create_completion.side_effect = [_completion(content='{"name": "a"}'), _completion(content=valid)]
+
+    result = await agent.run_agent(methods_dict={}, technical_id="tech_id", cls_instance=None, entity=None,
+                                   tools=[], model=ModelConfig(), messages=[AIMessage(role="user", content="hi")],
+                                   response_format={"name": "a", "schema": SCHEMA})
+
+    assert result == valid
+    retry_messages = agent.client.create_completion.call_args_list[1][1]["messages"]
+    # the same list also got the final answer appended afterwards
+    assert "- at $: 'items' is a required property" in retry_messages[-2]["content"]
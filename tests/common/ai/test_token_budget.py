@@ -0,0 +1,44 @@
+from common.ai.token_budget import (
+    MESSAGE_OVERHEAD_TOKENS,
+    count_message_tokens,
+    estimate_tokens,
+    get_tokenizer,
+    newest_within_budget,
+    register_tokenizer,
+)
+from common.config.config import config
+from entity.model import AIMessage, ModelConfig
+
+
+class TestTokenBudget:
+    """Test cases for token budgeting helpers."""
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 40) == 11
+
+    def test_registered_tokenizer_is_used(self):
+        register_tokenizer("test-model", lambda text: len(text.split()))
+        assert get_tokenizer("test-model")("one two three") == 3
+        assert get_tokenizer("unknown-model") is estimate_tokens
+
+    def test_list_content_is_joined(self):
+        message = AIMessage(role="user", content=["one", "two"])
+        assert count_message_tokens(message, lambda text: len(text)) == len("one two") + MESSAGE_OVERHEAD_TOKENS
+
+    def test_newest_within_budget_keeps_suffix(self):
+        messages = [AIMessage(role="user", content=str(i)) for i in range(5)]
+        per_message = 1 + MESSAGE_OVERHEAD_TOKENS
+
+        kept = newest_within_budget(messages, budget=3 * per_message, tokenizer=lambda text: 1)
+
+        assert [m.content for m in kept] == ["2", "3", "4"]
+
+    def test_model_budget_defaults_to_configured_cap(self, monkeypatch):
+        monkeypatch.setattr(config, "MEMORY_TOKEN_BUDGET", 32000)
+        assert ModelConfig(model_name="gpt-4.1-mini").get_memory_token_budget() == 32000
+        assert ModelConfig(memory_token_budget=500).get_memory_token_budget() == 500
+        monkeypatch.setattr(config, "MEMORY_TOKEN_BUDGET", 0)
+        assert ModelConfig(model_name="gpt-4o-mini", max_tokens=1000).get_memory_token_budget() == 127000
+        monkeypatch.setattr(config, "MEMORY_TOKEN_BUDGET", 200000)
+        assert ModelConfig(model_name="gpt-4o-mini", max_tokens=1000).get_memory_token_budget() == 127000
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from common.auth import cyoda_auth
+from common.auth.cyoda_auth import CyodaAuthService
+
+
+def _response(status_code=200, json_data=None):
+    response = MagicMock(status_code=status_code, text="")
+    response.json.return_value = json_data or {}
+    return response
+
+
+class TestCyodaAuthService:
+    """Test cases for CyodaAuthService token management."""
+
+    @pytest.fixture
+    def requests_mock(self):
+        with patch.object(cyoda_auth, "requests") as requests_mock:
+            requests_mock.post.return_value = _response(json_data={"refreshToken": "refresh"})
+            requests_mock.get.return_value = _response(json_data={"token": "access", "expires_in": 300})
+            yield requests_mock
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_refresh(self, requests_mock):
+        release = threading.Event()
+
+        def get_token(*args, **kwargs):
+            release.wait(1)
+            return _response(json_data={"token": "access", "expires_in": 300})
+
+        requests_mock.get.side_effect = get_token
+        service = CyodaAuthService()
+
+        callers = [asyncio.ensure_future(service.get_access_token_async()) for _ in range(10)]
+        sync_caller = asyncio.get_running_loop().run_in_executor(None, service.get_access_token)
+        await asyncio.sleep(0.05)
+        # the loop is not blocked while the refresh runs
+        assert not any(caller.done() for caller in callers)
+        release.set()
+
+        tokens = await asyncio.gather(*callers, sync_caller)
+
+        assert tokens == ["access"] * 11
+        assert requests_mock.post.call_count == 1
+        assert requests_mock.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_valid_token_is_reused(self, requests_mock):
+        service = CyodaAuthService()
+
+        assert await service.get_access_token_async() == "access"
+        assert service.get_access_token() == "access"
+
+        assert requests_mock.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_token_about_to_expire_is_refreshed_in_background(self, requests_mock):
+        service = CyodaAuthService()
+        service._refresh_token = "refresh"
+        service._access_token = "old"
+        service._access_token_expiry = time.time() + cyoda_auth.ACCESS_TOKEN_REFRESH_AHEAD / 2
+
+        assert await service.get_access_token_async() == "old"
+        await asyncio.wrap_future(service._refresh_future)
+
+        assert await service.get_access_token_async() == "access"
+        assert requests_mock.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_token_waits_for_refresh(self, requests_mock):
+        service = CyodaAuthService()
+        service._refresh_token = "refresh"
+        service._access_token = "old"
+        service._access_token_expiry = time.time() + cyoda_auth.ACCESS_TOKEN_EXPIRY_MARGIN / 2
+
+        assert await service.get_access_token_async() == "access"
+
+    @pytest.mark.asyncio
+    async def test_revoked_refresh_token_logs_in_again(self, requests_mock):
+        requests_mock.get.side_effect = [_response(status_code=401),
+                                         _response(json_data={"token": "access", "expires_in": 300})]
+        service = CyodaAuthService()
+        service._refresh_token = "revoked"
+
+        assert await service.get_access_token_async() == "access"
+        assert requests_mock.post.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_is_raised_and_retried_next_time(self, requests_mock):
+        requests_mock.get.side_effect = [_response(status_code=500),
+                                         _response(json_data={"token": "access", "expires_in": 300})]
+        service = CyodaAuthService()
+
+        with pytest.raises(RuntimeError):
+            await service.get_access_token_async()
+        assert await service.get_access_token_async() == "access"
+
+    def test_invalidate_ignores_stale_token(self, requests_mock):
+        service = CyodaAuthService()
+        assert service.get_access_token() == "access"
+
+        service.invalidate_tokens(stale_token="an older token")
+        assert service._access_token == "access"
+
+        service.invalidate_tokens(stale_token="access")
+        assert service._access_token is None
@@ -0,0 +1,166 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+import jwt
+import pytest
+
+from common.auth import jwks
+from common.auth.jwks import JwksKeyStore, verify_token_locally
+from common.exception.exceptions import InvalidTokenException
+from common.utils import request_utils
+
+JWKS_URL = "https://cyoda.example/jwks"
+
+
+def _store(**kwargs):
+    params = dict(jwks_url=JWKS_URL, public_key="", ttl=3600, min_refresh_interval=30)
+    params.update(kwargs)
+    return JwksKeyStore(**params)
+
+
+class TestJwksKeyStore:
+    """Test cases for local token verification against Cyoda's signing keys."""
+
+    @pytest.fixture(autouse=True)
+    def crypto_available(self, monkeypatch):
+        monkeypatch.setattr(jwks, "CRYPTOGRAPHY_AVAILABLE", True)
+
+    def test_disabled_without_keys_or_cryptography(self, monkeypatch):
+        assert not _store(jwks_url="").enabled
+        monkeypatch.setattr(jwks, "CRYPTOGRAPHY_AVAILABLE", False)
+        assert not _store().enabled
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_refetches_at_most_once_per_interval(self):
+        store = _store()
+        send_mock = AsyncMock(return_value={"status": 200, "json": {"keys": []}})
+
+        with patch.object(jwks, "send_request", send_mock):
+            assert await store.get_key("kid-1") is None
+            assert await store.get_key("kid-1") is None
+
+        assert send_mock.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_symmetric_algorithms_are_rejected(self):
+        token = jwt.encode({"sub": "user"}, "a-shared-secret-of-sufficient-length", algorithm="HS256",
+                           headers={"kid": "kid-1"})
+
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            await verify_token_locally(token, key_store=_store())
+
+    @pytest.mark.asyncio
+    async def test_rsa_token_verified_with_rotated_key(self):
+        pytest.importorskip("cryptography")
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        old_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+        def jwk(private_key, kid):
+            return {**jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True),
+                    "kid": kid, "alg": "RS256", "use": "sig"}
+
+        send_mock = AsyncMock(side_effect=[
+            {"status": 200, "json": {"keys": [jwk(old_key, "old")]}},
+            {"status": 200, "json": {"keys": [jwk(new_key, "new")]}},
+        ])
+        store = _store(min_refresh_interval=0)
+        claims = {"caas_org_id": "user", "exp": int(time.time()) + 60}
+
+        with patch.object(jwks, "send_request", send_mock):
+            old_token = jwt.encode(claims, old_key, algorithm="RS256", headers={"kid": "old"})
+            assert (await verify_token_locally(old_token, key_store=store))["caas_org_id"] == "user"
+            new_token = jwt.encode(claims, new_key, algorithm="RS256", headers={"kid": "new"})
+            assert (await verify_token_locally(new_token, key_store=store))["caas_org_id"] == "user"
+            forged = jwt.encode(claims, old_key, algorithm="RS256", headers={"kid": "new"})
+            with pytest.raises(jwt.InvalidSignatureError):
+                await verify_token_locally(forged, key_store=store)
+
+        assert send_mock.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_algorithm_not_matching_pem_key_is_rejected(self):
+        pytest.importorskip("cryptography")
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+        rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = rsa_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+        store = _store(jwks_url="", public_key=pem)
+        claims = {"caas_org_id": "user", "exp": int(time.time()) + 60}
+        es_token = jwt.encode(claims, ec.generate_private_key(ec.SECP256R1()), algorithm="ES256")
+
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            await verify_token_locally(es_token, key_store=store)
+        rs_token = jwt.encode(claims, rsa_key, algorithm="RS256")
+        assert (await verify_token_locally(rs_token, key_store=store))["caas_org_id"] == "user"
+
+    @pytest.mark.asyncio
+    async def test_malformed_pem_key_falls_back_to_remote_check(self):
+        pytest.importorskip("cryptography")
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        pem = "-----BEGIN PUBLIC KEY-----\nnot a key\n-----END PUBLIC KEY-----"
+        token = jwt.encode({"caas_org_id": "user"}, rsa.generate_private_key(public_exponent=65537, key_size=2048),
+                           algorithm="RS256")
+
+        assert not _store(jwks_url="", public_key=pem).enabled
+        assert await verify_token_locally(token, key_store=_store(public_key=pem)) is None
+
+
+class TestValidateWithCyodaLocalMode:
+    """validate_with_cyoda with CYODA_LOCAL_TOKEN_VERIFICATION on."""
+
+    @pytest.fixture(autouse=True)
+    def local_mode(self, monkeypatch):
+        monkeypatch.setattr(request_utils.config, "CYODA_LOCAL_TOKEN_VERIFICATION", True)
+        request_utils.token_validations.clear()
+
+    @pytest.mark.asyncio
+    async def test_locally_verified_token_skips_remote_check(self):
+        send_mock = AsyncMock()
+        with patch.object(request_utils, "verify_token_locally", AsyncMock(return_value={"sub": "user"})), \
+                patch.object(request_utils, "send_get_request", send_mock):
+            await request_utils.validate_with_cyoda("token")
+
+        send_mock.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_locally_rejected_token_is_invalid(self):
+        send_mock = AsyncMock()
+        with patch.object(request_utils, "verify_token_locally",
+                          AsyncMock(side_effect=jwt.ExpiredSignatureError())), \
+                patch.object(request_utils, "send_get_request", send_mock):
+            with pytest.raises(InvalidTokenException):
+                await request_utils.validate_with_cyoda("token")
+
+        send_mock.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_falls_back_to_remote_check(self):
+        send_mock = AsyncMock(return_value={"status": 200, "json": {}})
+        with patch.object(request_utils, "verify_token_locally", AsyncMock(return_value=None)), \
+                patch.object(request_utils, "send_get_request", send_mock):
+            await request_utils.validate_with_cyoda("token")
+
+        send_mock.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_key_errors_are_invalid_tokens(self):
+        send_mock = AsyncMock()
+        with patch.object(request_utils, "verify_token_locally",
+                          AsyncMock(side_effect=jwt.InvalidKeyError())), \
+                patch.object(request_utils, "send_get_request", send_mock):
+            with pytest.raises(InvalidTokenException):
+                await request_utils.validate_with_cyoda("token")
+
+        send_mock.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_local_rejection_is_ignored_when_auth_disabled(self, monkeypatch):
+        monkeypatch.setattr(request_utils.config, "ENABLE_AUTH", False)
+        with patch.object(request_utils, "verify_token_locally",
+                          AsyncMock(side_effect=jwt.InvalidSignatureError())):
+            await request_utils.validate_with_cyoda("token")
@@ -0,0 +1,86 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+import jwt
+import pytest
+
+from common.auth.token_cache import TokenValidationCache
+from common.exception.exceptions import InvalidTokenException
+from common.utils import request_utils
+
+
+def _token(**claims):
+    return jwt.encode({"caas_org_id": "user", **claims}, "test-secret-key-of-sufficient-length", algorithm="HS256")
+
+
+class TestTokenValidationCache:
+    """Test cases for TokenValidationCache and validate_with_cyoda."""
+
+    @pytest.fixture
+    def cache(self):
+        cache = TokenValidationCache(max_ttl=300, negative_ttl=30, max_bytes=1024 * 1024)
+        with patch.object(request_utils, "token_validations", cache):
+            yield cache
+
+    def test_claims_are_decoded_once_per_request(self):
+        token = _token()
+        TokenValidationCache.begin_request()
+        try:
+            with patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+                assert TokenValidationCache.claims(token)["caas_org_id"] == "user"
+                assert TokenValidationCache.claims(token)["caas_org_id"] == "user"
+            assert decode.call_count == 1
+        finally:
+            TokenValidationCache.end_request()
+
+        with patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+            TokenValidationCache.claims(token)
+        assert decode.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_accepted_token_is_validated_once(self, cache):
+        token = _token(exp=int(time.time()) + 3600)
+        send_mock = AsyncMock(return_value={"status": 200, "json": {}})
+
+        with patch.object(request_utils, "send_get_request", send_mock):
+            await request_utils.validate_with_cyoda(token)
+            await request_utils.validate_with_cyoda(token)
+
+        assert send_mock.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_is_cached(self, cache):
+        token = _token()
+        send_mock = AsyncMock(side_effect=InvalidTokenException())
+
+        with patch.object(request_utils, "send_get_request", send_mock):
+            for _ in range(2):
+                with pytest.raises(InvalidTokenException):
+                    await request_utils.validate_with_cyoda(token)
+
+        assert send_mock.await_count == 1
+        assert cache.is_valid(token) is False
+
+    @pytest.mark.asyncio
+    async def test_failed_validation_is_not_cached(self, cache):
+        token = _token()
+        send_mock = AsyncMock(side_effect=[ConnectionError(), {"status": 200, "json": {}}])
+
+        with patch.object(request_utils, "send_get_request", send_mock):
+            with pytest.raises(ConnectionError):
+                await request_utils.validate_with_cyoda(token)
+            await request_utils.validate_with_cyoda(token)
+
+        assert send_mock.await_count == 2
+
+    def test_trust_is_bounded_by_exp(self, cache):
+        expired = _token(exp=int(time.time()) - 1)
+        expiring = _token(exp=int(time.time()) + 1)
+
+        cache.set_valid(expired)
+        cache.set_valid(expiring)
+
+        assert cache.is_valid(expired) is None
+        assert cache.is_valid(expiring) is True
+        with patch("common.utils.cache.time.monotonic", return_value=time.monotonic() + 2):
+            assert cache.is_valid(expiring) is None
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from common.grpc_client import grpc_client
+from common.grpc_client.grpc_client import GrpcClient
+from common.utils.worker_pool import PriorityWorkerPool
+
+
+def _request(processor_name="processor", request_id="r1"):
+    return {"processorName": processor_name, "requestId": request_id, "entityId": "e1", "payload": {}}
+
+
+class TestGrpcClientCalcRequests:
+    """Test cases for scheduling calculation requests."""
+
+    @pytest.fixture
+    def client(self):
+        # skip __init__, it starts a background event loop
+        client = GrpcClient.__new__(GrpcClient)
+        client.calc_workers = PriorityWorkerPool("test_grpc_calc", workers=1, max_queued=1)
+        return client
+
+    @pytest.mark.asyncio
+    async def test_requests_run_on_worker_pool(self, client):
+        client.process_calc_req_event = AsyncMock()
+        queue = asyncio.Queue()
+
+        assert client.submit_calc_req_event(_request(), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+        await asyncio.sleep(0.01)
+        await client.calc_workers.stop()
+
+        client.process_calc_req_event.assert_awaited_once_with(_request(), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+
+    @pytest.mark.asyncio
+    async def test_overload_is_answered_with_retryable_error(self, client):
+        release = asyncio.Event()
+
+        async def process(data, queue, type):
+            await release.wait()
+
+        client.process_calc_req_event = MagicMock(side_effect=process)
+        queue = asyncio.Queue()
+        client.submit_calc_req_event(_request(request_id="r1"), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+        await asyncio.sleep(0)
+        client.submit_calc_req_event(_request(request_id="r2"), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+
+        accepted = client.submit_calc_req_event(_request(request_id="r3"), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+
+        assert not accepted
+        event = queue.get_nowait()
+        data = json.loads(event.text_data)
+        assert event.type == grpc_client.CALC_RESP_EVENT_TYPE
+        assert data["requestId"] == "r3"
+        assert data["success"] is False
+        assert data["error"]["code"] == grpc_client.OVERLOADED_ERROR_CODE
+        assert data["error"]["retryable"] is True
+        release.set()
+        await client.calc_workers.stop()
+
+    @pytest.mark.asyncio
+    async def test_requests_for_one_entity_are_serialized(self, client):
+        client.calc_workers = PriorityWorkerPool("test_grpc_serial", workers=4, max_queued=10)
+        running = 0
+        max_running = 0
+
+        async def process(data, queue, type):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        client.process_calc_req_event = MagicMock(side_effect=process)
+        queue = asyncio.Queue()
+        for request_id in ("r1", "r2", "r3"):
+            client.submit_calc_req_event(_request(request_id=request_id), queue, grpc_client.CALC_REQ_EVENT_TYPE)
+
+        while client.calc_workers.queued() or client.calc_workers._running:
+            await asyncio.sleep(0.001)
+        await client.calc_workers.stop()
+
+        assert max_running == 1
+        assert [c.args[0]["requestId"] for c in client.process_calc_req_event.call_args_list] == ["r1", "r2", "r3"]
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import common.repository.cyoda.cyoda_repository as cyoda_repository
+from common.config.config import config
+from common.repository.cyoda.cyoda_repository import CyodaRepository
+from common.utils.metrics import metrics
+
+EDGE_MESSAGE_META = {"type": config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+
+
+class TestCyodaRepositoryFindManyByIds:
+    """Test cases for CyodaRepository.find_many_by_ids."""
+
+    @pytest.fixture
+    def repository(self):
+        """Create a fresh CyodaRepository with an empty edge message cache."""
+        CyodaRepository._instance = None
+        cyoda_repository._edge_messages_cache.clear()
+        yield CyodaRepository(cyoda_auth_service=MagicMock())
+        CyodaRepository._instance = None
+        cyoda_repository._edge_messages_cache.clear()
+
+    @staticmethod
+    def _edge_message_response(content):
+        return {"status": 200, "json": {"content": json.dumps({"edge_message_content": content})}}
+
+    @pytest.mark.asyncio
+    async def test_preserves_order_and_fetches_concurrently(self, repository):
+        """Results follow the input order even when responses complete out of order."""
+        in_flight = 0
+        peak_in_flight = 0
+
+        async def fake_send(cyoda_auth_service, method, path, **kwargs):
+            nonlocal in_flight, peak_in_flight
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            message_id = path.rsplit("/", 1)[-1]
+            await asyncio.sleep(0.01 * (5 - int(message_id[-1])))
+            in_flight -= 1
+            return self._edge_message_response({"message": message_id})
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send):
+            result = await repository.find_many_by_ids(
+                EDGE_MESSAGE_META, ["m1", "m2", "m3", "m4"], concurrency=2
+            )
+
+        assert [item["message"] for item in result] == ["m1", "m2", "m3", "m4"]
+        assert peak_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_uses_cache_and_deduplicates(self, repository):
+        """Cached edge messages are not refetched and duplicates cost one request."""
+        cyoda_repository._edge_messages_cache.set("cached", {"message": "cached"})
+        requested_paths = []
+
+        async def fake_send(cyoda_auth_service, method, path, **kwargs):
+            requested_paths.append(path)
+            return self._edge_message_response({"message": "fresh"})
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send):
+            result = await repository.find_many_by_ids(EDGE_MESSAGE_META, ["cached", "new", "new"])
+
+        assert result == [{"message": "cached"}, {"message": "fresh"}, {"message": "fresh"}]
+        assert requested_paths == ["message/get/new"]
+
+    @pytest.mark.asyncio
+    async def test_empty_ids(self, repository):
+        """No ids means no requests."""
+        with patch.object(cyoda_repository, "send_cyoda_request") as mock_send:
+            assert await repository.find_many_by_ids(EDGE_MESSAGE_META, []) == []
+        mock_send.assert_not_called()
+
+
+class TestCyodaRepositoryIterAllByCriteria:
+    """Test cases for CyodaRepository.iter_all_by_criteria."""
+
+    @pytest.fixture
+    def repository(self):
+        """Create a fresh CyodaRepository without waiting on snapshot status."""
+        CyodaRepository._instance = None
+        repository = CyodaRepository(cyoda_auth_service=MagicMock())
+        with patch.object(CyodaRepository, "_wait_for_search_completion", AsyncMock()):
+            yield repository
+        CyodaRepository._instance = None
+
+    @staticmethod
+    def _fake_search(total_pages, failing_page=None, state=None):
+        state = state if state is not None else {"in_flight": 0, "peak": 0, "requested": []}
+
+        async def fake_send(cyoda_auth_service, method, path, data=None, **kwargs):
+            if method == "post":
+                return {"status": 200, "json": "snap-1"}
+            page_number = int(path.rsplit("pageNumber=", 1)[1])
+            state["requested"].append(page_number)
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            # later pages answer faster to check that ordering is preserved
+            await asyncio.sleep(0.001 * (total_pages - page_number))
+            state["in_flight"] -= 1
+            if page_number == failing_page:
+                return {"status": 500, "json": "{}"}
+            body = {
+                "page": {"totalElements": total_pages, "totalPages": total_pages},
+                "_embedded": {"objectNodes": [
+                    {"data": {"page": page_number}, "meta": {"id": f"id-{page_number}", "state": "ok"}}
+                ]},
+            }
+            return {"status": 200, "json": json.dumps(body)}
+
+        return fake_send, state
+
+    @pytest.mark.asyncio
+    async def test_yields_pages_in_order_with_prefetch(self, repository):
+        """Pages are yielded in order while up to prefetch_pages requests run concurrently."""
+        fake_send, state = self._fake_search(total_pages=6)
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send):
+            entities = [entity async for entity in repository.iter_all_by_criteria(
+                {"entity_model": "chat", "entity_version": "1"}, {}, prefetch_pages=3)]
+
+        assert [entity["page"] for entity in entities] == [0, 1, 2, 3, 4, 5]
+        assert entities[0]["technical_id"] == "id-0"
+        assert entities[0]["current_state"] == "ok"
+        assert state["peak"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stops_at_failed_page(self, repository):
+        """A non-200 page ends the iteration like the sequential implementation did."""
+        fake_send, _ = self._fake_search(total_pages=5, failing_page=2)
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send):
+            entities = await repository.find_all_by_criteria({"entity_model": "chat", "entity_version": "1"}, {})
+
+        assert [entity["page"] for entity in entities] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_early_close_cancels_prefetch(self, repository):
+        """Closing the iterator early does not leave page requests running."""
+        fake_send, state = self._fake_search(total_pages=10)
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send):
+            iterator = repository.iter_all_by_criteria(
+                {"entity_model": "chat", "entity_version": "1"}, {}, prefetch_pages=4)
+            first = await iterator.__anext__()
+            second = await iterator.__anext__()
+            await iterator.aclose()
+            await asyncio.sleep(0.02)
+
+        assert (first["page"], second["page"]) == (0, 1)
+        assert max(state["requested"]) < 9
+
+
+class TestCyodaRepositorySearchPolling:
+    """Test cases for adaptive snapshot polling and synchronous search."""
+
+    @pytest.fixture
+    def repository(self):
+        """Create a fresh CyodaRepository."""
+        CyodaRepository._instance = None
+        yield CyodaRepository(cyoda_auth_service=MagicMock())
+        CyodaRepository._instance = None
+
+    @pytest.mark.asyncio
+    async def test_poll_interval_grows_and_is_capped(self, repository):
+        """Status checks start fast and back off exponentially up to max_interval."""
+        statuses = ["RUNNING"] * 6 + ["SUCCESSFUL"]
+        send_mock = AsyncMock(side_effect=[{"status": 200, "json": {"snapshotStatus": s}} for s in statuses])
+
+        with patch.object(cyoda_repository, "send_cyoda_request", send_mock), \
+                patch.object(cyoda_repository.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
+            await repository._wait_for_search_completion("snap-1", initial_interval=0.02, max_interval=0.2)
+
+        delays = [call.args[0] for call in mock_sleep.await_args_list]
+        assert delays == pytest.approx([0.02, 0.04, 0.08, 0.16, 0.2, 0.2])
+        assert send_mock.await_count == 7
+        assert metrics.snapshot()["histograms"]["cyoda_search.status_polls"]["count"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_poll_timeout(self, repository):
+        """Polling gives up once the budget is spent."""
+        send_mock = AsyncMock(return_value={"status": 200, "json": {"snapshotStatus": "RUNNING"}})
+        monotonic_values = iter([0.0, 0.5, 2.0, 2.0])
+
+        with patch.object(cyoda_repository, "send_cyoda_request", send_mock), \
+                patch.object(cyoda_repository.asyncio, "sleep", new_callable=AsyncMock), \
+                patch.object(cyoda_repository.time, "monotonic", side_effect=lambda: next(monotonic_values)):
+            with pytest.raises(TimeoutError):
+                await repository._wait_for_search_completion("snap-1", timeout=1.0)
+
+    @pytest.mark.asyncio
+    async def test_sync_search_for_small_results(self, repository, monkeypatch):
+        """With sync search enabled, small results come back without creating a snapshot."""
+        monkeypatch.setattr(config, "CYODA_SYNC_SEARCH_ENABLED", True)
+        monkeypatch.setattr(config, "CYODA_SYNC_SEARCH_LIMIT", 10)
+        nodes = [{"data": {"name": "a"}, "meta": {"id": "id-a", "state": "ok"}}]
+        send_mock = AsyncMock(return_value={"status": 200, "json": nodes})
+
+        with patch.object(cyoda_repository, "send_cyoda_request", send_mock):
+            entities = await repository.find_all_by_criteria({"entity_model": "chat", "entity_version": "1"}, {})
+
+        assert entities == [{"name": "a", "technical_id": "id-a", "current_state": "ok"}]
+        assert send_mock.await_args.kwargs["path"] == "search/chat/1?limit=10"
+
+    @pytest.mark.asyncio
+    async def test_sync_search_falls_back_when_truncated(self, repository, monkeypatch):
+        """A result that reaches the limit may be truncated, so the snapshot search is used."""
+        monkeypatch.setattr(config, "CYODA_SYNC_SEARCH_ENABLED", True)
+        monkeypatch.setattr(config, "CYODA_SYNC_SEARCH_LIMIT", 1)
+        sync_nodes = [{"data": {"name": "a"}, "meta": {"id": "id-a"}}]
+        page = {
+            "page": {"totalElements": 2, "totalPages": 1},
+            "_embedded": {"objectNodes": [{"data": {"name": "a"}, "meta": {"id": "id-a"}},
+                                          {"data": {"name": "b"}, "meta": {"id": "id-b"}}]},
+        }
+
+        async def fake_send(cyoda_auth_service, method, path, data=None, **kwargs):
+            if path.startswith("search/chat/"):
+                return {"status": 200, "json": sync_nodes}
+            if method == "post":
+                return {"status": 200, "json": "snap-1"}
+            return {"status": 200, "json": json.dumps(page)}
+
+        with patch.object(cyoda_repository, "send_cyoda_request", side_effect=fake_send), \
+                patch.object(CyodaRepository, "_wait_for_search_completion", AsyncMock()):
+            entities = await repository.find_all_by_criteria({"entity_model": "chat", "entity_version": "1"}, {})
+
+        assert [entity["name"] for entity in entities] == ["a", "b"]
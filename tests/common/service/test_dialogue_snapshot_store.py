@@ -0,0 +1,84 @@
+import time
+
+from entity.model import FlowEdgeMessage
+from common.service.dialogue_snapshot_store import DialogueSnapshotStore
+
+
+def make_flow(*edge_ids):
+    return [FlowEdgeMessage(type="answer", edge_message_id=edge_id, last_modified=i) for i, edge_id in enumerate(edge_ids)]
+
+
+class TestDialogueSnapshotStore:
+    """Test cases for DialogueSnapshotStore."""
+
+    def test_snapshot_reused_while_flow_is_extended(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=60)
+        store.put("chat", make_flow("e1", "e2"), [{"message": "hi"}], {"child"})
+
+        snapshot = store.get("chat", make_flow("e1", "e2", "e3"))
+
+        assert snapshot["flow_length"] == 2
+        assert snapshot["last_modified"] == 1
+        assert snapshot["dialogue"] == [{"message": "hi"}]
+        assert snapshot["child_entities"] == ["child"]
+        assert snapshot["version"] == 1
+
+        updated = store.put("chat", make_flow("e1", "e2", "e3"), [], set(), previous=snapshot)
+        assert updated["version"] == 2
+
+    def test_rewritten_flow_drops_snapshot(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=60)
+        store.put("chat", make_flow("e1", "e2"), [], set())
+
+        assert store.get("chat", make_flow("e1")) is None
+        assert store.get("chat", make_flow("e1", "e2")) is None
+
+    def test_child_append_invalidates_containing_chat(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=60)
+        flow = make_flow("e1")
+        store.put("chat", flow, [], {"child"})
+
+        store.flow_appended("chat")
+        assert store.get("chat", flow) is not None
+
+        store.flow_appended("child")
+        assert store.get("chat", flow) is None
+        # not snapshotted again until the change settles
+        assert store.put("chat", flow, [], {"child"}) is None
+        assert store.get("chat", flow) is None
+
+    def test_settle_window_expires(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=0.001)
+        flow = make_flow("e1")
+        store.put("chat", flow, [], {"child"})
+        store.flow_appended("child")
+
+        time.sleep(0.01)
+
+        assert store.put("chat", flow, [], {"child"}) is not None
+        assert store.get("chat", flow) is not None
+
+    def test_child_routing_outlives_snapshot(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=0.001, settle_seconds=60)
+        store.children_added("chat", ["child"])
+        store.put("chat", make_flow("e1"), [], {"child"})
+
+        time.sleep(0.01)
+
+        assert store.get("chat", make_flow("e1")) is None
+        assert store.chat_of("child") == "chat"
+
+    def test_current_until_appended_or_stale(self):
+        store = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=0.001, fresh_seconds=60)
+        store.put("chat", make_flow("e1"), [{"message": "hi"}], {"child"})
+        assert store.current("chat")["dialogue"] == [{"message": "hi"}]
+
+        store.flow_appended("chat")
+        assert store.current("chat") is None
+        assert store.get("chat", make_flow("e1")) is not None
+        assert store.current("chat") is not None
+
+        stale = DialogueSnapshotStore(max_bytes=1024 * 1024, ttl=60, settle_seconds=60, fresh_seconds=0.001)
+        stale.put("chat", make_flow("e1"), [], set())
+        time.sleep(0.01)
+        assert stale.current("chat") is None
@@ -0,0 +1,47 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from common.service.service import EntityServiceImpl
+
+
+class TestEntityServiceImpl:
+    """Test cases for EntityServiceImpl lookups."""
+
+    @pytest.fixture
+    def entity_service_impl(self):
+        """Create an EntityServiceImpl over a mocked repository."""
+        EntityServiceImpl._instance = None
+        repository = MagicMock()
+        repository.get_meta = AsyncMock(return_value={})
+        model_registry = MagicMock()
+        model_registry.get.return_value = None
+        entity_service = EntityServiceImpl(repository=repository, model_registry=model_registry)
+        yield entity_service, repository
+        EntityServiceImpl._instance = None
+
+    @pytest.mark.asyncio
+    async def test_get_items_by_ids_partly_failing_batch(self, entity_service_impl):
+        """Failed items come back as the get_item sentinel, in place, next to the loaded ones."""
+        entity_service, repository = entity_service_impl
+        repository.find_many_by_ids = AsyncMock(return_value=[
+            {"id": "a"},
+            {"errorMessage": "Entity not found"},
+            None,
+            {"id": "d"},
+        ])
+        repository.find_by_id = AsyncMock(return_value={"errorMessage": "Entity not found"})
+
+        items = await entity_service.get_items_by_ids(MagicMock(), "model", "1", ["a", "b", "c", "d"])
+        single = await entity_service.get_item(MagicMock(), "model", "1", "b")
+
+        assert items == [{"id": "a"}, single, single, {"id": "d"}]
+        assert single == []
+
+    @pytest.mark.asyncio
+    async def test_get_items_by_ids_empty(self, entity_service_impl):
+        """No ids means no repository call."""
+        entity_service, repository = entity_service_impl
+        repository.find_many_by_ids = AsyncMock()
+
+        assert await entity_service.get_items_by_ids(MagicMock(), "model", "1", []) == []
+        repository.find_many_by_ids.assert_not_called()
@@ -0,0 +1,118 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from common.config import const
+from common.service.data_retrieval_service import DataRetrievalService
+from common.service.query_cache import QueryResultCache
+from common.service.service import EntityServiceImpl
+
+TRANSFER_MODEL = const.ModelName.TRANSFER_CHATS_ENTITY.value
+
+
+class TestQueryResultCache:
+    """Test cases for QueryResultCache."""
+
+    def test_request_scope_without_shared_tier(self):
+        """With ttl=0 results are only reused within the current request."""
+        cache = QueryResultCache(ttl=0, max_bytes=1024)
+        key = cache.key("model", "1", {"a": 1})
+
+        QueryResultCache.begin_request()
+        cache.set(key, [{"id": 1}])
+        assert cache.get(key) == [{"id": 1}]
+        QueryResultCache.end_request()
+
+        assert cache.get(key) is None
+
+    def test_shared_tier_across_requests(self):
+        """Results are shared across requests within the ttl."""
+        cache = QueryResultCache(ttl=60, max_bytes=1024 * 1024)
+        key = cache.key("model", "1", {"a": 1})
+        cache.set(key, [SimpleNamespace(id=1)])
+
+        QueryResultCache.begin_request()
+        assert cache.get(key)[0].id == 1
+        QueryResultCache.end_request()
+
+    def test_results_are_copies(self):
+        """Mutating a cached result does not affect later reads."""
+        cache = QueryResultCache(ttl=60, max_bytes=1024 * 1024)
+        key = cache.key("model", "1", {"a": 1})
+        cache.set(key, [{"id": 1}])
+        cache.get(key)[0]["id"] = 2
+        assert cache.get(key) == [{"id": 1}]
+
+    def test_key_is_independent_of_condition_order(self):
+        """Equal conditions map to the same key."""
+        cache = QueryResultCache(ttl=60, max_bytes=1024)
+        assert cache.key("Model", "1", {"a": 1, "b": 2}) == cache.key("model", "1", {"b": 2, "a": 1})
+
+    def test_invalidate_model(self):
+        """Invalidation hides cached queries of that model only."""
+        cache = QueryResultCache(ttl=60, max_bytes=1024 * 1024)
+        key_a = cache.key("a", "1", {})
+        key_b = cache.key("b", "1", {})
+        cache.set(key_a, [1])
+        cache.set(key_b, [2])
+
+        cache.invalidate("A")
+
+        assert cache.get(cache.key("a", "1", {})) is None
+        assert cache.get(cache.key("b", "1", {})) == [2]
+
+
+class TestDataRetrievalServiceCaching:
+    """Test cases for cached DataRetrievalService lookups."""
+
+    @pytest.fixture
+    def entity_service_impl(self):
+        """Create an EntityServiceImpl sharing a query cache with the data service."""
+        EntityServiceImpl._instance = None
+        query_cache = QueryResultCache(ttl=60, max_bytes=1024 * 1024)
+        repository = MagicMock()
+        repository.get_meta = AsyncMock(return_value={})
+        repository.save = AsyncMock(return_value="new_id")
+        model_registry = MagicMock()
+        model_registry.get.return_value = None
+        entity_service = EntityServiceImpl(repository=repository, model_registry=model_registry,
+                                           query_cache=query_cache)
+        entity_service.get_items_by_condition = AsyncMock(return_value=[{"guest_user_id": "guest.1"}])
+        yield entity_service, query_cache
+        EntityServiceImpl._instance = None
+
+    @pytest.mark.asyncio
+    async def test_repeated_lookup_is_served_from_cache(self, entity_service_impl):
+        """A second identical lookup does not run another search."""
+        entity_service, query_cache = entity_service_impl
+        data_service = DataRetrievalService(MagicMock(), entity_service, query_cache=query_cache)
+
+        first = await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+        second = await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+
+        assert first == second == [{"guest_user_id": "guest.1"}]
+        assert entity_service.get_items_by_condition.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_add_item_invalidates_model(self, entity_service_impl):
+        """Writing an entity of the model forces the next lookup to search again."""
+        entity_service, query_cache = entity_service_impl
+        data_service = DataRetrievalService(MagicMock(), entity_service, query_cache=query_cache)
+
+        await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+        await entity_service.add_item(MagicMock(), TRANSFER_MODEL, "1", {"user_id": "user1"})
+        await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+
+        assert entity_service.get_items_by_condition.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_without_cache(self):
+        """Without a query cache every lookup hits the entity service."""
+        entity_service = MagicMock()
+        entity_service.get_items_by_condition = AsyncMock(return_value=[])
+        data_service = DataRetrievalService(MagicMock(), entity_service)
+
+        await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+        await data_service.get_entities_by_user_name("user1", TRANSFER_MODEL)
+
+        assert entity_service.get_items_by_condition.await_count == 2
@@ -0,0 +1,132 @@
+import sqlite3
+from unittest.mock import patch
+
+from common.utils.cache import MemoryCache, SqliteCache, TieredCache, build_cache
+from common.utils.metrics import metrics
+
+
+class TestMemoryCache:
+    """Test cases for MemoryCache."""
+
+    def test_returns_copies(self):
+        """Mutating a returned value does not change the cached entry."""
+        cache = MemoryCache("test_copies", max_bytes=1024)
+        cache.set("a", {"message": "hello"})
+        cache.get("a")["message"] = "changed"
+        assert cache.get("a") == {"message": "hello"}
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Entries are evicted in LRU order once the byte budget is exceeded."""
+        cache = MemoryCache("test_lru", max_bytes=25)
+        cache.set("a", "x" * 8)
+        cache.set("b", "y" * 8)
+        cache.get("a")
+        cache.set("c", "z" * 8)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert metrics.get_counter("cache.test_lru.evictions") >= 1
+
+    def test_oversized_value_is_not_cached(self):
+        """A value larger than the cache is skipped instead of flushing everything."""
+        cache = MemoryCache("test_oversized", max_bytes=16)
+        cache.set("a", "small")
+        cache.set("b", "x" * 100)
+        assert cache.get("a") == "small"
+        assert cache.get("b") is None
+
+    def test_ttl_expiry(self):
+        """Expired entries are treated as misses."""
+        cache = MemoryCache("test_ttl", max_bytes=1024, ttl=10)
+        with patch("common.utils.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("common.utils.cache.time.monotonic", return_value=105.0):
+            assert cache.get("a") == 1
+        with patch("common.utils.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+    def test_hit_and_miss_metrics(self):
+        """Hits and misses are counted."""
+        cache = MemoryCache("test_hit_miss", max_bytes=1024)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        assert metrics.get_counter("cache.test_hit_miss.hits") >= 1
+        assert metrics.get_counter("cache.test_hit_miss.misses") >= 1
+
+
+class TestSqliteCache:
+    """Test cases for SqliteCache."""
+
+    def test_survives_reopen(self, tmp_path):
+        """Entries persist across cache instances."""
+        path = str(tmp_path / "cache.db")
+        cache = SqliteCache("test_sqlite_reopen", path=path, max_bytes=1024)
+        cache.set("a", {"message": "persisted"})
+        cache.close()
+
+        reopened = SqliteCache("test_sqlite_reopen", path=path, max_bytes=1024)
+        assert reopened.get("a") == {"message": "persisted"}
+        reopened.close()
+
+    def test_evicts_to_budget(self, tmp_path):
+        """Least recently used entries are removed when the budget is exceeded."""
+        cache = SqliteCache("test_sqlite_evict", path=str(tmp_path / "cache.db"), max_bytes=25)
+        with patch("common.utils.cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0, 4.0, 5.0]):
+            cache.set("a", "x" * 8)
+            cache.set("b", "y" * 8)
+            cache.get("a")
+            cache.set("c", "z" * 8)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "x" * 8
+        assert cache.get("c") == "z" * 8
+        cache.close()
+
+    def test_evicts_below_budget_in_batches(self, tmp_path):
+        """Eviction frees room down to the low-water mark, not just enough for the new entry."""
+        cache = SqliteCache("test_sqlite_low_water", path=str(tmp_path / "cache.db"), max_bytes=100)
+        for i in range(10):
+            cache.set(f"k{i}", "x" * 8)
+        cache.set("k10", "x" * 8)
+
+        assert cache._bytes <= 90
+        assert "k0" not in cache
+        assert "k10" in cache
+        cache.close()
+
+    def test_access_times_are_written_in_batches(self, tmp_path):
+        """A hit records its access time in memory and writes it with the next flush."""
+        path = str(tmp_path / "cache.db")
+        cache = SqliteCache("test_sqlite_touch", path=path, max_bytes=1024)
+        with patch("common.utils.cache.time.time", side_effect=[1.0, 2.0]):
+            cache.set("a", 1)
+            cache.get("a")
+
+        def accessed_at():
+            with sqlite3.connect(path) as connection:
+                return connection.execute("SELECT accessed_at FROM cache_entries WHERE key = 'a'").fetchone()[0]
+
+        assert accessed_at() == 1.0
+        cache.close()
+        assert accessed_at() == 2.0
+
+
+class TestTieredCache:
+    """Test cases for TieredCache."""
+
+    def test_disk_hit_is_promoted(self, tmp_path):
+        """A value only on disk is copied into memory on read."""
+        cache = build_cache("test_tiered", max_bytes=1024, disk_path=str(tmp_path / "cache.db"))
+        assert isinstance(cache, TieredCache)
+        cache.disk.set("a", {"message": "from disk"})
+
+        assert cache.memory.get("a") is None
+        assert cache.get("a") == {"message": "from disk"}
+        assert cache.memory.get("a") == {"message": "from disk"}
+        cache.disk.close()
+
+    def test_build_cache_without_disk(self):
+        """Without a disk path only the memory tier is used."""
+        assert isinstance(build_cache("test_memory_only", max_bytes=1024), MemoryCache)
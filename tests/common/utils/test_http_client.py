@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from common.utils.http_client import HttpClientPool
+from common.utils.metrics import metrics
+
+
+class TestHttpClientPool:
+    """Test cases for HttpClientPool."""
+
+    @pytest.fixture
+    def pool(self):
+        """Create a small HttpClientPool."""
+        metrics.reset()
+        return HttpClientPool(max_connections=4, max_keepalive_connections=2, keepalive_expiry=5,
+                              http2=False, timeout=httpx.Timeout(5.0))
+
+    @pytest.mark.asyncio
+    async def test_get_client_reuses_client_within_loop(self, pool):
+        """The same client is returned for repeated calls on one loop."""
+        first = pool.get_client()
+        second = pool.get_client()
+
+        assert first is second
+        await pool.aclose_all()
+        assert first.is_closed
+
+    def test_get_client_creates_client_per_loop(self, pool):
+        """Each event loop gets its own client."""
+        async def _get():
+            return pool.get_client()
+
+        first_loop, second_loop = asyncio.new_event_loop(), asyncio.new_event_loop()
+        first = first_loop.run_until_complete(_get())
+        second = second_loop.run_until_complete(_get())
+        first_loop.close()
+        second_loop.close()
+
+        assert first is not second
+
+    @pytest.mark.asyncio
+    async def test_request_tracks_in_flight_and_reuse(self, pool):
+        """Requests are counted and connection reuse is derived from opened connections."""
+        response = httpx.Response(200)
+        with patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock, return_value=response) as mock_request:
+            await pool.request("GET", "https://example.com/a")
+            await pool._trace("connection.connect_tcp.complete", {})
+            await pool.request("GET", "https://example.com/b")
+
+        assert mock_request.call_count == 2
+        assert mock_request.call_args.kwargs["extensions"]["trace"] == pool._trace
+        assert metrics.get_counter("http_pool.requests") == 2
+        assert pool.connection_reuse_ratio() == 0.5
+        assert pool.saturation() == 0
+        await pool.aclose_all()
+
+    @pytest.mark.asyncio
+    async def test_request_counts_pool_timeouts(self, pool):
+        """Pool exhaustion is published as a saturation counter."""
+        with patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock,
+                          side_effect=httpx.PoolTimeout("pool exhausted")):
+            with pytest.raises(httpx.PoolTimeout):
+                await pool.request("GET", "https://example.com")
+
+        assert metrics.get_counter("http_pool.pool_timeouts") == 1
+        assert pool._in_flight == 0
+        await pool.aclose_all()
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from common.utils.pubsub import PubSub
+
+
+class TestPubSub:
+    """Test cases for PubSub."""
+
+    @pytest.mark.asyncio
+    async def test_publish_to_topic_subscribers(self):
+        pubsub = PubSub("test_topics")
+        with pubsub.subscribe("chat1") as subscription:
+            assert pubsub.publish("chat1", {"n": 1}) == 1
+            assert pubsub.publish("chat2", {"n": 2}) == 0
+            assert await subscription.get(timeout=1) == {"n": 1}
+            assert await subscription.get(timeout=0.01) is None
+        assert not pubsub.has_subscribers("chat1")
+
+    @pytest.mark.asyncio
+    async def test_publish_from_another_thread(self):
+        """Events published from a different thread reach the subscriber's loop."""
+        pubsub = PubSub("test_threads")
+        with pubsub.subscribe("chat1") as subscription:
+            thread = threading.Thread(target=lambda: asyncio.run(self._publish_async(pubsub)))
+            thread.start()
+            assert await subscription.get(timeout=1) == "from thread"
+            thread.join()
+
+    @staticmethod
+    async def _publish_async(pubsub):
+        pubsub.publish("chat1", "from thread")
+
+    @pytest.mark.asyncio
+    async def test_overflow_drops_events(self):
+        pubsub = PubSub("test_overflow", max_queue=2)
+        with pubsub.subscribe("chat1") as subscription:
+            for i in range(3):
+                pubsub.publish("chat1", i)
+            assert subscription.overflowed
+            assert await subscription.get(timeout=1) == 0
+            assert await subscription.get(timeout=1) == 1
+            assert await subscription.get(timeout=0.01) is None
@@ -0,0 +1,152 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import common.utils.utils as utils
+from common.exception.exceptions import CircuitOpenException, InvalidTokenException
+from common.utils.retry_policy import (
+    CircuitBreaker,
+    RetryPolicy,
+    circuit_breakers,
+    get_retry_after,
+    retry_policies,
+)
+
+
+def _status_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://cyoda.test/api/x")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"status {status}", request=request, response=response)
+
+
+class TestRetryPolicy:
+    """Test cases for RetryPolicy decisions."""
+
+    def test_idempotent_get_retries_server_errors(self):
+        """GET requests are retried on 5xx responses."""
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.should_retry("get", _status_error(500), attempt=1)
+        assert not policy.should_retry("get", _status_error(500), attempt=3)
+
+    def test_post_is_not_blindly_retried(self):
+        """POST is only replayed when the server did not process it."""
+        policy = RetryPolicy()
+        assert not policy.should_retry("post", _status_error(500), attempt=1)
+        assert not policy.should_retry("post", httpx.ReadTimeout("timeout"), attempt=1)
+        assert policy.should_retry("post", _status_error(503), attempt=1)
+        assert policy.should_retry("post", httpx.ConnectError("refused"), attempt=1)
+
+    def test_client_errors_are_not_retried(self):
+        """4xx other than 422/429 are final."""
+        assert not RetryPolicy().should_retry("get", _status_error(404), attempt=1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Backoff stays within the exponential ceiling."""
+        policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+        for attempt in range(1, 8):
+            assert 0 <= policy.backoff(attempt) <= min(2.0, 0.5 * 2 ** (attempt - 1))
+
+    def test_retry_after_takes_precedence(self):
+        """Retry-After header overrides computed backoff."""
+        exc = _status_error(503, headers={"Retry-After": "3"})
+        assert get_retry_after(exc) == 3.0
+        assert RetryPolicy().backoff(1, get_retry_after(exc)) == 3.0
+
+    def test_path_rules(self):
+        """Search snapshots are replayable, transitions are not."""
+        assert retry_policies.resolve("post", "search/snapshot/chat/1001").is_idempotent("post")
+        assert not retry_policies.resolve("put", "entity/JSON/abc/update_transition").is_idempotent("put")
+        assert retry_policies.resolve("get", "entity/abc").is_idempotent("get")
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker."""
+
+    def test_opens_after_threshold_and_half_opens(self):
+        """Breaker opens after consecutive failures and allows one trial after reset timeout."""
+        breaker = CircuitBreaker("cyoda.test", failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+
+        with pytest.raises(CircuitOpenException):
+            breaker.before_request()
+
+        breaker._opened_at -= 10
+        breaker.before_request()
+        with pytest.raises(CircuitOpenException):
+            breaker.before_request()
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_request()
+
+
+class TestSendCyodaRequest:
+    """Test cases for the send_cyoda_request retry loop."""
+
+    @pytest.fixture(autouse=True)
+    def reset_breakers(self):
+        """Use fresh circuit breakers for every test."""
+        circuit_breakers._breakers.clear()
+        yield
+        circuit_breakers._breakers.clear()
+
+    @pytest.fixture
+    def auth_service(self):
+        """Create mock auth service."""
+        auth = MagicMock()
+        auth.get_access_token_async = AsyncMock(return_value="token")
+        return auth
+
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff_then_succeeds(self, auth_service):
+        """Transient 503 is retried after sleeping."""
+        responses = [_status_error(503), {"status": 200, "json": {"ok": True}}]
+
+        async def fake_send(*args, **kwargs):
+            result = responses.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with patch.object(utils, "send_request", side_effect=fake_send), \
+                patch.object(utils.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep:
+            resp = await utils.send_cyoda_request(auth_service, "get", "entity/abc")
+
+        assert resp["json"] == {"ok": True}
+        mock_sleep.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_post_not_retried_on_500(self, auth_service):
+        """A POST failing with 500 is raised without replay."""
+        send_mock = AsyncMock(side_effect=_status_error(500))
+        with patch.object(utils, "send_request", send_mock):
+            with pytest.raises(httpx.HTTPStatusError):
+                await utils.send_cyoda_request(auth_service, "post", "entity/JSON/chat/1001", data="{}")
+
+        assert send_mock.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_401_refreshes_token_once(self, auth_service):
+        """401 invalidates tokens and retries with a fresh one."""
+        send_mock = AsyncMock(side_effect=[InvalidTokenException(), {"status": 200, "json": {}}])
+        with patch.object(utils, "send_request", send_mock):
+            await utils.send_cyoda_request(auth_service, "get", "entity/abc")
+
+        auth_service.invalidate_tokens.assert_called_once()
+        assert send_mock.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_sheds_load(self, auth_service):
+        """Once the breaker is open no request is sent."""
+        breaker = circuit_breakers.get(utils.config.CYODA_API_URL)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        send_mock = AsyncMock()
+
+        with patch.object(utils, "send_request", send_mock):
+            with pytest.raises(CircuitOpenException):
+                await utils.send_cyoda_request(auth_service, "get", "entity/abc")
+
+        send_mock.assert_not_awaited()
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from common.utils.worker_pool import PriorityWorkerPool
+
+
+def _job(log, name, release=None):
+    async def job():
+        log.append(f"start {name}")
+        if release:
+            await release.wait()
+        log.append(f"end {name}")
+    return job
+
+
+async def _drain(pool):
+    while pool.queued() or pool._running:
+        await asyncio.sleep(0.001)
+
+
+class TestPriorityWorkerPool:
+    """Test cases for PriorityWorkerPool."""
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_runs_first(self):
+        pool = PriorityWorkerPool("test_priority", workers=1, max_queued=10)
+        log = []
+        release = asyncio.Event()
+        pool.submit(_job(log, "blocker", release), priority=1)
+        await asyncio.sleep(0)
+        pool.submit(_job(log, "processor"), priority=1)
+        pool.submit(_job(log, "criteria"), priority=0)
+        release.set()
+
+        await _drain(pool)
+        await pool.stop()
+
+        assert [entry for entry in log if entry.startswith("start")] == ["start blocker", "start criteria",
+                                                                         "start processor"]
+
+    @pytest.mark.asyncio
+    async def test_key_limit_parks_jobs_without_blocking_workers(self):
+        pool = PriorityWorkerPool("test_key_limit", workers=2, max_queued=10, default_key_limit=1)
+        log = []
+        release = asyncio.Event()
+        pool.submit(_job(log, "heavy 1", release), key="heavy")
+        pool.submit(_job(log, "heavy 2"), key="heavy")
+        pool.submit(_job(log, "light"), key="light")
+        await asyncio.sleep(0.01)
+
+        # the second heavy job waits for the first, the light one is not held up by it
+        assert log == ["start heavy 1", "start light", "end light"]
+        release.set()
+        await _drain(pool)
+        await pool.stop()
+
+        assert log[3:] == ["end heavy 1", "start heavy 2", "end heavy 2"]
+
+    @pytest.mark.asyncio
+    async def test_submit_refused_when_full(self):
+        pool = PriorityWorkerPool("test_full", workers=1, max_queued=1)
+        release = asyncio.Event()
+        log = []
+        assert pool.submit(_job(log, "running", release))
+        await asyncio.sleep(0)
+        assert pool.submit(_job(log, "queued"))
+
+        assert not pool.submit(_job(log, "refused"))
+        release.set()
+        await _drain(pool)
+        await pool.stop()
+
+        assert "start refused" not in log
+
+    @pytest.mark.asyncio
+    async def test_failing_job_does_not_stop_worker(self):
+        pool = PriorityWorkerPool("test_failure", workers=1, max_queued=10)
+        log = []
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        pool.submit(failing)
+        pool.submit(_job(log, "next"))
+        await _drain(pool)
+        await pool.stop()
+
+        assert log == ["start next", "end next"]
+
+    @pytest.mark.asyncio
+    async def test_jobs_with_same_serial_key_run_in_order(self):
+        pool = PriorityWorkerPool("test_serial", workers=4, max_queued=10)
+        log = []
+        release = asyncio.Event()
+        pool.submit(_job(log, "a1", release), serial_key="a")
+        pool.submit(_job(log, "a2"), priority=-1, serial_key="a")
+        pool.submit(_job(log, "b1"), serial_key="b")
+        await asyncio.sleep(0.01)
+
+        # a2 waits for a1 despite its priority, other entities are not held up
+        assert log == ["start a1", "start b1", "end b1"]
+        assert pool.queued() == 1
+        release.set()
+        await _drain(pool)
+        await pool.stop()
+
+        assert log[3:] == ["end a1", "start a2", "end a2"]
+        assert not pool._mailboxes
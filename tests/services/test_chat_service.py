@@ -10,10 +10,14 @@ from services.chat_service import ChatService
 from common.exception.exceptions import (
     InvalidTokenException,
     TokenExpiredException,
-    GuestChatsLimitExceededException, ChatNotFoundException,
+    GuestChatsLimitExceededException, ChatNotFoundException, InvalidRequestException,
 )
 from common.config import const
 from common.config.config import config
+from common.service.dialogue_snapshot_store import dialogue_snapshots
+from common.utils import chat_util_functions
+from common.utils.chat_util_functions import publish_dialogue_update
+from entity.model import FlowEdgeMessage
 
 
 @pytest.fixture
@@ -22,6 +26,7 @@ def service_mocks():
     entity_service.get_items_by_condition = AsyncMock()
     entity_service.add_item = AsyncMock()
     entity_service.get_item = AsyncMock()
+    entity_service.get_items_by_ids = AsyncMock()
     entity_service.delete_item = AsyncMock()
 
     ai_agent = MagicMock()
@@ -34,6 +39,18 @@ def service_mocks():
     return svc, entity_service, ai_agent
 
 
+def bulk_from(fake_get_item):
+    async def fake_get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+        return [await fake_get_item(token, entity_model, entity_version, technical_id, meta)
+                for technical_id in technical_ids]
+    return fake_get_items_by_ids
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
 def make_jwt(payload: dict) -> str:
     # content doesn’t matter since we always patch jwt.decode in tests
     return "dummy.jwt.token"
@@ -126,11 +143,9 @@ async def test_list_chats_no_transfers(service_mocks):
     chat_obj = SimpleNamespace(
         technical_id="c1", name="N1", description="D1", date="2025-05-01"
     )
-    # first: user chats; second: no transfers
-    entity_service.get_items_by_condition.side_effect = [
-        [chat_obj],
-        [],
-    ]
+    # user chats are streamed; no transfers
+    entity_service.iter_items_by_condition = MagicMock(side_effect=[async_iter([chat_obj])])
+    entity_service.get_items_by_condition.side_effect = [[]]
 
     result = await svc.list_chats("user1")
     assert result == [{
@@ -139,7 +154,8 @@ async def test_list_chats_no_transfers(service_mocks):
         "description": "D1",
         "date": "2025-05-01",
     }]
-    assert entity_service.get_items_by_condition.call_count == 2
+    assert entity_service.iter_items_by_condition.call_count == 1
+    assert entity_service.get_items_by_condition.call_count == 1
 
 
 @pytest.mark.asyncio
@@ -152,10 +168,9 @@ async def test_list_chats_with_transfers(service_mocks):
         technical_id="c2", name="B", description="E", date="2025-05-03"
     )
     # user chats, transfers entry, then guest chats
+    entity_service.iter_items_by_condition = MagicMock(side_effect=[async_iter([chat1]), async_iter([chat2])])
     entity_service.get_items_by_condition.side_effect = [
-        [chat1],
         [{"guest_user_id": "guest.x"}],
-        [chat2],
     ]
 
     result = await svc.list_chats("user1")
@@ -305,15 +320,15 @@ async def test_submit_text_answer_size_exceeded(monkeypatch, service_mocks):
 
 
 @pytest.mark.asyncio
-async def test_get_entities_processing_data_no_nodes(monkeypatch, service_mocks):
+async def test_fetch_entities_processing_data_no_nodes(monkeypatch, service_mocks):
     svc, _, _ = service_mocks
     # send_cyoda_request returns no pmNodes → should catch ValueError and return {}
     monkeypatch.setattr(chat_service, "send_cyoda_request", AsyncMock(return_value={"json": {}}))
-    result = await svc._get_entities_processing_data("tidX", {"childA", "childB"})
+    result = await svc._fetch_entities_processing_data(["tidX", "childA", "childB"])
     assert result == {}
 
 @pytest.mark.asyncio
-async def test_get_entities_processing_data_success(monkeypatch, service_mocks):
+async def test_fetch_entities_processing_data_success(monkeypatch, service_mocks):
     svc, entity_service, _ = service_mocks
     # 1st call: return a host; 2nd & 3rd: return events for parent and child
     resp_nodes = {"json": {"pmNodes": [{"hostname": "host123"}]}}
@@ -321,10 +336,10 @@ async def test_get_entities_processing_data_success(monkeypatch, service_mocks):
     resp_child = {"json": {"entityVersions": [30], "possibleTransitions": ["t2", "t3"]}}
     send_mock = AsyncMock(side_effect=[resp_nodes, resp_parent, resp_child])
     monkeypatch.setattr(chat_service, "send_cyoda_request", send_mock)
-    # stub entity_service.get_item to return an entity with workflow_name
+    # stub entity_service.get_items_by_ids to return entities with workflow_name
     ent = SimpleNamespace(workflow_name="my_workflow")
-    entity_service.get_item = AsyncMock(side_effect=[ent, ent])
-    result = await svc._get_entities_processing_data("parentId", {"childId"})
+    entity_service.get_items_by_ids = AsyncMock(return_value=[ent, ent])
+    result = await svc._fetch_entities_processing_data(["parentId", "childId"])
     # verify both IDs present
     assert set(result.keys()) == {"parentId", "childId"}
     assert result["parentId"] == {
@@ -387,7 +402,7 @@ async def test_get_chat_success(monkeypatch, service_mocks):
     fake_children = {"childA"}
     monkeypatch.setattr(svc, "_process_message", AsyncMock(return_value=(fake_dialogue, fake_children)))
 
-    # 3) Stub _get_entities_processing_data to return a dummy map
+    # 3) Stub _fetch_entities_processing_data: root data first, then the children
     fake_entities_data = {
         "childA": {
             "workflow_name": "wf",
@@ -395,7 +410,7 @@ async def test_get_chat_success(monkeypatch, service_mocks):
             "next_transitions": []
         }
     }
-    monkeypatch.setattr(svc, "_get_entities_processing_data", AsyncMock(return_value=fake_entities_data))
+    monkeypatch.setattr(svc, "_fetch_entities_processing_data", AsyncMock(side_effect=[{}, fake_entities_data]))
 
     # Call get_chat
     result = await svc.get_chat("Bearer token", "tech123")
@@ -418,10 +433,8 @@ async def test_get_chat_success(monkeypatch, service_mocks):
         dialogue=[],
         child_entities=set()
     )
-    svc._get_entities_processing_data.assert_awaited_once_with(
-        technical_id="tech123",
-        child_entities=fake_children
-    )
+    svc._fetch_entities_processing_data.assert_any_await(["tech123"])
+    svc._fetch_entities_processing_data.assert_any_await(["childA"])
 
 
 @pytest.mark.asyncio
@@ -448,7 +461,7 @@ async def test_process_message_basic(service_mocks):
         if technical_id == "e2":
             return {"notification": "Info"}
         return {}
-    entity_service.get_item = AsyncMock(side_effect=fake_get_item)
+    entity_service.get_items_by_ids = AsyncMock(side_effect=bulk_from(fake_get_item))
 
     dialogue, children = await svc._process_message(
         finished_flow=msgs,
@@ -471,7 +484,7 @@ async def test_process_message_question_with_approve(service_mocks):
 
     async def fake_get_item(token, entity_model, entity_version, technical_id, meta=None):
         return {"question": "Proceed?", "approve": True}
-    entity_service.get_item = AsyncMock(side_effect=fake_get_item)
+    entity_service.get_items_by_ids = AsyncMock(side_effect=bulk_from(fake_get_item))
 
     dialogue, _ = await svc._process_message(
         finished_flow=msgs,
@@ -492,7 +505,7 @@ async def test_process_message_answer_auto_approve(service_mocks, monkeypatch):
 
     async def fake_get_item(token, entity_model, entity_version, technical_id, meta=None):
         return {"answer": const.Notifications.APPROVE.value}
-    entity_service.get_item = AsyncMock(side_effect=fake_get_item)
+    entity_service.get_items_by_ids = AsyncMock(side_effect=bulk_from(fake_get_item))
 
     # Force random.choice to pick the second ApproveAnswer
     monkeypatch.setattr(random, "choice", lambda seq: list(const.ApproveAnswer)[1])
@@ -530,7 +543,7 @@ async def test_process_message_child_entities_recursive(service_mocks):
                 )
             )
         return {}
-    entity_service.get_item = AsyncMock(side_effect=fake_get_item)
+    entity_service.get_items_by_ids = AsyncMock(side_effect=bulk_from(fake_get_item))
 
     dialogue, children = await svc._process_message(
         finished_flow=msgs,
@@ -863,4 +876,448 @@ async def test_validate_chat_owner_guest_to_registered_failure(service_mocks):
     chat = SimpleNamespace(user_id="guest.x")
     entity_service.get_items_by_condition = AsyncMock(return_value=[])
     with pytest.raises(InvalidTokenException):
-        await svc._validate_chat_owner(chat, "user1")
\ No newline at end of file
+        await svc._validate_chat_owner(chat, "user1")
+
+@pytest.fixture
+def list_chats_service():
+    data_service = MagicMock()
+    data_service.get_entities_by_user_name = AsyncMock(return_value=[])
+    chats_by_user = {}
+
+    def iter_entities_by_user_name(user_id, model):
+        return async_iter(chats_by_user.get(user_id, []))
+
+    data_service.iter_entities_by_user_name = MagicMock(side_effect=iter_entities_by_user_name)
+    svc = ChatService(MagicMock(), MagicMock(), asyncio.Lock(), MagicMock(), data_service)
+    return svc, data_service, chats_by_user
+
+
+def make_chat(technical_id, date):
+    return SimpleNamespace(technical_id=technical_id, name=technical_id, description="", date=date)
+
+
+@pytest.mark.asyncio
+async def test_list_chats_merges_guest_accounts_by_date(list_chats_service):
+    svc, data_service, chats_by_user = list_chats_service
+    chats_by_user["user1"] = [make_chat("u-old", "2025-05-01T00:00:00.000Z"),
+                              make_chat("u-new", "2025-05-04T00:00:00.000Z")]
+    chats_by_user["guest.a"] = [make_chat("a1", "2025-05-03T00:00:00.000Z")]
+    chats_by_user["guest.b"] = [make_chat("b1", "2025-05-02T00:00:00.000Z")]
+    data_service.get_entities_by_user_name.return_value = [
+        {"guest_user_id": "guest.a"}, {"guest_user_id": "guest.b"}, {"guest_user_id": "guest.a"}
+    ]
+
+    result = await svc.list_chats("user1")
+
+    assert [c["technical_id"] for c in result] == ["u-new", "a1", "b1", "u-old"]
+    # duplicate transfer entries are loaded once
+    assert data_service.iter_entities_by_user_name.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_list_chats_loads_guest_accounts_concurrently(list_chats_service, monkeypatch):
+    svc, data_service, _ = list_chats_service
+    monkeypatch.setattr(config, "LIST_CHATS_CONCURRENCY", 2)
+    data_service.get_entities_by_user_name.return_value = [{"guest_user_id": f"guest.{i}"} for i in range(4)]
+    in_flight = 0
+    peak = 0
+
+    async def slow_iter(user_id, model):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        yield make_chat(user_id, "2025-05-01T00:00:00.000Z")
+
+    data_service.iter_entities_by_user_name = MagicMock(side_effect=slow_iter)
+
+    result = await svc.list_chats("user1")
+
+    assert len(result) == 5
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_list_chats_page_cursor(list_chats_service):
+    svc, _, chats_by_user = list_chats_service
+    chats_by_user["user1"] = [make_chat(f"c{i}", f"2025-05-0{i}T00:00:00.000Z") for i in range(1, 6)]
+
+    first = await svc.list_chats_page("user1", limit=2)
+    second = await svc.list_chats_page("user1", limit=2, cursor=first["next_cursor"])
+    third = await svc.list_chats_page("user1", limit=2, cursor=second["next_cursor"])
+
+    assert [c["technical_id"] for c in first["chats"]] == ["c5", "c4"]
+    assert [c["technical_id"] for c in second["chats"]] == ["c3", "c2"]
+    assert [c["technical_id"] for c in third["chats"]] == ["c1"]
+    assert third["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_list_chats_page_invalid_arguments(list_chats_service):
+    svc, _, _ = list_chats_service
+    with pytest.raises(InvalidRequestException):
+        await svc.list_chats_page("user1", limit=0)
+    with pytest.raises(InvalidRequestException):
+        await svc.list_chats_page("user1", limit=10, cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_list_chats_page_limit_is_capped(list_chats_service, monkeypatch):
+    svc, _, chats_by_user = list_chats_service
+    monkeypatch.setattr(const, "MAX_CHATS_PAGE_SIZE", 2)
+    chats_by_user["user1"] = [make_chat(f"c{i}", f"2025-05-0{i}T00:00:00.000Z") for i in range(1, 6)]
+
+    page = await svc.list_chats_page("user1", limit=10 ** 9)
+
+    assert [c["technical_id"] for c in page["chats"]] == ["c5", "c4"]
+    assert page["next_cursor"] is not None
+
+
+@pytest.fixture
+def chat_tree_service():
+    entity_service = MagicMock()
+    store = {}
+
+    async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+        await asyncio.sleep(0.01)
+        return [store.get(technical_id) for technical_id in technical_ids]
+
+    entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+    svc = ChatService(entity_service, MagicMock(), asyncio.Lock(), MagicMock(), MagicMock())
+    dialogue_snapshots.clear()
+    yield svc, entity_service, store
+    dialogue_snapshots.clear()
+
+
+def add_edge(store, edge_id, type_, message, publish=True):
+    store[edge_id] = FlowEdgeMessage(type=type_, message=message, publish=publish)
+    return FlowEdgeMessage(type=type_, edge_message_id=edge_id, publish=publish)
+
+
+def add_chat_tree(store, breadth, depth):
+    """Registers a tree of child entities, each with one answer, and returns the root finished_flow."""
+    def build(prefix, level):
+        flow = [add_edge(store, f"{prefix}-answer", "answer", prefix)]
+        if level < depth:
+            child_ids = [f"{prefix}.{i}" for i in range(breadth)]
+            for child_id in child_ids:
+                store[child_id] = SimpleNamespace(chat_flow=SimpleNamespace(finished_flow=build(child_id, level + 1)))
+            flow.append(add_edge(store, f"{prefix}-children", "child_entities", child_ids, publish=False))
+        return flow
+
+    return build("root", 0)
+
+
+@pytest.mark.asyncio
+async def test_process_message_expands_tree_level_by_level(chat_tree_service):
+    svc, entity_service, store = chat_tree_service
+    finished_flow = add_chat_tree(store, breadth=3, depth=2)
+
+    dialogue, children = await svc._process_message(finished_flow, "auth", [], set())
+
+    # depth first order, same as the recursive walk
+    assert [d["message"] for d in dialogue][:6] == ["root", "root.0", "root.0.0", "root.0.1", "root.0.2", "root.1"]
+    assert len(dialogue) == 13
+    assert len(children) == 12
+    # one edge message fetch and one child fetch per level, plus the empty leaf level
+    assert entity_service.get_items_by_ids.await_count == 6
+
+
+@pytest.mark.asyncio
+async def test_process_message_skips_cycles_and_missing_messages(chat_tree_service):
+    svc, _, store = chat_tree_service
+    loop_flow = [add_edge(store, "loop-children", "child_entities", ["root"], publish=False)]
+    store["root"] = SimpleNamespace(chat_flow=SimpleNamespace(finished_flow=loop_flow))
+    finished_flow = [FlowEdgeMessage(type="answer", edge_message_id="gone", publish=True),
+                     add_edge(store, "root-children", "child_entities", ["root"], publish=False)]
+
+    dialogue, children = await svc._process_message(finished_flow, "auth", [], set())
+
+    assert dialogue == []
+    assert children == {"root"}
+
+
+@pytest.mark.asyncio
+async def test_get_chat_within_latency_target(chat_tree_service, monkeypatch):
+    svc, entity_service, store = chat_tree_service
+    business_chat = SimpleNamespace(chat_id="root", name="n", description="", date="2025-05-10")
+    monkeypatch.setattr(svc, "_get_business_chat_for_user", AsyncMock(return_value=business_chat))
+    entity_service.get_item = AsyncMock(return_value=SimpleNamespace(
+        technical_id="root", chat_flow=SimpleNamespace(finished_flow=add_chat_tree(store, breadth=5, depth=3))))
+
+    async def slow_processing_data(entity_ids):
+        await asyncio.sleep(0.05)
+        return {entity_id: {} for entity_id in entity_ids}
+
+    monkeypatch.setattr(svc, "_fetch_entities_processing_data", AsyncMock(side_effect=slow_processing_data))
+
+    start = asyncio.get_running_loop().time()
+    result = await svc.get_chat("Bearer token", "root")
+    elapsed_ms = (asyncio.get_running_loop().time() - start) * 1000
+
+    assert len(result["entities_data"]) == 1 + 5 + 25 + 125
+    assert len(result["dialogue"]) == 156
+    # two bulk round trips per level of the tree, independent of the number of child entities
+    assert entity_service.get_items_by_ids.await_count == 8
+    assert elapsed_ms < const.GET_CHAT_LATENCY_TARGET_MS
+
+
+@pytest.mark.asyncio
+async def test_get_chat_renders_only_messages_appended_since_snapshot(chat_tree_service, monkeypatch):
+    svc, entity_service, store = chat_tree_service
+    finished_flow = add_chat_tree(store, breadth=2, depth=2)
+    chat = SimpleNamespace(technical_id="root", chat_flow=SimpleNamespace(finished_flow=finished_flow))
+    business_chat = SimpleNamespace(chat_id="root", name="n", description="", date="2025-05-10")
+    monkeypatch.setattr(svc, "_get_business_chat_for_user", AsyncMock(return_value=business_chat))
+    monkeypatch.setattr(svc, "_fetch_entities_processing_data", AsyncMock(return_value={}))
+    entity_service.get_item = AsyncMock(return_value=chat)
+
+    first = await svc.get_chat("Bearer token", "root")
+    assert len(first["dialogue"]) == 7
+
+    entity_service.get_items_by_ids.reset_mock()
+    second = await svc.get_chat("Bearer token", "root")
+    assert second["dialogue"] == first["dialogue"]
+    entity_service.get_items_by_ids.assert_not_awaited()
+
+    finished_flow.append(add_edge(store, "late", "answer", "late answer"))
+    third = await svc.get_chat("Bearer token", "root")
+    assert third["dialogue"][:7] == first["dialogue"]
+    assert third["dialogue"][7]["message"] == "late answer"
+    fetched = entity_service.get_items_by_ids.await_args_list[0].kwargs["technical_ids"]
+    assert fetched == ["late"]
+
+    # a message added to a child entity forces a full rebuild
+    dialogue_snapshots.flow_appended("root.1")
+    entity_service.get_items_by_ids.reset_mock()
+    await svc.get_chat("Bearer token", "root")
+    assert len(entity_service.get_items_by_ids.await_args_list[0].kwargs["technical_ids"]) == 3
+
+
+@pytest.fixture
+def updates_service(chat_tree_service, monkeypatch):
+    svc, entity_service, store = chat_tree_service
+    finished_flow = [add_edge(store, "e1", "answer", "one"), add_edge(store, "e2", "question", "two")]
+    chat = SimpleNamespace(technical_id="root", chat_flow=SimpleNamespace(finished_flow=finished_flow))
+    monkeypatch.setattr(svc, "_get_business_chat_for_user", AsyncMock(return_value=SimpleNamespace(chat_id="root")))
+    entity_service.get_item = AsyncMock(return_value=chat)
+    return svc, store, finished_flow
+
+
+@pytest.mark.asyncio
+async def test_get_chat_updates_since_cursor(updates_service):
+    svc, store, finished_flow = updates_service
+
+    full = await svc.get_chat_updates("Bearer token", "root")
+    assert [d["message"] for d in full["dialogue"]] == ["one", "two"]
+    assert full["cursor"] == "e2"
+
+    unchanged = await svc.get_chat_updates("Bearer token", "root", since=full["cursor"])
+    assert unchanged["dialogue"] == []
+    # another cursor gets another body, so another etag
+    assert unchanged["etag"] != full["etag"]
+    assert (await svc.get_chat_updates("Bearer token", "root", since=full["cursor"]))["etag"] == unchanged["etag"]
+
+    finished_flow.append(add_edge(store, "e3", "answer", "three"))
+    changed = await svc.get_chat_updates("Bearer token", "root", since=full["cursor"])
+    assert [d["message"] for d in changed["dialogue"]] == ["three"]
+    assert changed["cursor"] == "e3"
+    assert changed["reset"] is False
+    assert changed["etag"] != unchanged["etag"]
+
+
+@pytest.mark.asyncio
+async def test_get_chat_updates_not_modified_without_loading_chat(updates_service):
+    svc, _, _ = updates_service
+    first = await svc.get_chat_updates("Bearer token", "root", since="e1")
+    svc.entity_service.get_item.reset_mock()
+
+    def is_known_etag(etag):
+        return etag == first["etag"]
+
+    result = await svc.get_chat_updates("Bearer token", "root", since="e1", is_known_etag=is_known_etag)
+    assert result == {"technical_id": "root", "etag": first["etag"], "not_modified": True}
+    svc.entity_service.get_item.assert_not_awaited()
+
+    other_cursor = await svc.get_chat_updates("Bearer token", "root", since="e2", is_known_etag=is_known_etag)
+    assert "not_modified" not in other_cursor
+
+    svc.entity_service.get_item.reset_mock()
+    dialogue_snapshots.flow_appended("root")
+    appended = await svc.get_chat_updates("Bearer token", "root", since="e1", is_known_etag=is_known_etag)
+    assert "not_modified" not in appended
+    svc.entity_service.get_item.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_chat_updates_unknown_cursor_resets(updates_service):
+    svc, _, _ = updates_service
+
+    result = await svc.get_chat_updates("Bearer token", "root", since="rolled-back")
+
+    assert result["reset"] is True
+    assert len(result["dialogue"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_chat_updates_since_last_modified(updates_service):
+    svc, store, _ = updates_service
+    store["e1"].last_modified = 100
+    store["e2"].last_modified = 200
+
+    result = await svc.get_chat_updates("Bearer token", "root", since="150")
+
+    assert [d["message"] for d in result["dialogue"]] == ["two"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_updates_pushes_published_entries(updates_service):
+    svc, _, _ = updates_service
+    stream = svc.stream_chat_updates("Bearer token", "root", since="e1")
+
+    first = await anext(stream)
+    assert [d["message"] for d in first["dialogue"]] == ["two"]
+
+    # a child launched by the chat, answering later
+    publish_dialogue_update("root", FlowEdgeMessage(type="child_entities", message=["child"]), "e3")
+    next_event = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    publish_dialogue_update("child", FlowEdgeMessage(type="question", message="from child", publish=True), "e4")
+    publish_dialogue_update("child", FlowEdgeMessage(type="question", message="hidden", publish=False), "e5")
+
+    pushed = await asyncio.wait_for(next_event, 1)
+    assert pushed["dialogue"][0]["message"] == "from child"
+    assert pushed["cursor"] == "e4"
+    await stream.aclose()
+    assert not chat_util_functions.chat_updates.has_subscribers("root")
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_updates_subscribes_before_loading_chat(updates_service, monkeypatch):
+    svc, _, _ = updates_service
+    subscribed = []
+    load_chat = svc._load_chat_entity
+
+    async def load_chat_entity(chat_id):
+        subscribed.append(chat_util_functions.chat_updates.has_subscribers(chat_id))
+        return await load_chat(chat_id)
+
+    monkeypatch.setattr(svc, "_load_chat_entity", load_chat_entity)
+    stream = svc.stream_chat_updates("Bearer token", "root")
+    await anext(stream)
+    await stream.aclose()
+
+    assert subscribed == [True]
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_updates_does_not_resend_entries_after_overflow(updates_service, monkeypatch):
+    svc, store, finished_flow = updates_service
+    monkeypatch.setattr(chat_util_functions.chat_updates, "max_queue", 2)
+    monkeypatch.setattr(const, "CHAT_EVENTS_KEEPALIVE_SECONDS", 0.05)
+    stream = svc.stream_chat_updates("Bearer token", "root", since="e2")
+    await anext(stream)
+
+    finished_flow.append(add_edge(store, "e3", "answer", "three"))
+    publish_dialogue_update("root", store["e3"], "e3")
+    assert (await anext(stream))["cursor"] == "e3"
+
+    # e4 and e5 are queued, e6 is dropped
+    for edge_id in ("e4", "e5", "e6"):
+        finished_flow.append(add_edge(store, edge_id, "answer", edge_id))
+        publish_dialogue_update("root", store[edge_id], edge_id)
+    # republished entry the client already has
+    publish_dialogue_update("root", store["e3"], "e3")
+
+    resync = await anext(stream)
+    assert [d["message"] for d in resync["dialogue"]] == ["e4", "e5", "e6"]
+    assert resync["cursor"] == "e6"
+    assert await anext(stream) is None
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_updates_forwards_partial_answers(updates_service):
+    svc, _, _ = updates_service
+    stream = svc.stream_chat_updates("Bearer token", "root", since="e2")
+    await anext(stream)
+
+    publisher = chat_util_functions.PartialAnswerPublisher.for_entity("root")
+    next_event = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    publisher(["Hel"])
+
+    pushed = await asyncio.wait_for(next_event, 1)
+    assert pushed["partial"]["content"] == "Hel"
+    assert "cursor" not in pushed
+    await stream.aclose()
+    assert chat_util_functions.PartialAnswerPublisher.for_entity("root") is None
+
+
+@pytest.mark.asyncio
+async def test_partial_answer_publisher_throttles_updates(monkeypatch):
+    monkeypatch.setattr(const, "CHAT_PARTIAL_ANSWER_INTERVAL_SECONDS", 60)
+    with chat_util_functions.chat_updates.subscribe("throttled") as subscription:
+        publisher = chat_util_functions.PartialAnswerPublisher.for_entity("throttled")
+        parts = []
+        for i in range(1000):
+            parts.append(str(i % 10))
+            publisher(parts)
+        publisher.finish()
+
+        first = (await subscription.get(timeout=1))["partial"]
+        last = (await subscription.get(timeout=1))["partial"]
+        assert await subscription.get(timeout=0.01) is None
+
+    assert (first["content"], first["done"]) == ("0", False)
+    assert (len(last["content"]), last["done"]) == (1000, True)
+
+
+@pytest.mark.asyncio
+async def test_processing_data_reuses_processor_address_and_workflow_names(chat_tree_service, monkeypatch):
+    svc, entity_service, store = chat_tree_service
+    store["a"] = SimpleNamespace(workflow_name="wf_a")
+    store["b"] = SimpleNamespace(workflow_name="wf_b")
+    in_flight = 0
+    peak = 0
+
+    async def fake_send(cyoda_auth_service, method, path):
+        nonlocal in_flight, peak
+        if path == const.ApiV1Endpoint.PROCESSOR_REMOTE_ADDRESS_PATH.value:
+            return {"json": {"pmNodes": [{"hostname": "host1"}]}}
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"json": {"entityVersions": [path], "possibleTransitions": []}}
+
+    send_mock = AsyncMock(side_effect=fake_send)
+    monkeypatch.setattr(chat_service, "send_cyoda_request", send_mock)
+
+    first = await svc._fetch_entities_processing_data(["a", "b"])
+    second = await svc._fetch_entities_processing_data(["a", "b"])
+
+    assert first == second
+    assert first["a"]["workflow_name"] == "wf_a"
+    assert first["b"]["workflow_name"] == "wf_b"
+    assert "host1" in first["b"]["entity_versions"][0]
+    # address looked up once, workflow names loaded in one bulk fetch, events fetched concurrently
+    assert send_mock.await_count == 5
+    assert entity_service.get_items_by_ids.await_count == 1
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_processing_data_failure_drops_processor_address(chat_tree_service, monkeypatch):
+    svc, _, store = chat_tree_service
+    store["a"] = SimpleNamespace(workflow_name="wf_a")
+    send_mock = AsyncMock(side_effect=[{"json": {"pmNodes": [{"hostname": "gone"}]}}, RuntimeError("unreachable"),
+                                       {"json": {"pmNodes": [{"hostname": "host2"}]}}, {"json": {}}])
+    monkeypatch.setattr(chat_service, "send_cyoda_request", send_mock)
+
+    assert await svc._fetch_entities_processing_data(["a"]) == {}
+    result = await svc._fetch_entities_processing_data(["a"])
+
+    assert result["a"]["workflow_name"] == "wf_a"
+    assert "host2" in send_mock.await_args_list[3].kwargs["path"]
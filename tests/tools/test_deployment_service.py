@@ -12,10 +12,12 @@ class TestDeploymentService:
     @pytest.fixture
     def mock_dependencies(self):
         """Create mock dependencies for DeploymentService."""
+        cyoda_auth_service = MagicMock()
+        cyoda_auth_service.get_access_token_async = AsyncMock(return_value="token")
         return {
             'workflow_helper_service': AsyncMock(),
             'entity_service': AsyncMock(),
-            'cyoda_auth_service': MagicMock(),
+            'cyoda_auth_service': cyoda_auth_service,
             'workflow_converter_service': AsyncMock(),
             'scheduler_service': AsyncMock(),
             'data_service': AsyncMock(),
@@ -1,11 +1,13 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from common.ai.token_budget import count_messages_tokens, get_tokenizer
 from workflow.dispatcher.ai_agent_handler import AIAgentHandler
 from workflow.dispatcher.method_registry import MethodRegistry
 from workflow.dispatcher.memory_manager import MemoryManager
-from entity.model import AgenticFlowEntity, ChatMemory, AIMessage, ModelConfig, TransitionsMemory
+from entity.model import AgenticFlowEntity, ChatMemory, ChatMemoryPage, AIMessage, ModelConfig, TransitionsMemory
 from common.config.config import config as env_config
 import common.config.const as const
+from common.utils.chat_util_functions import chat_updates
 
 
 class TestAIAgentHandler:
@@ -22,13 +24,15 @@ class TestAIAgentHandler:
                 }
 
         mock_instance = MockWorkflowClass()
+        entity_service = AsyncMock()
+        entity_service.get_items_by_ids.return_value = []
 
         return {
             'ai_agent': AsyncMock(),
             'method_registry': MethodRegistry(MockWorkflowClass, mock_instance),
             'memory_manager': MagicMock(spec=MemoryManager),
             'cls_instance': mock_instance,
-            'entity_service': AsyncMock(),
+            'entity_service': entity_service,
             'cyoda_auth_service': MagicMock(),
         }
 
@@ -63,6 +67,7 @@ class TestAIAgentHandler:
     def mock_memory(self):
         """Create mock ChatMemory."""
         memory = MagicMock(spec=ChatMemory)
+        memory.pages = {}
         memory.messages = {
             env_config.GENERAL_MEMORY_TAG: []
         }
@@ -94,6 +99,55 @@ class TestAIAgentHandler:
 
             assert result == "AI response"
 
+    @pytest.mark.asyncio
+    async def test_run_ai_agent_streams_partial_answer_to_chat(self, handler, mock_entity, mock_memory, mock_config):
+        """The answer is forwarded to clients watching the chat while it is generated."""
+        async def run_agent(**kwargs):
+            kwargs["on_content"](["AI re"])
+            return "AI response"
+
+        handler.ai_agent.run_agent = AsyncMock(side_effect=run_agent)
+        mock_config["publish"] = True
+
+        with chat_updates.subscribe("tech_id") as subscription, \
+             patch.object(handler, '_get_ai_memory', return_value=[]), \
+             patch.object(handler, '_check_and_update_iteration', return_value=False), \
+             patch.object(handler, '_append_messages', new_callable=AsyncMock):
+            result = await handler.run_ai_agent(mock_config, mock_entity, mock_memory, "tech_id")
+
+            partial = (await subscription.get(timeout=1))["partial"]
+            done = (await subscription.get(timeout=1))["partial"]
+
+        assert result == "AI response"
+        assert (partial["content"], partial["done"]) == ("AI re", False)
+        assert (done["content"], done["done"], done["stream_id"]) == ("AI re", True, partial["stream_id"])
+
+    @pytest.mark.asyncio
+    async def test_run_ai_agent_does_not_stream_without_watchers(self, handler, mock_entity, mock_memory, mock_config):
+        """Nobody watches the chat, the completion is not streamed."""
+        handler.ai_agent.run_agent = AsyncMock(return_value="AI response")
+
+        with patch.object(handler, '_get_ai_memory', return_value=[]), \
+             patch.object(handler, '_check_and_update_iteration', return_value=False), \
+             patch.object(handler, '_append_messages', new_callable=AsyncMock):
+            await handler.run_ai_agent(mock_config, mock_entity, mock_memory, "tech_id")
+
+        assert "on_content" not in handler.ai_agent.run_agent.call_args[1]
+
+    @pytest.mark.asyncio
+    async def test_run_ai_agent_does_not_stream_unpublished_answer(self, handler, mock_entity, mock_memory, mock_config):
+        """The answer of a step that is not published is not streamed to the chat."""
+        handler.ai_agent.run_agent = AsyncMock(return_value="AI response")
+        mock_config["publish"] = False
+
+        with chat_updates.subscribe("tech_id"), \
+             patch.object(handler, '_get_ai_memory', return_value=[]), \
+             patch.object(handler, '_check_and_update_iteration', return_value=False), \
+             patch.object(handler, '_append_messages', new_callable=AsyncMock):
+            await handler.run_ai_agent(mock_config, mock_entity, mock_memory, "tech_id")
+
+        assert "on_content" not in handler.ai_agent.run_agent.call_args[1]
+
     @pytest.mark.asyncio
     async def test_run_ai_agent_max_iterations_exceeded(self, handler, mock_entity, mock_memory, mock_config):
         """Test AI agent execution with max iterations exceeded."""
@@ -123,12 +177,14 @@ class TestAIAgentHandler:
         mock_memory.messages[env_config.GENERAL_MEMORY_TAG] = [mock_ai_message]
         
         mock_message_content = AIMessage(role="user", content="Test content")
-        handler.entity_service.get_item.return_value = mock_message_content
+        handler.entity_service.get_items_by_ids.return_value = [mock_message_content]
         
         result = await handler._get_ai_memory(mock_entity, config, mock_memory, "tech_id")
         
         assert len(result) == 1
         assert result[0] == mock_message_content
+        call_args = handler.entity_service.get_items_by_ids.call_args
+        assert call_args[1]['technical_ids'] == ["msg_123"]
 
     @pytest.mark.asyncio
     async def test_get_ai_memory_with_local_fs_input(self, handler, mock_entity, mock_memory):
@@ -309,3 +365,104 @@ class TestAIAgentHandler:
             # Should raise exception since error handling is not implemented in this method
             with pytest.raises(Exception, match="Append error"):
                 await handler._append_messages(mock_entity, config, mock_memory, finished_flow)
+
+    @pytest.mark.asyncio
+    async def test_get_ai_memory_keeps_newest_within_budget(self, handler, mock_entity, mock_memory, monkeypatch):
+        """Only the newest messages that fit the token budget are loaded, newest chunk first."""
+        monkeypatch.setattr(const, "MEMORY_LOAD_CHUNK_SIZE", 2)
+        mock_memory.messages[env_config.GENERAL_MEMORY_TAG] = [AIMessage(edge_message_id=f"m{i}") for i in range(6)]
+        contents = {f"m{i}": AIMessage(role="user", content="x" * 36) for i in range(6)}  # 10 + 4 tokens each
+
+        async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+            return [contents[technical_id] for technical_id in technical_ids]
+
+        handler.entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+        config = {"memory_tags": [env_config.GENERAL_MEMORY_TAG], "model": {"memory_token_budget": 45}}
+
+        result = await handler._get_ai_memory(mock_entity, config, mock_memory, "tech_id")
+
+        assert result == [contents["m3"], contents["m4"], contents["m5"]]
+        requested = [call[1]['technical_ids'] for call in handler.entity_service.get_items_by_ids.call_args_list]
+        assert requested == [["m4", "m5"], ["m2", "m3"]]
+
+    @pytest.mark.asyncio
+    async def test_get_ai_memory_reads_only_newest_pages(self, handler, mock_entity, mock_memory, monkeypatch):
+        """Memory pages too old to fit the token budget are not read."""
+        monkeypatch.setattr(const, "CHAT_MEMORY_PAGE_SIZE", 2)
+        tag = env_config.GENERAL_MEMORY_TAG
+        page_ids = [f"long_chat_page_{i}" for i in range(20)]
+        pages = {page_id: ChatMemoryPage(tag=tag, messages=[AIMessage(edge_message_id=f"{page_id}_{j}")
+                                                            for j in range(2)]) for page_id in page_ids}
+        mock_memory.pages = {tag: page_ids}
+        mock_memory.messages[tag] = [AIMessage(edge_message_id="tail")]
+
+        async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+            if entity_model == const.ModelName.CHAT_MEMORY_PAGE.value:
+                return [pages[page_id] for page_id in technical_ids]
+            return [AIMessage(role="user", content="") for _ in technical_ids]
+
+        handler.entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+        # 45 // MESSAGE_OVERHEAD_TOKENS = 11 messages at most: the tail and the last 5 pages
+        config = {"memory_tags": [tag], "model": {"memory_token_budget": 45}}
+
+        await handler._get_ai_memory(mock_entity, config, mock_memory, "tech_id")
+
+        requested_pages = [page_id for call in handler.entity_service.get_items_by_ids.call_args_list
+                           if call[1]['entity_model'] == const.ModelName.CHAT_MEMORY_PAGE.value
+                           for page_id in call[1]['technical_ids']]
+        assert requested_pages == page_ids[-5:]
+
+    @pytest.mark.asyncio
+    async def test_get_ai_memory_summarizes_dropped_prefix(self, handler, mock_entity, mock_memory):
+        """Dropped messages are replaced by a summary that is cached in the memory rollups."""
+        mock_memory.messages[env_config.GENERAL_MEMORY_TAG] = [AIMessage(edge_message_id=f"m{i}") for i in range(3)]
+        mock_memory.rollups = {}
+        contents = {f"m{i}": AIMessage(role="user", content="x" * 36) for i in range(3)}
+
+        async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+            return [contents[technical_id] for technical_id in technical_ids]
+
+        handler.entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+        handler.entity_service.add_item = AsyncMock(return_value="summary_id")
+        completion = MagicMock()
+        completion.choices[0].message.content = "earlier stuff"
+        handler.ai_agent.client = MagicMock()
+        handler.ai_agent.client.create_completion = AsyncMock(return_value=completion)
+        handler.ai_agent.adapt_messages = MagicMock(side_effect=lambda messages: messages)
+        budget = 14 + const.MEMORY_ROLLUP_MAX_TOKENS
+        config = {"memory_tags": [env_config.GENERAL_MEMORY_TAG],
+                  "model": {"memory_token_budget": budget, "summarize_dropped_memory": True}}
+
+        result = await handler._get_ai_memory(mock_entity, config, mock_memory, "tech_id")
+
+        assert result[0].content == "Summary of the earlier conversation: earlier stuff"
+        assert result[1:] == [contents["m2"]]
+        assert mock_memory.rollups[env_config.GENERAL_MEMORY_TAG] == {"through": "m1", "edge_message_id": "summary_id"}
+
+    @pytest.mark.asyncio
+    async def test_get_ai_memory_caps_long_history_by_default(self, handler, mock_entity, mock_memory):
+        """Without a configured budget a long history is still trimmed, even for 1M token context models."""
+        mock_memory.messages[env_config.GENERAL_MEMORY_TAG] = [AIMessage(edge_message_id=f"m{i}") for i in range(200)]
+        mock_memory.rollups = {}
+        contents = {f"m{i}": AIMessage(role="user", content="x" * 4000) for i in range(200)}
+
+        async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+            return [contents[technical_id] for technical_id in technical_ids]
+
+        handler.entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+        handler.entity_service.add_item = AsyncMock(return_value="summary_id")
+        completion = MagicMock()
+        completion.choices[0].message.content = "earlier stuff"
+        handler.ai_agent.client = MagicMock()
+        handler.ai_agent.client.create_completion = AsyncMock(return_value=completion)
+        handler.ai_agent.adapt_messages = MagicMock(side_effect=lambda messages: messages)
+        config = {"memory_tags": [env_config.GENERAL_MEMORY_TAG],
+                  "model": {"model_name": "gpt-4.1-mini", "summarize_dropped_memory": True}}
+
+        result = await handler._get_ai_memory(mock_entity, config, mock_memory, "tech_id")
+
+        assert result[0].content == "Summary of the earlier conversation: earlier stuff"
+        assert 0 < len(result) - 1 < 200
+        assert count_messages_tokens(result, get_tokenizer()) <= env_config.MEMORY_TOKEN_BUDGET
+        kept_through = 200 - (len(result) - 1) - 1
+        assert mock_memory.rollups[env_config.GENERAL_MEMORY_TAG]["through"] == f"m{kept_through}"
@@ -72,6 +72,7 @@ class TestEventProcessor:
     def mock_memory(self):
         """Create mock ChatMemory."""
         memory = MagicMock(spec=ChatMemory)
+        memory.pages = {}
         memory.messages = {}
         return memory
 
@@ -312,3 +313,14 @@ class TestEventProcessor:
         
         # Should return original message when formatting fails
         assert result == message
+
+    @pytest.mark.asyncio
+    async def test_process_event_flushes_memory_writes_once(self, processor, mock_entity):
+        """Memory updates of one event are collected and written together."""
+        processor.entity_service.add_item = AsyncMock(return_value="edge_msg_123")
+
+        action = {"config": {"type": "notification", "notification": "Hi", "memory_tags": ["general"]}}
+        await processor.process_event(mock_entity, action, "tech_id")
+
+        processor.memory_manager.begin_write_batch.assert_awaited_once()
+        processor.memory_manager.flush_write_batch.assert_awaited_once()
@@ -1,7 +1,8 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from workflow.dispatcher.memory_manager import MemoryManager
-from entity.model import AgenticFlowEntity, ChatMemory, AIMessage
+from workflow.dispatcher import memory_manager
+from workflow.dispatcher.memory_manager import MemoryManager, get_memory_edge_message_ids
+from entity.model import AgenticFlowEntity, ChatMemory, ChatMemoryPage, AIMessage
 from common.config.config import config as env_config
 import common.config.const as const
 
@@ -35,6 +36,7 @@ class TestMemoryManager:
     def mock_memory(self):
         """Create mock ChatMemory."""
         memory = MagicMock(spec=ChatMemory)
+        memory.pages = {}
         memory.messages = {
             env_config.GENERAL_MEMORY_TAG: []
         }
@@ -139,7 +141,7 @@ class TestMemoryManager:
         mock_message_content1 = AIMessage(role="user", content="Message 1")
         mock_message_content2 = AIMessage(role="user", content="Message 2")
 
-        manager.entity_service.get_item = AsyncMock(side_effect=[mock_message_content1, mock_message_content2])
+        manager.entity_service.get_items_by_ids = AsyncMock(return_value=[mock_message_content1, mock_message_content2])
 
         result = await manager.get_ai_memory_messages(mock_memory, memory_tags)
 
@@ -147,14 +149,18 @@ class TestMemoryManager:
         assert result[0] == mock_message_content1
         assert result[1] == mock_message_content2
 
-        # Verify get_item was called correctly
-        assert manager.entity_service.get_item.call_count == 2
+        # Verify all edge messages were fetched in a single bulk call
+        manager.entity_service.get_items_by_ids.assert_awaited_once()
+        call_args = manager.entity_service.get_items_by_ids.call_args
+        assert call_args[1]['technical_ids'] == ["edge_1", "edge_2"]
+        assert call_args[1]['entity_model'] == const.ModelName.AI_MEMORY_EDGE_MESSAGE.value
 
     @pytest.mark.asyncio
     async def test_get_ai_memory_messages_empty_memory(self, manager, mock_memory):
         """Test AI memory messages retrieval with empty memory."""
         memory_tags = ["nonexistent_tag"]
         mock_memory.messages = {}
+        manager.entity_service.get_items_by_ids = AsyncMock(return_value=[])
         
         result = await manager.get_ai_memory_messages(mock_memory, memory_tags)
         
@@ -165,10 +171,12 @@ class TestMemoryManager:
         """Test AI memory messages retrieval with missing tag."""
         memory_tags = ["missing_tag"]
         mock_memory.messages = {env_config.GENERAL_MEMORY_TAG: []}
+        manager.entity_service.get_items_by_ids = AsyncMock(return_value=[])
         
         result = await manager.get_ai_memory_messages(mock_memory, memory_tags)
         
         assert result == []
+        assert manager.entity_service.get_items_by_ids.call_args[1]['technical_ids'] == []
 
     @pytest.mark.asyncio
     async def test_get_ai_memory_messages_error_handling(self, manager, mock_memory):
@@ -178,7 +186,7 @@ class TestMemoryManager:
         mock_ai_message = AIMessage(edge_message_id="edge_1")
         mock_memory.messages = {env_config.GENERAL_MEMORY_TAG: [mock_ai_message]}
 
-        manager.entity_service.get_item = AsyncMock(side_effect=Exception("Get error"))
+        manager.entity_service.get_items_by_ids = AsyncMock(side_effect=Exception("Get error"))
 
         # Should raise the exception since it's not handled gracefully in this method
         with pytest.raises(Exception, match="Get error"):
@@ -226,7 +234,7 @@ class TestMemoryManager:
             mock_message_contents.append(mock_content)
         
         mock_memory.messages = {env_config.GENERAL_MEMORY_TAG: mock_ai_messages}
-        manager.entity_service.get_item.side_effect = mock_message_contents
+        manager.entity_service.get_items_by_ids.return_value = mock_message_contents
         
         result = await manager.get_ai_memory_messages(mock_memory, memory_tags)
         
@@ -287,7 +295,7 @@ class TestMemoryManager:
         # Mock retrieval
         mock_content1 = AIMessage(role="user", content="Message 1")
         mock_content2 = AIMessage(role="user", content="Message 2")
-        manager.entity_service.get_item.side_effect = [mock_content1, mock_content2]
+        manager.entity_service.get_items_by_ids.return_value = [mock_content1, mock_content2]
         
         # Verify the message was added to memory (there might be existing messages from fixture)
         assert len(mock_memory.messages[env_config.GENERAL_MEMORY_TAG]) >= 1
@@ -297,3 +305,87 @@ class TestMemoryManager:
 
         # Should have at least the message we added
         assert len(result) >= 1
+
+    @pytest.mark.asyncio
+    async def test_write_batch_coalesces_updates(self, manager, mock_entity):
+        """Appends within one write batch produce a single memory update."""
+        memory = ChatMemory(messages={}, last_modified=1)
+        manager.entity_service.get_item = AsyncMock(return_value=memory)
+        manager.entity_service.add_item = AsyncMock(side_effect=["edge_1", "edge_2", "edge_3"])
+
+        await manager.begin_write_batch()
+        for content in ("one", "two", "three"):
+            await manager.append_to_ai_memory(mock_entity, content, [env_config.GENERAL_MEMORY_TAG])
+        manager.entity_service.update_item.assert_not_called()
+        await manager.flush_write_batch()
+
+        manager.entity_service.update_item.assert_awaited_once()
+        written = manager.entity_service.update_item.call_args[1]['entity']
+        assert [m.edge_message_id for m in written.messages[env_config.GENERAL_MEMORY_TAG]] == \
+               ["edge_1", "edge_2", "edge_3"]
+        # loaded once, then re-read once for the version check
+        assert manager.entity_service.get_item.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_write_batch_merges_concurrent_changes(self, manager, mock_entity):
+        """A memory changed by another writer keeps its messages and gets ours appended."""
+        loaded = ChatMemory(messages={"general": [AIMessage(edge_message_id="base")]}, last_modified=1)
+        concurrent = ChatMemory(messages={"general": [AIMessage(edge_message_id="base"),
+                                                      AIMessage(edge_message_id="theirs")]}, last_modified=2)
+        manager.entity_service.get_item = AsyncMock(side_effect=[loaded, concurrent])
+        manager.entity_service.add_item = AsyncMock(return_value="ours")
+
+        await manager.begin_write_batch()
+        await manager.append_to_ai_memory(mock_entity, "content", ["general"])
+        await manager.flush_write_batch()
+
+        written = manager.entity_service.update_item.call_args[1]['entity']
+        assert [m.edge_message_id for m in written.messages["general"]] == ["base", "theirs", "ours"]
+
+    @pytest.mark.asyncio
+    async def test_update_outside_batch_writes_immediately(self, manager, mock_memory):
+        """Without a write batch every update is written right away."""
+        await manager.update_chat_memory("memory_id", mock_memory)
+        manager.entity_service.update_item.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_write_seals_full_pages(self, manager, monkeypatch):
+        """Full pages of references move out of the memory document on write."""
+        monkeypatch.setattr(const, "CHAT_MEMORY_PAGE_SIZE", 2)
+        memory = ChatMemory(messages={"general": [AIMessage(edge_message_id=f"e{i}") for i in range(5)]})
+        manager.entity_service.add_item = AsyncMock(side_effect=["page_1", "page_2"])
+
+        await manager.update_chat_memory("memory_id", memory)
+
+        pages = [call[1]['entity'] for call in manager.entity_service.add_item.call_args_list]
+        assert all(isinstance(page, ChatMemoryPage) for page in pages)
+        assert [[m.edge_message_id for m in page.messages] for page in pages] == [["e0", "e1"], ["e2", "e3"]]
+        written = manager.entity_service.update_item.call_args[1]['entity']
+        assert written.pages == {"general": ["page_1", "page_2"]}
+        assert [m.edge_message_id for m in written.messages["general"]] == ["e4"]
+
+    @pytest.mark.asyncio
+    async def test_read_pages_and_tail(self, manager, monkeypatch):
+        """References are read from sealed pages, then the tail, loading only the pages needed."""
+        monkeypatch.setattr(const, "CHAT_MEMORY_PAGE_SIZE", 2)
+        memory_manager._memory_pages.clear()
+        pages = {"p1": ChatMemoryPage(tag="general", messages=[AIMessage(edge_message_id="e0"),
+                                                               AIMessage(edge_message_id="e1")]),
+                 "p2": ChatMemoryPage(tag="general", messages=[AIMessage(edge_message_id="e2"),
+                                                               AIMessage(edge_message_id="e3")])}
+
+        async def get_items_by_ids(token, entity_model, entity_version, technical_ids, meta=None):
+            return [pages[page_id] for page_id in technical_ids]
+
+        manager.entity_service.get_items_by_ids = AsyncMock(side_effect=get_items_by_ids)
+        memory = ChatMemory(messages={"general": [AIMessage(edge_message_id="e4")], "other": []},
+                            pages={"general": ["p1", "p2"]})
+
+        recent = await get_memory_edge_message_ids(manager.entity_service, None, memory, ["general"], max_per_tag=3)
+        assert recent == ["e2", "e3", "e4"]
+        assert manager.entity_service.get_items_by_ids.call_args[1]['technical_ids'] == ["p2"]
+
+        everything = await get_memory_edge_message_ids(manager.entity_service, None, memory, ["general", "other"])
+        assert everything == ["e0", "e1", "e2", "e3", "e4"]
+        # p2 came from the page cache
+        assert manager.entity_service.get_items_by_ids.call_args[1]['technical_ids'] == ["p1"]
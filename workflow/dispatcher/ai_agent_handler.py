@@ -1,10 +1,13 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import common.config.const as const
 from common.config.config import config as env_config
-from common.utils.chat_util_functions import enrich_config_message
+from common.ai.token_budget import (MESSAGE_OVERHEAD_TOKENS, get_tokenizer, count_message_tokens,
+                                    count_messages_tokens, newest_within_budget)
+from common.utils.chat_util_functions import enrich_config_message, PartialAnswerPublisher
 from common.utils.utils import get_current_timestamp_num
 from entity.model import AgenticFlowEntity, ChatMemory, ModelConfig, FlowEdgeMessage, AIMessage
+from workflow.dispatcher.memory_manager import get_memory_edge_message_ids
 
 # Conditional import to avoid dependency issues during testing
 try:
@@ -75,18 +78,29 @@ class AIAgentHandler:
             # Extract model configuration
             model = ModelConfig.model_validate(config.get("model", {}))
 
+            # Forward the answer to the chat while it is generated, if it will be published
+            # and anybody is watching
+            stream_answer = model.stream and config.get("publish")
+            partial_answer = PartialAnswerPublisher.for_entity(technical_id) if stream_answer else None
+            stream_params = {"on_content": partial_answer} if partial_answer else {}
+
             # Run the AI agent with correct signature
-            response = await self.ai_agent.run_agent(
-                methods_dict=self.method_registry.methods_dict,
-                technical_id=technical_id,
-                cls_instance=self.cls_instance,
-                entity=entity,
-                tools=config.get("tools"),
-                model=model,
-                messages=messages,
-                tool_choice=config.get("tool_choice"),
-                response_format=config.get("response_format")
-            )
+            try:
+                response = await self.ai_agent.run_agent(
+                    methods_dict=self.method_registry.methods_dict,
+                    technical_id=technical_id,
+                    cls_instance=self.cls_instance,
+                    entity=entity,
+                    tools=config.get("tools"),
+                    model=model,
+                    messages=messages,
+                    tool_choice=config.get("tool_choice"),
+                    response_format=config.get("response_format"),
+                    **stream_params
+                )
+            finally:
+                if partial_answer:
+                    partial_answer.finish()
 
             # Store the response in memory
             await self.memory_manager.store_ai_response(response=response, memory=memory, memory_tags=memory_tags)
@@ -100,7 +114,8 @@ class AIAgentHandler:
     async def _get_ai_memory(self, entity: AgenticFlowEntity, config: Dict[str, Any],
                             memory: ChatMemory, technical_id: str) -> List[AIMessage]:
         """
-        Get AI memory messages including input data from config.
+        Get AI memory messages including input data from config. Memory is trimmed to the model's
+        token budget, newest messages first, and optionally prefixed with a summary of what was dropped.
 
         Args:
             entity: Agentic flow entity
@@ -112,21 +127,128 @@ class AIAgentHandler:
             List of AIMessage objects
         """
         memory_tags = config.get("memory_tags", [env_config.GENERAL_MEMORY_TAG])
-        messages = []
+        model = ModelConfig.model_validate(config.get("model", {}))
+        tokenizer = get_tokenizer(model.model_name)
+
+        input_messages = await self._get_input_messages(entity=entity, config=config, technical_id=technical_id)
+
+        budget = model.get_memory_token_budget() - count_messages_tokens(input_messages, tokenizer)
+        if model.summarize_dropped_memory:
+            budget -= const.MEMORY_ROLLUP_MAX_TOKENS
+        # every message costs at least MESSAGE_OVERHEAD_TOKENS, so older messages cannot fit and their
+        # memory pages are not read; a rollup has to see all dropped messages
+        max_per_tag = None if model.summarize_dropped_memory else max(budget, 0) // MESSAGE_OVERHEAD_TOKENS
 
         # Get existing memory messages
-        for memory_tag in memory_tags:
-            entity_messages: List[AIMessage] = memory.messages.get(memory_tag, [])
-            for entity_message in entity_messages:
-                message_content = await self.entity_service.get_item(
+        edge_message_ids = await get_memory_edge_message_ids(entity_service=self.entity_service,
+                                                             cyoda_auth_service=self.cyoda_auth_service,
+                                                             memory=memory,
+                                                             memory_tags=memory_tags,
+                                                             max_per_tag=max_per_tag)
+        messages, dropped_ids = await self._load_newest_memory(edge_message_ids=edge_message_ids,
+                                                               budget=budget,
+                                                               tokenizer=tokenizer)
+        if dropped_ids:
+            logger.info(f"Memory over budget for {technical_id}: dropped {len(dropped_ids)} oldest messages")
+            if model.summarize_dropped_memory:
+                rollup = await self._get_memory_rollup(memory=memory, memory_tags=memory_tags,
+                                                       dropped_ids=dropped_ids, model=model)
+                if rollup is not None:
+                    messages.insert(0, rollup)
+        return messages + input_messages
+
+    async def _load_newest_memory(self, edge_message_ids: List[str], budget: int,
+                                  tokenizer) -> Tuple[List[AIMessage], List[str]]:
+        """
+        Loads memory messages newest first, a chunk at a time, until the token budget is spent.
+        Returns the kept messages in chronological order and the ids of the dropped prefix.
+        """
+        kept: List[AIMessage] = []
+        used = 0
+        end = len(edge_message_ids)
+        while end > 0:
+            start = max(end - const.MEMORY_LOAD_CHUNK_SIZE, 0)
+            chunk = await self.entity_service.get_items_by_ids(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
+                entity_version=env_config.ENTITY_VERSION,
+                technical_ids=edge_message_ids[start:end],
+                meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+            )
+            for offset, message in reversed(list(enumerate(chunk))):
+                if not message:
+                    continue
+                tokens = count_message_tokens(message, tokenizer)
+                if used + tokens > budget:
+                    kept.reverse()
+                    return kept, edge_message_ids[:start + offset + 1]
+                used += tokens
+                kept.append(message)
+            end = start
+        kept.reverse()
+        return kept, []
+
+    async def _get_memory_rollup(self, memory: ChatMemory, memory_tags: List[str], dropped_ids: List[str],
+                                 model: ModelConfig) -> Optional[AIMessage]:
+        """
+        Summary of the memory messages dropped by the token budget. The summary is stored as an
+        AI memory edge message referenced from memory.rollups and extended incrementally
+        as more messages fall out of the budget.
+        """
+        key = ",".join(memory_tags)
+        if memory.rollups is None:
+            memory.rollups = {}
+        rollup = memory.rollups.get(key)
+        try:
+            previous = None
+            new_ids = dropped_ids
+            if rollup and rollup.get("through") in dropped_ids:
+                previous = await self.entity_service.get_item(
                     token=self.cyoda_auth_service,
                     entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
                     entity_version=env_config.ENTITY_VERSION,
-                    technical_id=entity_message.edge_message_id,
+                    technical_id=rollup["edge_message_id"],
                     meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
                 )
-                messages.append(message_content)
+                new_ids = dropped_ids[dropped_ids.index(rollup["through"]) + 1:]
+                if not new_ids:
+                    return previous
+
+            tokenizer = get_tokenizer(model.model_name)
+            new_messages = [message for message in await self.entity_service.get_items_by_ids(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
+                entity_version=env_config.ENTITY_VERSION,
+                technical_ids=new_ids,
+                meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+            ) if message]
+            # the summarization request has to fit the context window as well
+            new_messages = newest_within_budget(new_messages, model.get_memory_token_budget(), tokenizer)
+            prompt = ([previous] if previous else []) + new_messages + [
+                AIMessage(role="user", content=const.MEMORY_ROLLUP_PROMPT)]
+            completion = await self.ai_agent.client.create_completion(
+                model=ModelConfig(model_name=model.model_name, temperature=0,
+                                  max_tokens=const.MEMORY_ROLLUP_MAX_TOKENS),
+                messages=self.ai_agent.adapt_messages(prompt)
+            )
+            summary = AIMessage(role="system",
+                                content=f"Summary of the earlier conversation: {completion.choices[0].message.content}")
+            summary_id = await self.entity_service.add_item(
+                token=self.cyoda_auth_service,
+                entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
+                entity_version=env_config.ENTITY_VERSION,
+                entity=summary,
+                meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+            )
+            memory.rollups[key] = {"through": dropped_ids[-1], "edge_message_id": summary_id}
+            return summary
+        except Exception as e:
+            logger.exception(f"Failed to summarize dropped memory, continuing without it: {e}")
+            return None
 
+    async def _get_input_messages(self, entity: AgenticFlowEntity, config: Dict[str, Any],
+                                  technical_id: str) -> List[AIMessage]:
+        messages: List[AIMessage] = []
         # Handle input data from config
         input_data = config.get("input")
         if input_data:
@@ -5,6 +5,8 @@ from typing import Dict, Any, Tuple, List
 
 import common.config.const as const
 from common.config.config import config as env_config
+from common.service.dialogue_snapshot_store import dialogue_snapshots
+from common.utils.chat_util_functions import publish_dialogue_update
 from common.utils.utils import get_current_timestamp_num, _post_process_response, _save_file, get_repository_name
 from entity.chat.chat import AgenticFlowEntity
 from entity.model import WorkflowEntity, FlowEdgeMessage
@@ -57,7 +59,8 @@ class EventProcessor:
             Tuple of (updated_entity, response)
         """
         response = "returned empty response"
-        
+
+        await self.memory_manager.begin_write_batch()
         try:
             # Get user account information
             entity.user_id = await self.user_service.get_entity_account(user_id=entity.user_id)
@@ -81,8 +84,12 @@ class EventProcessor:
                 )
             else:
                 raise ValueError(f"Unknown processing step: {action_name}")
+
+            # one write per chat memory for everything this event appended
+            await self.memory_manager.flush_write_batch()
                 
         except Exception as e:
+            await self._flush_memory_after_failure()
             entity.failed = True
             entity.last_modified = get_current_timestamp_num()
             entity.error = f"Error: {e}"
@@ -92,6 +99,12 @@ class EventProcessor:
         entity.last_modified = get_current_timestamp_num()
         return entity, response
     
+    async def _flush_memory_after_failure(self) -> None:
+        try:
+            await self.memory_manager.flush_write_batch()
+        except Exception as e:
+            logger.exception(f"Failed to write chat memory after a failed event: {e}")
+
     async def _handle_agentic_flow_event(self, config: Dict[str, Any],
                                         entity: AgenticFlowEntity,
                                         technical_id: str) -> Tuple[AgenticFlowEntity, str]:
@@ -321,6 +334,7 @@ class EventProcessor:
             response: Response content
             new_entities: New entities created during processing
         """
+        dialogue_snapshots.flow_appended(technical_id)
         # Create initial edge message
         message = FlowEdgeMessage(
             type=config.get("type"),
@@ -329,7 +343,8 @@ class EventProcessor:
             message=config.get(config.get("type")),
             last_modified=get_current_timestamp_num()
         )
-        await self.add_edge_message(message=message, flow=finished_flow, user_id=entity.user_id)
+        flow_edge_message = await self.add_edge_message(message=message, flow=finished_flow, user_id=entity.user_id)
+        publish_dialogue_update(technical_id, message, flow_edge_message.edge_message_id)
         config_type = config["type"]
 
         if config_type in ("function", "prompt", "agent"):
@@ -350,9 +365,10 @@ class EventProcessor:
                         approve=config.get("approve", False),
                         type="question"
                     )
-                await self.add_edge_message(message=notification,
-                                            flow=finished_flow,
-                                            user_id=entity.user_id)
+                flow_edge_message = await self.add_edge_message(message=notification,
+                                                                flow=finished_flow,
+                                                                user_id=entity.user_id)
+                publish_dialogue_update(technical_id, notification, flow_edge_message.edge_message_id)
 
             # Handle output writing with lock protection
             async with self._write_output_lock:
@@ -366,8 +382,9 @@ class EventProcessor:
             message = FlowEdgeMessage(type="child_entities",
                                       message=new_entities,
                                       last_modified=get_current_timestamp_num())
-            await self.add_edge_message(message=message, flow=finished_flow,
-                                        user_id=entity.user_id)
+            flow_edge_message = await self.add_edge_message(message=message, flow=finished_flow,
+                                                            user_id=entity.user_id)
+            publish_dialogue_update(technical_id, message, flow_edge_message.edge_message_id)
 
     async def add_edge_message(self, message: FlowEdgeMessage, flow: List[FlowEdgeMessage], user_id: str) -> FlowEdgeMessage:
         """
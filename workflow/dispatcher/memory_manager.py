@@ -1,13 +1,65 @@
 import logging
-from typing import List, Optional
+import math
+from contextvars import ContextVar
+from typing import Dict, List, Optional
 
 import common.config.const as const
 from common.config.config import config as env_config
+from common.utils.cache import MemoryCache
+from common.utils.metrics import metrics
 from common.utils.utils import get_current_timestamp_num
-from entity.model import ChatMemory, AIMessage, FlowEdgeMessage
+from entity.model import ChatMemory, ChatMemoryPage, AIMessage, FlowEdgeMessage
 
 logger = logging.getLogger(__name__)
 
+# sealed pages never change, page id -> edge message ids
+_memory_pages = MemoryCache("chat_memory_pages", max_bytes=const.CHAT_MEMORY_PAGE_CACHE_MAX_BYTES)
+
+# memory_id -> memory loaded during the current workflow event and whether it has pending changes
+_write_batch: ContextVar[Optional[Dict[str, dict]]] = ContextVar("memory_write_batch", default=None)
+
+
+async def get_memory_edge_message_ids(entity_service, cyoda_auth_service, memory: ChatMemory,
+                                      memory_tags: List[str], max_per_tag: Optional[int] = None) -> List[str]:
+    """
+    Edge message ids of the memory for the given tags, oldest first, loading sealed pages of those tags only.
+    With max_per_tag only the most recent messages of each tag are returned and older pages are not loaded.
+    """
+    edge_message_ids = []
+    for memory_tag in memory_tags:
+        tail = [message.edge_message_id for message in (memory.messages or {}).get(memory_tag, [])]
+        page_ids = list((memory.pages or {}).get(memory_tag, []))
+        if max_per_tag is not None:
+            pages_needed = math.ceil(max(max_per_tag - len(tail), 0) / const.CHAT_MEMORY_PAGE_SIZE)
+            page_ids = page_ids[max(len(page_ids) - pages_needed, 0):]
+        tag_ids = []
+        for page in await _load_memory_pages(entity_service, cyoda_auth_service, page_ids):
+            tag_ids.extend(page)
+        tag_ids.extend(tail)
+        if max_per_tag is not None:
+            tag_ids = tag_ids[-max_per_tag:] if max_per_tag > 0 else []
+        edge_message_ids.extend(tag_ids)
+    return edge_message_ids
+
+
+async def _load_memory_pages(entity_service, cyoda_auth_service, page_ids: List[str]) -> List[List[str]]:
+    pages = {page_id: _memory_pages.get(page_id) for page_id in page_ids}
+    missing_ids = [page_id for page_id, page in pages.items() if page is None]
+    if missing_ids:
+        loaded: List[ChatMemoryPage] = await entity_service.get_items_by_ids(
+            token=cyoda_auth_service,
+            entity_model=const.ModelName.CHAT_MEMORY_PAGE.value,
+            entity_version=env_config.ENTITY_VERSION,
+            technical_ids=missing_ids
+        )
+        for page_id, page in zip(missing_ids, loaded):
+            if not page:
+                logger.warning(f"Chat memory page {page_id} not found")
+                continue
+            pages[page_id] = [message.edge_message_id for message in page.messages]
+            _memory_pages.set(page_id, pages[page_id])
+    return [pages[page_id] or [] for page_id in page_ids]
+
 
 class MemoryManager:
     """
@@ -35,21 +87,77 @@ class MemoryManager:
         Returns:
             ChatMemory object
         """
-        return await self.entity_service.get_item(
-            token=self.cyoda_auth_service,
-            entity_model=const.ModelName.CHAT_MEMORY.value,
-            entity_version=env_config.ENTITY_VERSION,
-            technical_id=memory_id
-        )
+        batch = _write_batch.get()
+        if batch is not None and memory_id in batch:
+            return batch[memory_id]["memory"]
+        chat_memory = await self._load_chat_memory(memory_id)
+        if batch is not None and chat_memory is not None:
+            batch[memory_id] = {
+                "memory": chat_memory,
+                "version": chat_memory.last_modified,
+                "base_ids": self._message_ids(chat_memory),
+                "dirty": False,
+            }
+        return chat_memory
     
     async def update_chat_memory(self, memory_id: str, chat_memory: ChatMemory) -> None:
         """
-        Update chat memory.
+        Update chat memory. Inside a write batch the update is deferred to flush_write_batch.
         
         Args:
             memory_id: ID of the chat memory to update
             chat_memory: Updated ChatMemory object
         """
+        batch = _write_batch.get()
+        pending = batch.get(memory_id) if batch is not None else None
+        if pending is not None:
+            pending["memory"] = chat_memory
+            pending["dirty"] = True
+            metrics.increment("memory_manager.coalesced_writes")
+            return
+        await self._write_chat_memory(memory_id=memory_id, chat_memory=chat_memory)
+
+    async def begin_write_batch(self) -> None:
+        """
+        Start collecting chat memory updates of the current workflow event, so that
+        every memory it touches is written once by flush_write_batch.
+        """
+        _write_batch.set({})
+
+    async def flush_write_batch(self) -> None:
+        """
+        Write the memories changed since begin_write_batch. If a memory was changed by someone
+        else in the meantime, the messages appended here are merged into the latest version
+        instead of overwriting it.
+        """
+        batch = _write_batch.get()
+        _write_batch.set(None)
+        if not batch:
+            return
+        for memory_id, pending in batch.items():
+            if not pending["dirty"]:
+                continue
+            chat_memory = pending["memory"]
+            current = await self._load_chat_memory(memory_id)
+            if current is not None and current.last_modified != pending["version"]:
+                metrics.increment("memory_manager.write_conflicts")
+                logger.info(f"Chat memory {memory_id} changed during the event, merging appended messages")
+                chat_memory = self._merge_appended_messages(current=current, changed=chat_memory,
+                                                            base_ids=pending["base_ids"])
+            await self._write_chat_memory(memory_id=memory_id, chat_memory=chat_memory)
+
+    async def _load_chat_memory(self, memory_id: str) -> ChatMemory:
+        return await self.entity_service.get_item(
+            token=self.cyoda_auth_service,
+            entity_model=const.ModelName.CHAT_MEMORY.value,
+            entity_version=env_config.ENTITY_VERSION,
+            technical_id=memory_id
+        )
+
+    async def _write_chat_memory(self, memory_id: str, chat_memory: ChatMemory) -> None:
+        await self._seal_full_pages(chat_memory)
+        # last_modified is the version the write batch checks against
+        chat_memory.last_modified = get_current_timestamp_num()
         await self.entity_service.update_item(
             token=self.cyoda_auth_service,
             entity_model=const.ModelName.CHAT_MEMORY.value,
@@ -58,6 +166,48 @@ class MemoryManager:
             entity=chat_memory,
             meta={const.TransitionKey.UPDATE.value: "UPDATE"}
         )
+
+    async def _seal_full_pages(self, chat_memory: ChatMemory) -> None:
+        """
+        Moves full pages of message references out of the memory document into immutable
+        ChatMemoryPage entities, so the document written on every change stays small.
+        """
+        page_size = const.CHAT_MEMORY_PAGE_SIZE
+        for tag, messages in (chat_memory.messages or {}).items():
+            if len(messages) < page_size:
+                continue
+            if chat_memory.pages is None:
+                chat_memory.pages = {}
+            while len(messages) >= page_size:
+                page_messages, messages = messages[:page_size], messages[page_size:]
+                page_id = await self.entity_service.add_item(
+                    token=self.cyoda_auth_service,
+                    entity_model=const.ModelName.CHAT_MEMORY_PAGE.value,
+                    entity_version=env_config.ENTITY_VERSION,
+                    entity=ChatMemoryPage(tag=tag, messages=page_messages)
+                )
+                _memory_pages.set(page_id, [message.edge_message_id for message in page_messages])
+                chat_memory.pages.setdefault(tag, []).append(page_id)
+                metrics.increment("memory_manager.sealed_pages")
+            chat_memory.messages[tag] = messages
+
+    @staticmethod
+    def _message_ids(chat_memory: ChatMemory) -> Dict[str, set]:
+        return {tag: {message.edge_message_id for message in messages}
+                for tag, messages in (chat_memory.messages or {}).items()}
+
+    def _merge_appended_messages(self, current: ChatMemory, changed: ChatMemory,
+                                 base_ids: Dict[str, set]) -> ChatMemory:
+        current_ids = self._message_ids(current)
+        if current.messages is None:
+            current.messages = {}
+        for tag, messages in (changed.messages or {}).items():
+            for message in messages:
+                if message.edge_message_id in base_ids.get(tag, ()) or \
+                        message.edge_message_id in current_ids.get(tag, ()):
+                    continue
+                current.messages.setdefault(tag, []).append(message)
+        return current
     
     async def append_to_ai_memory(self, entity, content: str, memory_tags: Optional[List[str]] = None) -> None:
         """
@@ -126,19 +276,17 @@ class MemoryManager:
         Returns:
             List of AIMessage objects
         """
-        messages = []
-        for memory_tag in memory_tags:
-            entity_messages: List[AIMessage] = memory.messages.get(memory_tag, [])
-            for entity_message in entity_messages:
-                message_content = await self.entity_service.get_item(
-                    token=self.cyoda_auth_service,
-                    entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
-                    entity_version=env_config.ENTITY_VERSION,
-                    technical_id=entity_message.edge_message_id,
-                    meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
-                )
-                messages.append(message_content)
-        return messages
+        edge_message_ids = await get_memory_edge_message_ids(entity_service=self.entity_service,
+                                                             cyoda_auth_service=self.cyoda_auth_service,
+                                                             memory=memory,
+                                                             memory_tags=memory_tags)
+        return await self.entity_service.get_items_by_ids(
+            token=self.cyoda_auth_service,
+            entity_model=const.ModelName.AI_MEMORY_EDGE_MESSAGE.value,
+            entity_version=env_config.ENTITY_VERSION,
+            technical_ids=edge_message_ids,
+            meta={"type": env_config.CYODA_ENTITY_TYPE_EDGE_MESSAGE}
+        )
     
     async def store_ai_response(self, response: str, memory: ChatMemory, memory_tags: List[str]) -> None:
         """